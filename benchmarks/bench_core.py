@@ -0,0 +1,356 @@
+"""
+DataManager・Scheduler・HolidayManagerのマイクロベンチマーク
+
+ユーザー数×日付数の合成の回答履歴（seedが同じなら同じ内容）を一時ディレクトリに作成し、
+回答の保存・取得・集計、スケジューラーのチェック、祝日の検索の1回あたりの時間を計測して
+JSONで出力します。--baselineに以前の結果を渡すと、中央値が--threshold倍を超えて遅くなった
+項目を報告して終了コード1で終了します（回帰の検出用）。
+
+使い方:
+    python benchmarks/bench_core.py --users 10 500 5000 --dates 30 300 3000 --output results.json
+    python benchmarks/bench_core.py --only data --baseline results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pytz  # noqa: E402
+
+from utils.data_manager import DataManager  # noqa: E402
+from utils.holidays import HolidayManager  # noqa: E402
+from utils.scheduler import Scheduler  # noqa: E402
+
+JST = pytz.timezone("Asia/Tokyo")
+GROUPS = ("data", "scheduler", "holidays")
+# 履歴の最終日（実行日によって結果が変わらないよう固定）
+HISTORY_END = datetime(2026, 12, 31)
+# Discordのスノーフレーク相当のユーザーID
+_USER_ID_BASE = 100_000_000_000_000_000
+
+
+def history_dates(dates: int) -> List[datetime]:
+    """HISTORY_ENDまでのdates日分の日付（古い順）"""
+    return [JST.localize(HISTORY_END - timedelta(days=offset)) for offset in range(dates - 1, -1, -1)]
+
+
+def generate_history(users: int, dates: int, seed: int) -> Dict[str, list]:
+    """
+    responses.jsonと同じ形式の合成の回答履歴を作成
+
+    Args:
+        users: 1日あたりの回答ユーザー数
+        dates: 日付数
+        seed: 乱数のseed
+
+    Returns:
+        日付文字列: 回答のリスト
+    """
+    rng = random.Random(seed)
+    history = {}
+    for day in history_dates(dates):
+        responses = []
+        for index in range(users):
+            can_attend = rng.random() < 0.7
+            start = rng.randrange(18, 22) if can_attend else None
+            timestamp = (day + timedelta(hours=20, seconds=rng.randrange(7200))).isoformat()
+            responses.append({
+                "user_id": _USER_ID_BASE + index,
+                "can_attend": can_attend,
+                "start_time": f"{start:02d}:00" if can_attend else None,
+                "end_time": f"{start + 2:02d}:00" if can_attend else None,
+                "created_at": timestamp,
+                "updated_at": timestamp,
+            })
+        history[day.strftime("%Y-%m-%d")] = responses
+    return history
+
+
+def summarize(name: str, samples: List[float], **params) -> dict:
+    """計測値（秒）を1回あたりのマイクロ秒の統計にまとめる"""
+    ordered = sorted(samples)
+    return {
+        "benchmark": name,
+        **params,
+        "runs": len(ordered),
+        "min_us": round(ordered[0] * 1e6, 2),
+        "median_us": round(statistics.median(ordered) * 1e6, 2),
+        "mean_us": round(statistics.fmean(ordered) * 1e6, 2),
+        "p95_us": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e6, 2),
+        "max_us": round(ordered[-1] * 1e6, 2),
+    }
+
+
+def measure(func: Callable[[int], object], repeat: int, budget: float) -> List[float]:
+    """
+    funcを最大repeat回実行して1回ごとの時間を返す（budget秒を超えたら3回以上で打ち切る）
+
+    Args:
+        func: 実行回数（0始まり）を受け取る関数
+        repeat: 最大の実行回数
+        budget: 1項目あたりの目安の時間（秒）
+    """
+    samples = []
+    started = time.perf_counter()
+    for index in range(repeat):
+        begin = time.perf_counter()
+        func(index)
+        samples.append(time.perf_counter() - begin)
+        if index >= 2 and time.perf_counter() - started > budget:
+            break
+    return samples
+
+
+async def measure_async(func: Callable[[int], Awaitable[object]], repeat: int, budget: float) -> List[float]:
+    """measureのコルーチン版"""
+    samples = []
+    started = time.perf_counter()
+    for index in range(repeat):
+        begin = time.perf_counter()
+        await func(index)
+        samples.append(time.perf_counter() - begin)
+        if index >= 2 and time.perf_counter() - started > budget:
+            break
+    return samples
+
+
+def bench_data(workdir: str, users: int, dates: int, args) -> List[dict]:
+    """DataManagerの読み込み・保存・取得・集計"""
+    data_file = os.path.join(workdir, f"responses-{users}x{dates}.json")
+    with open(data_file, "w", encoding="utf-8") as f:
+        json.dump(generate_history(users, dates, args.seed), f, ensure_ascii=False, indent=2)
+    params = {"users": users, "dates": dates, "responses": users * dates, "file_bytes": os.path.getsize(data_file)}
+    days = history_dates(dates)
+    rng = random.Random(args.seed)
+    results = []
+
+    # 起動直後の初回読み込み（ファイル全体のJSONの解析）
+    results.append(summarize(
+        "data.load_cold", measure(lambda i: DataManager(data_file).warm(), args.repeat, args.budget), **params
+    ))
+
+    manager = DataManager(data_file)
+    manager.warm()
+    picks = [rng.choice(days) for _ in range(args.repeat)]
+    results.append(summarize(
+        "data.get_responses_for_date",
+        measure(lambda i: manager.get_responses_for_date(picks[i]), args.repeat, args.budget),
+        **params
+    ))
+    # 日付ごとの集計のキャッシュ（MAX_AGGREGATES件）に載らない日付を含む場合と、同じ日付を繰り返す場合
+    results.append(summarize(
+        "data.get_summary",
+        measure(lambda i: manager.get_summary(picks[i]), args.repeat, args.budget),
+        **params
+    ))
+    results.append(summarize(
+        "data.get_summary_cached",
+        measure(lambda i: manager.get_summary(days[-1]), args.repeat, args.budget),
+        **params
+    ))
+    # 既存ユーザーの回答の更新（直近の日付、毎回ファイル全体を書き直す）
+    results.append(summarize(
+        "data.save_response",
+        measure(
+            lambda i: manager.save_response(_USER_ID_BASE + i % users, days[-1], i % 2 == 0, "20:00", "22:00"),
+            args.repeat,
+            args.budget
+        ),
+        **params
+    ))
+    os.remove(data_file)
+    return results
+
+
+async def bench_scheduler(workdir: str, dates: int, args) -> List[dict]:
+    """Schedulerの定期チェックと日付ごとの送信判定（予約はdates件）"""
+    params = {"dates": dates, "scheduled_sends": dates}
+    days = history_dates(dates)
+    rng = random.Random(args.seed)
+    # 計測中に送信時刻にならないよう、現在時刻から離れた時刻を送信・集計時刻にする
+    now = datetime.now(JST)
+    away = f"{(now.hour + 12) % 24:02d}:{now.minute:02d}"
+    scheduler = Scheduler(
+        {"weekdays": [4, 5], "send_before_holidays": True, "send_time": away, "summary_time": away},
+        holiday_manager=HolidayManager(os.path.join(workdir, f"scheduler-holidays-{dates}.json"))
+    )
+    send_time = scheduler.send_time
+    scheduler.scheduled_sends = [(day, send_time) for day in days]
+
+    async def noop(_):
+        return None
+
+    scheduler.set_send_callback(noop)
+    scheduler.set_summary_callback(noop)
+
+    results = []
+    results.append(summarize(
+        "scheduler.check_and_send",
+        await measure_async(lambda i: scheduler.check_and_send(), args.repeat, args.budget),
+        **params
+    ))
+    # 祝前日判定は日付ごとにキャッシュされるため、同じ日付を選んだ2回目以降はキャッシュから返る
+    picks = [rng.choice(days).replace(tzinfo=None) for _ in range(args.repeat)]
+    results.append(summarize(
+        "scheduler.check_schedule_for_date",
+        measure(lambda i: scheduler.check_schedule_for_date(picks[i]), args.repeat, args.budget),
+        **params
+    ))
+    return results
+
+
+def bench_holidays(workdir: str, dates: int, args) -> List[dict]:
+    """HolidayManagerの検索（履歴のdates日の範囲から日付を選ぶ）"""
+    params = {"dates": dates}
+    manager = HolidayManager(os.path.join(workdir, f"holidays-{dates}.json"))
+    days = history_dates(dates)
+    rng = random.Random(args.seed)
+    picks = [rng.choice(days) for _ in range(args.repeat)]
+    month = timedelta(days=30)
+    results = []
+    # 起動直後（holidays.jsonの読み込みと年ごとのインデックスの作成を含む）の初回の検索
+    results.append(summarize(
+        "holidays.index_cold",
+        measure(lambda i: HolidayManager(manager.holidays_file).is_holiday(picks[i]), args.repeat, args.budget),
+        **params
+    ))
+    manager.warm(range(days[0].year, days[-1].year + 2))
+    for name, lookup in (
+        ("holidays.is_holiday", lambda i: manager.is_holiday(picks[i])),
+        ("holidays.get_holiday_before_date", lambda i: manager.get_holiday_before_date(picks[i])),
+        ("holidays.get_next_holiday", lambda i: manager.get_next_holiday(picks[i])),
+        ("holidays.get_holidays_in_range", lambda i: manager.get_holidays_in_range(picks[i], picks[i] + month)),
+        ("holidays.get_holiday_blocks", lambda i: manager.get_holiday_blocks(picks[i], picks[i] + month)),
+    ):
+        results.append(summarize(name, measure(lookup, args.repeat, args.budget), **params))
+    return results
+
+
+def environment() -> dict:
+    """結果の比較に必要な実行環境の情報"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "timestamp": datetime.now(JST).isoformat(timespec="seconds"),
+    }
+
+
+def result_key(result: dict) -> tuple:
+    """ベースラインとの対応付けに使うキー（ベンチマーク名と規模）"""
+    return (result["benchmark"], result.get("users"), result.get("dates"))
+
+
+def compare(results: List[dict], baseline_path: str, threshold: float) -> List[dict]:
+    """
+    ベースラインと中央値を比較
+
+    Returns:
+        threshold倍を超えて遅くなった項目（benchmark, users, dates, baseline_us, current_us, ratio）
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {result_key(result): result for result in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result_key(result))
+        if previous is None or previous["median_us"] <= 0:
+            continue
+        ratio = result["median_us"] / previous["median_us"]
+        result["baseline_median_us"] = previous["median_us"]
+        result["ratio"] = round(ratio, 3)
+        if ratio > threshold:
+            regressions.append({
+                "benchmark": result["benchmark"],
+                "users": result.get("users"),
+                "dates": result.get("dates"),
+                "baseline_us": previous["median_us"],
+                "current_us": result["median_us"],
+                "ratio": round(ratio, 3),
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DataManager・Scheduler・HolidayManagerのマイクロベンチマーク")
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 500, 5000], help="1日あたりの回答ユーザー数")
+    parser.add_argument("--dates", type=int, nargs="+", default=[30, 300, 3000], help="履歴の日付数")
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=list(GROUPS), help="実行するグループ")
+    parser.add_argument("--repeat", type=int, default=200, help="1項目あたりの最大実行回数")
+    parser.add_argument("--budget", type=float, default=2.0, help="1項目あたりの目安の時間（秒、3回以上で打ち切る）")
+    parser.add_argument(
+        "--max-responses",
+        type=int,
+        default=200_000,
+        help="DataManagerで計測する回答数（ユーザー数×日付数）の上限（超える組み合わせはskippedに記録）"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="合成データの乱数のseed")
+    parser.add_argument("--output", help="結果のJSONの保存先（省略時は標準出力のみ）")
+    parser.add_argument("--baseline", help="比較する以前の結果のJSON")
+    parser.add_argument("--threshold", type=float, default=1.2, help="回帰とみなす中央値の比（--baseline時）")
+    args = parser.parse_args()
+
+    results: List[dict] = []
+    skipped: List[dict] = []
+    with tempfile.TemporaryDirectory(prefix="bench_core_") as workdir:
+        if "data" in args.only:
+            for users in args.users:
+                for dates in args.dates:
+                    if users * dates > args.max_responses:
+                        skipped.append({"group": "data", "users": users, "dates": dates, "reason": "max_responses"})
+                        continue
+                    results.extend(bench_data(workdir, users, dates, args))
+        if "scheduler" in args.only:
+            for dates in args.dates:
+                results.extend(asyncio.run(bench_scheduler(workdir, dates, args)))
+        if "holidays" in args.only:
+            for dates in args.dates:
+                results.extend(bench_holidays(workdir, dates, args))
+
+    report = {
+        "environment": environment(),
+        "parameters": {
+            "users": args.users,
+            "dates": args.dates,
+            "repeat": args.repeat,
+            "budget": args.budget,
+            "max_responses": args.max_responses,
+            "seed": args.seed,
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+    regressions = []
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold)
+        report["regressions"] = regressions
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+MessageDispatcherのベンチマーク
+
+DiscordのAPIを模したローカルの偽HTTP層（チャンネルごとのバケットと全体の上限を持ち、
+超えると429を返す）に対して送信し、持続的な送信レートと429の発生回数を計測します。
+
+使い方:
+    python benchmarks/bench_dispatcher.py --channels 20 --messages 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.dispatcher import PRIORITY_ANALYTICS, PRIORITY_QUESTION, MessageDispatcher  # noqa: E402
+
+
+class FakeRateLimited(Exception):
+    """偽HTTP層が返す429"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"429 Too Many Requests (retry_after={retry_after:.2f}s)")
+        self.status = 429
+        self.retry_after = retry_after
+
+
+class FakeDiscordHTTP:
+    """チャンネルごとのバケット（per秒あたりlimit件）と全体の上限を模した偽HTTP層"""
+
+    def __init__(self, bucket_limit: int, bucket_per: float, global_limit: int, latency: float):
+        self.bucket_limit = bucket_limit
+        self.bucket_per = bucket_per
+        self.global_limit = global_limit
+        self.latency = latency
+        self._buckets = {}
+        self._global = deque()
+        self.requests = 0
+        self.rate_limited = 0
+
+    @staticmethod
+    def _check(window: deque, limit: int, per: float, now: float):
+        while window and window[0] <= now - per:
+            window.popleft()
+        if len(window) >= limit:
+            return window[0] + per - now
+        return None
+
+    async def send(self, channel_id: int):
+        self.requests += 1
+        now = time.monotonic()
+        bucket = self._buckets.setdefault(channel_id, deque())
+        retry_after = (self._check(bucket, self.bucket_limit, self.bucket_per, now)
+                       or self._check(self._global, self.global_limit, 1.0, now))
+        if retry_after is not None:
+            self.rate_limited += 1
+            raise FakeRateLimited(retry_after)
+        bucket.append(now)
+        self._global.append(now)
+        await asyncio.sleep(self.latency)
+        return {"channel_id": channel_id}
+
+
+async def run_direct(http: FakeDiscordHTTP, channels: int, messages: int) -> dict:
+    """調整なしで一斉に送信（429になったらretry_afterだけ待って再送）"""
+
+    async def send(channel_id: int):
+        while True:
+            try:
+                return await http.send(channel_id)
+            except FakeRateLimited as e:
+                await asyncio.sleep(e.retry_after)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(c) for c in range(channels) for _ in range(messages)))
+    return {"seconds": time.perf_counter() - started}
+
+
+async def run_dispatcher(http: FakeDiscordHTTP, channels: int, messages: int, concurrency: int,
+                         bucket_limit: int, bucket_per: float, global_limit: int) -> dict:
+    """MessageDispatcher経由で送信（半分は質問、半分は優先度の低い更新）"""
+    dispatcher = MessageDispatcher(
+        max_concurrency=concurrency,
+        max_retries=100,
+        bucket_limit=bucket_limit,
+        bucket_per=bucket_per,
+        global_per_second=global_limit
+    )
+    started = time.perf_counter()
+    futures = [
+        dispatcher.submit(c, lambda c=c: http.send(c), PRIORITY_QUESTION if i % 2 == 0 else PRIORITY_ANALYTICS)
+        for c in range(channels) for i in range(messages)
+    ]
+    await asyncio.gather(*futures)
+    return {"seconds": time.perf_counter() - started, "retries": dispatcher.retries}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="MessageDispatcherのベンチマーク")
+    parser.add_argument("--channels", type=int, default=20, help="送信先チャンネル数")
+    parser.add_argument("--messages", type=int, default=10, help="チャンネルあたりの送信数")
+    parser.add_argument("--concurrency", type=int, default=5, help="ディスパッチャーの同時送信数")
+    parser.add_argument("--bucket-limit", type=int, default=5, help="チャンネルごとのバケットの上限件数")
+    parser.add_argument("--bucket-per", type=float, default=1.0, help="バケットの期間（秒）")
+    parser.add_argument("--global-limit", type=int, default=50, help="全体の1秒あたりの上限件数")
+    parser.add_argument("--latency", type=float, default=0.02, help="1リクエストの応答時間（秒）")
+    args = parser.parse_args()
+
+    results = {}
+    for name in ("direct", "dispatcher"):
+        http = FakeDiscordHTTP(args.bucket_limit, args.bucket_per, args.global_limit, args.latency)
+        if name == "direct":
+            result = await run_direct(http, args.channels, args.messages)
+        else:
+            result = await run_dispatcher(http, args.channels, args.messages, args.concurrency,
+                                          args.bucket_limit, args.bucket_per, args.global_limit)
+        total = args.channels * args.messages
+        result.update({
+            "messages": total,
+            "messages_per_second": round(total / result["seconds"], 2),
+            "requests": http.requests,
+            "rate_limited": http.rate_limited,
+        })
+        result["seconds"] = round(result["seconds"], 3)
+        results[name] = result
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
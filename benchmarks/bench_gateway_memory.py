@@ -0,0 +1,122 @@
+"""
+Gatewayキャッシュのメモリ使用量のベンチマーク
+
+Discordに接続せず、合成したGUILD_CREATE / MESSAGE_CREATEイベントをdiscord.pyの
+ConnectionStateに直接流し込み、通常モードと省メモリモード（LEAN_GATEWAY）の
+RSSの増加量を比較します。モードごとに別プロセスで計測します。
+
+使い方:
+    python benchmarks/bench_gateway_memory.py --guilds 200 --channels 50
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.memory import get_rss_bytes  # noqa: E402
+
+
+def _guild_payload(guild_id: int, channels: int, members: int, emojis: int) -> dict:
+    return {
+        "id": str(guild_id),
+        "name": f"guild-{guild_id}",
+        "owner_id": "1",
+        "member_count": members,
+        "roles": [{
+            "id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0,
+            "color": 0, "hoist": False, "managed": False, "mentionable": False,
+        }],
+        "channels": [
+            {"id": str(guild_id * 1000 + c), "type": 0, "name": f"channel-{c}", "position": c,
+             "permission_overwrites": [], "flags": 0}
+            for c in range(channels)
+        ],
+        "members": [
+            {"user": {"id": str(guild_id * 10000 + m), "username": f"user-{m}", "discriminator": "0", "avatar": None},
+             "roles": [], "flags": 0, "joined_at": "2024-01-01T00:00:00+00:00"}
+            for m in range(members)
+        ],
+        "emojis": [
+            {"id": str(guild_id * 1000 + e), "name": f"emoji{e}", "roles": [], "require_colons": True,
+             "managed": False, "animated": False, "available": True}
+            for e in range(emojis)
+        ],
+        "stickers": [],
+    }
+
+
+def _message_payload(message_id: int, guild_id: int) -> dict:
+    return {
+        "id": str(message_id), "channel_id": str(guild_id * 1000), "guild_id": str(guild_id),
+        "author": {"id": str(guild_id * 10000), "username": "user", "discriminator": "0", "avatar": None},
+        "content": "x" * 500, "timestamp": "2024-01-01T00:00:00+00:00", "edited_timestamp": None,
+        "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+        "embeds": [], "pinned": False, "type": 0, "flags": 0,
+    }
+
+
+async def measure(lean: bool, args) -> dict:
+    """1つのモードでキャッシュを埋め、RSSの増加量を計測"""
+    from discord.ext import commands
+    from utils.gateway import build_bot_options
+
+    bot = commands.Bot(command_prefix="!", **build_bot_options(lean))
+    await bot._async_setup_hook()
+    state = bot._connection
+    gc.collect()
+    baseline = get_rss_bytes()
+
+    message_id = 1
+    for index in range(args.guilds):
+        guild_id = 10 ** 6 + index
+        state.parse_guild_create(_guild_payload(guild_id, args.channels, args.members, args.emojis))
+        # guild_messages Intentがある場合に届くメッセージ（省メモリモードでは届かない）
+        if state._intents.guild_messages:
+            for _ in range(args.messages):
+                message_id += 1
+                state.parse_message_create(_message_payload(message_id, guild_id))
+    gc.collect()
+    rss = get_rss_bytes()
+    return {
+        "mode": "lean" if lean else "default",
+        "guilds": len(bot.guilds),
+        "cached_users": len(bot.users),
+        "cached_messages": len(bot.cached_messages),
+        "cached_emojis": len(bot.emojis),
+        "rss_mib": round(rss / 2 ** 20, 1),
+        "growth_mib": round((rss - baseline) / 2 ** 20, 1),
+        "kib_per_guild": round((rss - baseline) / 1024 / max(args.guilds, 1), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gatewayキャッシュのメモリ使用量のベンチマーク")
+    parser.add_argument("--guilds", type=int, default=200, help="ギルド数")
+    parser.add_argument("--channels", type=int, default=50, help="ギルドあたりのチャンネル数")
+    parser.add_argument("--members", type=int, default=100, help="GUILD_CREATEに含まれるメンバー数")
+    parser.add_argument("--emojis", type=int, default=50, help="ギルドあたりの絵文字数")
+    parser.add_argument("--messages", type=int, default=20, help="ギルドあたりの受信メッセージ数")
+    parser.add_argument("--mode", choices=["default", "lean"], help="（内部用）このプロセスで計測するモード")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(asyncio.run(measure(args.mode == "lean", args))))
+        return
+
+    results = []
+    for mode in ("default", "lean"):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--mode", mode] + sys.argv[1:],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
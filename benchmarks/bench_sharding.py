@@ -0,0 +1,127 @@
+"""
+シャード分割（マルチプロセス）のスループットのベンチマーク
+
+Discordに接続せず、偽のGatewayが全ギルド分の回答イベント（ボタン操作）を生成します。
+ShardCoordinatorがワーカープロセスを起動し、各ワーカーは担当シャードのギルドの
+イベントだけを受け取り、担当シャード用のデータディレクトリに回答を保存して集計を作り直します。
+ワーカー数ごとに全イベントの処理にかかった時間を計測します。
+
+使い方:
+    python benchmarks/bench_sharding.py --guilds 64 --events 4000 --shard-count 8 --workers 1 2 4
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.sharding import ShardConfig, ShardCoordinator, shard_for_guild  # noqa: E402
+
+# Discordのスノーフレーク（タイムスタンプ部分がシャードの割り当てに使われる）
+_SNOWFLAKE_BASE = 1_000_000_000_000_000_000
+
+
+def fake_gateway_events(guilds: int, events: int, shard_count: int, seed: int = 0):
+    """
+    全ギルド分の回答イベントを生成（同じseedなら全ワーカーで同じ列になる）
+
+    Yields:
+        (シャード番号, ギルドID, ユーザーID, 参加可否, 開始時刻)
+    """
+    rng = random.Random(seed)
+    guild_ids = [_SNOWFLAKE_BASE + (index << 22) + rng.randrange(1 << 22) for index in range(guilds)]
+    for _ in range(events):
+        guild_id = rng.choice(guild_ids)
+        user_id = guild_id + rng.randrange(200)
+        can_attend = rng.random() < 0.7
+        start_time = f"{rng.choice([20, 21, 22, 23])}:{rng.choice(['00', '30'])}" if can_attend else None
+        yield shard_for_guild(guild_id, shard_count), guild_id, user_id, can_attend, start_time
+
+
+def run_worker(args) -> dict:
+    """担当シャードのイベントを処理（コーディネーターから起動されたワーカー）"""
+    from utils.data_manager import DataManager
+    from utils.summary_renderer import render_summary_pages
+
+    shard_config = ShardConfig.from_env()
+    data_manager = DataManager(shard_config.data_path(os.path.join(args.data_dir, "responses.json")))
+    base_date = datetime(2024, 1, 1)
+    handled = 0
+    started = time.perf_counter()
+    for shard_id, guild_id, user_id, can_attend, start_time in fake_gateway_events(
+        args.guilds, args.events, shard_config.shard_count
+    ):
+        if shard_id not in shard_config.shard_ids:
+            continue
+        # ギルドごとに日付を分けて、ギルド単位の集計を模す
+        date = base_date + timedelta(days=guild_id % 30)
+        data_manager.save_response(user_id, date, can_attend, start_time, None)
+        render_summary_pages(data_manager.get_summary(date))
+        handled += 1
+    seconds = time.perf_counter() - started
+    return {
+        "worker": shard_config.worker_index,
+        "shards": shard_config.shard_ids,
+        "events": handled,
+        "seconds": round(seconds, 3),
+    }
+
+
+def run_workers(args, workers: int) -> dict:
+    """ワーカー数を指定してコーディネーター経由で全イベントを処理"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        command = [
+            sys.executable, os.path.abspath(__file__), "--worker",
+            "--guilds", str(args.guilds), "--events", str(args.events), "--data-dir", data_dir,
+        ]
+        coordinator = ShardCoordinator(command, args.shard_count, workers, restart=False)
+        started = time.perf_counter()
+        coordinator.run(interval=0.05)
+        elapsed = time.perf_counter() - started
+
+        results = []
+        for name in sorted(os.listdir(data_dir)):
+            result_file = os.path.join(data_dir, name, "result.json")
+            if os.path.exists(result_file):
+                with open(result_file, "r", encoding="utf-8") as f:
+                    results.append(json.load(f))
+    events = sum(result["events"] for result in results)
+    return {
+        "workers": len(coordinator.assignments),
+        "shard_count": args.shard_count,
+        "events": events,
+        "wall_seconds": round(elapsed, 3),
+        "events_per_second": round(events / elapsed, 1),
+        "per_worker": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="シャード分割のスループットのベンチマーク")
+    parser.add_argument("--guilds", type=int, default=64, help="ギルド数")
+    parser.add_argument("--events", type=int, default=4000, help="全ギルド合計の回答イベント数")
+    parser.add_argument("--shard-count", type=int, default=8, help="シャード数")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="比較するワーカー数")
+    parser.add_argument("--worker", action="store_true", help="（内部用）ワーカーとして実行")
+    parser.add_argument("--data-dir", help="（内部用）ワーカーのデータディレクトリ")
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args)
+        shard_config = ShardConfig.from_env()
+        result_file = shard_config.data_path(os.path.join(args.data_dir, "result.json"))
+        with open(result_file, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    results = [run_workers(args, workers) for workers in args.workers]
+    print(json.dumps({"cpu_count": os.cpu_count(), "results": results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
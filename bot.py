@@ -1,116 +1,302 @@
 """Discordボットメインファイル"""
+import sys
+
+if __name__ == "__main__":
+    # .envファイルを読み込む（ローカル環境向け。プロセス全体でここの1回だけ）
+    # ログはキュー経由でバックグラウンドスレッドから出力する（.envのLOG_LEVEL / LOG_FORMATも反映するため先に読み込む）
+    from dotenv import load_dotenv
+    from utils.log import setup_logging
+    load_dotenv()
+    setup_logging()
+    # --workers指定時はコーディネーターとしてワーカーを起動する（自身はdiscord.pyを読み込まない）
+    # run-once時は送信対象外ならdiscord.pyを読み込む前に終了する（ログインもしない）
+    from utils.cli import exit_if_nothing_to_do, run_coordinator_if_requested
+    run_coordinator_if_requested(sys.argv[1:], __file__)
+    exit_if_nothing_to_do(sys.argv[1:])
+
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
-import json
 import os
+import io
+import math
 import asyncio
-import argparse
-from datetime import datetime, time
+import signal
+from datetime import datetime, time, timedelta
+from time import monotonic, perf_counter
 import pytz
-from dotenv import load_dotenv
-from utils.scheduler import Scheduler
+from utils.scheduler import DEFAULT_STATE_FILE, Scheduler
 from utils.data_manager import DataManager
-from utils.holidays import HolidayManager
-import threading
-from http.server import BaseHTTPRequestHandler, HTTPServer
-
-# .envファイルを読み込む（ローカル環境向け）
-load_dotenv()
-
-
-# Botの設定を読み込み
-def load_config():
-    """設定ファイルを読み込む（環境変数優先）"""
-    # 環境変数から読み込む（.envファイルまたはRailway等のクラウド環境向け）
-    discord_token = os.environ.get("DISCORD_TOKEN")
-    if discord_token:
-        config = {
-            "token": discord_token,
-            "guild_id": os.environ.get("GUILD_ID", ""),
-            "channel_id": os.environ.get("CHANNEL_ID", ""),
-            "auto_send_channel_id": os.environ.get("AUTO_SEND_CHANNEL_ID", ""),
-            "send_time": os.environ.get("SEND_TIME", "19:00"),
-            "summary_time": os.environ.get("SUMMARY_TIME", "22:00"),
-            "weekdays": json.loads(os.environ.get("WEEKDAYS", "[4,5]")),
-            "send_before_holidays": os.environ.get("SEND_BEFORE_HOLIDAYS", "true").lower() == "true"
-        }
-        return config
-    
-    # 設定ファイルから読み込む（ローカル環境向け）
-    config_path = "config.json"
-    if os.path.exists(config_path):
-        with open(config_path, "r", encoding="utf-8") as f:
-            config_data = json.load(f)
-            # summary_timeが存在しない場合はデフォルト値を設定
-            if "summary_time" not in config_data:
-                config_data["summary_time"] = "22:00"
-            return config_data
-    else:
-        # 環境変数も設定ファイルもない場合はエラー
-        raise ValueError(
-            "設定が見つかりません。環境変数DISCORD_TOKENを設定するか、"
-            "config.jsonファイルを作成してください。"
+from utils.response_writer import ResponseWriter
+from utils.live_summary import LiveSummaryUpdater
+from utils.fanout import fan_out
+from utils.channel_resolver import ChannelResolver
+from utils.dispatcher import PRIORITY_ANALYTICS, PRIORITY_QUESTION, PRIORITY_SUMMARY, MessageDispatcher
+from utils.summary_renderer import SummaryPageCache, format_time_display, render_summary_pages
+from utils.holidays import get_holiday_manager
+from utils.holiday_import import parse_holiday_file
+from utils.config_store import ConfigStore, load_config
+from utils.command_sync import CommandSyncState, fingerprint_commands
+from utils.startup import StartupPipeline
+from utils.send_ledger import SendLedger
+from utils.cli import build_arg_parser, should_send_run_once
+from utils.memory import MemoryReporter, format_bytes
+from utils.gateway import build_bot_options
+from utils.sharding import ShardConfig, schedule_guild_id
+from utils.leader import LeaderLease
+from utils.metrics import get_registry
+from utils.instrumentation import get_instrumentation, timed
+from utils.health import HealthServer
+from utils.diagnostics import LoopDiagnostics
+from utils.log import get_logger
+
+# サブシステムごとのロガー（出力先と形式はsetup_loggingで設定）
+logger = get_logger("main")
+gateway_logger = get_logger("gateway")
+startup_logger = get_logger("startup")
+shard_logger = get_logger("shard")
+sync_logger = get_logger("commands.sync")
+command_logger = get_logger("commands")
+scheduler_logger = get_logger("scheduler")
+send_logger = get_logger("send")
+run_once_logger = get_logger("run_once")
+live_summary_logger = get_logger("live_summary")
+holiday_logger = get_logger("holidays")
+
+
+# 終了時に受け付け済みの回答の書き込みを待つ上限（秒、Cloud Runの猶予10秒に収まるように）
+SHUTDOWN_FLUSH_TIMEOUT = 8.0
+# /show_summaryで回答の書き込みを待つ上限（秒、インタラクションの応答期限3秒に収まるように）
+COMMAND_FLUSH_TIMEOUT = 2.0
+
+
+async def flush_responses(timeout: float) -> bool:
+    """
+    受け付け済みの回答の書き込み（ResponseWriter）が終わるのを待つ
+    
+    Args:
+        timeout: 待つ上限（秒）
+        
+    Returns:
+        すべて書き込めた場合True
+    """
+    try:
+        await asyncio.wait_for(response_writer.flush(), timeout=timeout)
+        return True
+    except asyncio.TimeoutError:
+        logger.warning(
+            f"回答の書き込みが{timeout}秒以内に完了しませんでした（残り{response_writer.pending_count}人分）",
+            extra={"pending": response_writer.pending_count}
         )
+        return False
+
+
+class FlushOnCloseMixin:
+    """切断の前に、受け付け済みの回答の書き込みが終わるのを待つ（SIGTERM・run-onceの終了時も含む）"""
+    
+    async def close(self):
+        await flush_responses(SHUTDOWN_FLUSH_TIMEOUT)
+        await super().close()
+
+
+class AttendanceBot(FlushOnCloseMixin, commands.Bot):
+    pass
+
 
+class ShardedAttendanceBot(FlushOnCloseMixin, commands.AutoShardedBot):
+    pass
 
-# Intentsの設定
-intents = discord.Intents.default()
-# intents.message_content = True  # 必要に応じてDiscord Developer Portalで有効化してください（スラッシュコマンドのみの場合は不要）
-# intents.members = True  # 必要に応じてDiscord Developer Portalで有効化してください
 
 # Botの初期化
 config = load_config()
-bot = commands.Bot(command_prefix="!", intents=intents)
+# シャード分割（コーディネーターから起動された場合は環境変数SHARD_COUNT / SHARD_IDSで担当シャードが決まる）
+shard_config = ShardConfig.from_env()
+if shard_config is not None:
+    bot = ShardedAttendanceBot(
+        command_prefix="!",
+        shard_ids=shard_config.shard_ids,
+        shard_count=shard_config.shard_count,
+        **build_bot_options(config.get("lean_gateway", False))
+    )
+    shard_logger.info(f"{shard_config} を担当します（データ: {shard_config.data_path('data/')}）")
+else:
+    bot = AttendanceBot(command_prefix="!", **build_bot_options(config.get("lean_gateway", False)))
+# メモリ使用量の計測（起動時と定期的にRSSと上限までの余裕をログに出力）
+memory_reporter = MemoryReporter()
+# 診断モード（DIAGNOSTICS=true または --diagnostics の場合に__main__で作成し、setup_hookで開始）
+diagnostics = None
+
+
+
+def shard_data_path(path: str) -> str:
+    """データファイルのパスを取得（シャード分割時は担当シャードごとのディレクトリ）"""
+    return shard_config.data_path(path) if shard_config is not None else path
+
 
-# ユーティリティの初期化
-scheduler = Scheduler(config)
-data_manager = DataManager()
-holiday_manager = HolidayManager()
+def owns_schedule() -> bool:
+    """
+    このプロセスがスケジュール送信とコマンド同期を担当するかどうか
+    
+    シャード分割時は、guild_idのギルドを担当するプロセスだけが担当します。複数のプロセスが同じ質問を
+    二重に送信しないようにするためと、ボタンへの回答が届くプロセスで集計するためです
+    （guild_id未設定時はどのプロセスも担当せず、起動時にエラーで終了します）。
+    """
+    if shard_config is None:
+        return True
+    guild_id = schedule_guild_id(config)
+    return guild_id is not None and shard_config.owns_guild(guild_id)
+
+
+# シャード分割の有効化やシャード構成の変更前のデータを、スケジュール担当のプロセスのディレクトリに引き継ぐ
+if shard_config is not None and owns_schedule():
+    for source, target in shard_config.migrate_data(["data/responses.json", "data/send_ledger.json", DEFAULT_STATE_FILE]):
+        shard_logger.warning(
+            f"シャード構成が変わったため、{source} を {target} にコピーしました（以降は {target} に保存します）",
+            extra={"source": source, "target": target}
+        )
+
+# ユーティリティの初期化（祝日データはプロセス全体で1つのインスタンスを共有、シャード間でも共有）
+holiday_manager = get_holiday_manager(use_builtin=config.get("use_builtin_holidays", True))
+# 複数レプリカ（LEADER_LEASE_PATH設定時）はdata/を共有ボリュームに置き、回答と予約・送信済みの時刻を共有する
+shared_data = bool(config.get("leader_lease_path"))
+scheduler = Scheduler(config, holiday_manager, state_file=shard_data_path(DEFAULT_STATE_FILE), shared_state=shared_data)
+# スケジューラーのリーダー選出（LEADER_LEASE_PATH設定時のみ。複数レプリカのうちリーダーだけが送信・集計する）
+leader_lease = None
+if shared_data:
+    leader_lease = LeaderLease(config["leader_lease_path"], ttl=float(config.get("leader_lease_ttl", 30)))
+    scheduler.set_leader_check(lambda: leader_lease.is_leader)
+data_manager = DataManager(shard_data_path("data/responses.json"), shared=shared_data)
+# 回答の保存（応答を先に返し、書き込みはユーザーごとに順序を保ってバックグラウンドで行う）
+response_writer = ResponseWriter(data_manager)
+# 質問メッセージの送信記録（集計結果送信用、run-onceの送信・集計フェーズ間の引き継ぎにも使用）
+send_ledger = SendLedger(shard_data_path("data/send_ledger.json"))
+# Discordへの送信（チャンネルごとのキューでレート制限に合わせて送信、質問を優先）
+dispatcher = MessageDispatcher()
+# config.jsonへの保存（環境変数が設定されている場合は保存しない）
+config_store = ConfigStore("config.json", enabled=not os.environ.get("DISCORD_TOKEN"))
 
 def create_scheduler_task():
     """スケジューラータスクを作成"""
     @tasks.loop(minutes=1)
     async def scheduler_task():
-        """定期メッセージ送信タスク"""
-        await scheduler.check_and_send()
-        # 集計結果送信チェック
-        await scheduler.check_and_send_summary()
+        """定期メッセージ送信タスク（送信・集計結果送信チェック）"""
+        await scheduler.tick()
+    
+    @scheduler_task.before_loop
+    async def before_scheduler_task():
+        """Discordの準備が完了するまで最初のチェックを待つ"""
+        await bot.wait_until_ready()
     return scheduler_task
 
+def create_leader_heartbeat_task():
+    """リーダーのリースを取得・延長するタスクを作成（TTLの1/3ごと）"""
+    @tasks.loop(seconds=leader_lease.ttl / 3)
+    async def leader_heartbeat_task():
+        was_leader = leader_lease.is_leader
+        is_leader = await asyncio.to_thread(leader_lease.renew)
+        if is_leader and not was_leader:
+            # 前のリーダーが停止してからリースが切れるまで（最大でTTL+延長間隔、加えて最後のtickから1分）の
+            # 送信・集計を、次の定期チェックを待たずに補う（送信済みの分は共有の状態ファイルで判定）
+            catch_up_since = datetime.now(pytz.timezone("Asia/Tokyo")) - timedelta(seconds=leader_lease.ttl * 2 + 60)
+            scheduler.request_tick(since=catch_up_since)
+    
+    @leader_heartbeat_task.before_loop
+    async def before_leader_heartbeat_task():
+        """Discordに接続するまではリースを取得しない（引き継いだ直後の送信に備える）"""
+        await bot.wait_until_ready()
+    return leader_heartbeat_task
+
+
+leader_heartbeat_task = create_leader_heartbeat_task() if leader_lease is not None else None
+
+
+def gateway_cache_details() -> dict:
+    """メモリ計測のログに添えるキャッシュの件数"""
+    return {
+        "guilds": len(bot.guilds),
+        "channels": sum(len(guild.channels) for guild in bot.guilds),
+        "users": len(bot.users),
+        "messages": len(bot.cached_messages),
+    }
+
+
+def create_memory_report_task():
+    """メモリ使用量の定期計測タスクを作成"""
+    @tasks.loop(minutes=float(config.get("memory_report_minutes", 30)))
+    async def memory_report_task():
+        memory_reporter.report("定期計測", **gateway_cache_details())
+    
+    @memory_report_task.before_loop
+    async def before_memory_report_task():
+        await bot.wait_until_ready()
+    return memory_report_task
+
+
+memory_report_task = create_memory_report_task()
+
+
 # スケジューラータスクの初期化
+# 設定変更はScheduler.apply_configで即座に反映されるため、タスクの再起動は不要
 scheduler_task = create_scheduler_task()
 
-async def restart_scheduler():
-    """スケジューラーを再起動（設定変更時に呼び出す）"""
-    global scheduler_task
-    if scheduler_task and scheduler_task.is_running():
-        scheduler_task.cancel()
-        # タスクが完全に停止するまで待機
-        while scheduler_task.is_running():
-            await asyncio.sleep(0.1)
-    scheduler_task = create_scheduler_task()
-    scheduler_task.start()
-    print("[スケジューラー] スケジューラーを再起動しました")
-
-
-async def sync_commands(force_guild_only: bool = False):
-    """コマンドを同期（サーバー限定とグローバルの両方を試す）"""
+
+# 前回同期したコマンドツリーのハッシュ値（同期先ごと）
+command_sync_state = CommandSyncState(shard_data_path("data/command_sync.json"))
+
+
+def get_command_sync_scope() -> str:
+    """コマンド同期先を表すキーを取得（アプリケーションIDとギルドIDの組み合わせ）"""
+    guild_id = config.get("guild_id")
+    target = f"guild:{str(guild_id).strip()}" if guild_id and str(guild_id).strip() else "global"
+    return f"{bot.application_id}:{target}"
+
+
+def compute_command_fingerprint() -> str:
+    """現在のコマンドツリーをシリアライズしてハッシュ値を算出"""
+    payloads = [cmd.to_dict(bot.tree) for cmd in bot.tree.get_commands()]
+    guild_id = config.get("guild_id")
+    if guild_id and str(guild_id).strip():
+        try:
+            guild = discord.Object(id=int(guild_id))
+            payloads.extend(cmd.to_dict(bot.tree) for cmd in bot.tree.get_commands(guild=guild))
+        except (ValueError, TypeError):
+            pass
+    return fingerprint_commands(payloads)
+
+
+def is_command_sync_needed() -> bool:
+    """コマンドツリーが前回の同期から変わっているかどうか"""
+    return not command_sync_state.is_synced(get_command_sync_scope(), compute_command_fingerprint())
+
+
+async def sync_commands(force_guild_only: bool = False, force: bool = False):
+    """
+    コマンドを同期（サーバー限定とグローバルの両方を試す）
+    
+    Args:
+        force_guild_only: サーバー限定同期を優先する
+        force: Trueの場合はコマンドツリーのハッシュ値が前回と同じでも同期する
+    """
     try:
         guild_id = config.get("guild_id")
         synced_commands = []
         
+        # コマンドツリーが前回の同期から変わっていなければHTTP呼び出しを行わない
+        scope = get_command_sync_scope()
+        fingerprint = compute_command_fingerprint()
+        if not force and command_sync_state.is_synced(scope, fingerprint):
+            sync_logger.info(f"コマンド定義に変更がないため同期をスキップしました（{scope}）")
+            return {cmd.name for cmd in bot.tree.get_commands()}
+        
         # コマンドツリーに登録されているコマンドを確認
         all_commands_before = [cmd.name for cmd in bot.tree.get_commands()]
-        print(f"[コマンド同期] 同期前のコマンド一覧: {all_commands_before}")
+        sync_logger.info(f"同期前のコマンド一覧: {all_commands_before}")
         
         if not all_commands_before:
-            print(f"[コマンド同期] 警告: コマンドが定義されていません。待機してから再試行します。")
-            await asyncio.sleep(3)
-            all_commands_before = [cmd.name for cmd in bot.tree.get_commands()]
-            print(f"[コマンド同期] 再確認後のコマンド一覧: {all_commands_before}")
+            sync_logger.warning("コマンドが定義されていません。")
         
-        # Discord APIの準備を待つ
-        await asyncio.sleep(2)
+        # Discord APIの準備完了を待つ
+        await bot.wait_until_ready()
         
         # まずサーバー限定で同期（即座に反映）
         guild_sync_success = False
@@ -118,181 +304,238 @@ async def sync_commands(force_guild_only: bool = False):
         if guild_id and str(guild_id).strip():
             try:
                 guild = discord.Object(id=int(guild_id))
-                print(f"[コマンド同期] サーバー限定同期を開始します（guild_id: {guild_id}）")
+                sync_logger.info(f"サーバー限定同期を開始します（guild_id: {guild_id}）")
                 synced_guild = await bot.tree.sync(guild=guild)
                 guild_sync_count = len(synced_guild)
                 synced_commands.extend([cmd.name for cmd in synced_guild])
-                print(f"[コマンド同期] サーバー限定で {guild_sync_count} 個のコマンドを同期しました: {[cmd.name for cmd in synced_guild]}")
+                sync_logger.info(f"サーバー限定で {guild_sync_count} 個のコマンドを同期しました: {[cmd.name for cmd in synced_guild]}")
                 
                 # サーバー限定同期が成功した場合（1個以上同期された場合）
                 if guild_sync_count > 0:
                     guild_sync_success = True
-                    # サーバー限定同期が成功した場合、少し待つ
-                    await asyncio.sleep(1)
                 else:
-                    print(f"[コマンド同期] 警告: サーバー限定同期で0個のコマンドが返されました。グローバル同期を試行します。")
+                    sync_logger.warning("サーバー限定同期で0個のコマンドが返されました。グローバル同期を試行します。")
             except (ValueError, TypeError) as e:
-                print(f"[コマンド同期] サーバー限定コマンドの同期をスキップしました（guild_idが無効）: {e}")
+                sync_logger.info(f"サーバー限定コマンドの同期をスキップしました（guild_idが無効）: {e}")
             except Exception as e:
-                print(f"[コマンド同期] サーバー限定同期でエラーが発生しました: {e}")
-                import traceback
-                traceback.print_exc()
+                sync_logger.exception(f"サーバー限定同期でエラーが発生しました: {e}")
         
         # グローバル同期は、サーバー限定同期が失敗した場合、または0個の場合、またはforce_guild_onlyがFalseの場合のみ実行
         # サーバー限定同期が0個の場合は、force_guild_onlyに関係なくグローバル同期を試行
-        print(f"[コマンド同期] デバッグ: force_guild_only={force_guild_only}, guild_sync_success={guild_sync_success}, guild_sync_count={guild_sync_count}")
+        sync_logger.debug(f"force_guild_only={force_guild_only}, guild_sync_success={guild_sync_success}, guild_sync_count={guild_sync_count}")
         
         should_run_global = (not force_guild_only and (not guild_sync_success or guild_sync_count == 0)) or (force_guild_only and guild_sync_count == 0)
-        print(f"[コマンド同期] デバッグ: should_run_global={should_run_global}")
+        sync_logger.debug(f"should_run_global={should_run_global}")
         
+        global_sync_success = False
         if should_run_global:
             try:
                 if guild_sync_count == 0:
-                    print(f"[コマンド同期] グローバル同期を開始します（サーバー限定同期で0個のコマンドが返されたため）")
+                    sync_logger.info("グローバル同期を開始します（サーバー限定同期で0個のコマンドが返されたため）")
                 else:
-                    print(f"[コマンド同期] グローバル同期を開始します（サーバー限定同期が失敗したため）")
+                    sync_logger.info("グローバル同期を開始します（サーバー限定同期が失敗したため）")
                 synced_global = await bot.tree.sync()
                 synced_commands.extend([cmd.name for cmd in synced_global])
-                print(f"[コマンド同期] グローバルで {len(synced_global)} 個のコマンドを同期しました: {[cmd.name for cmd in synced_global]}")
+                global_sync_success = True
+                sync_logger.info(f"グローバルで {len(synced_global)} 個のコマンドを同期しました: {[cmd.name for cmd in synced_global]}")
             except Exception as e:
-                print(f"[コマンド同期] グローバル同期でエラーが発生しました: {e}")
-                import traceback
-                traceback.print_exc()
+                sync_logger.exception(f"グローバル同期でエラーが発生しました: {e}")
         elif force_guild_only and guild_sync_success:
-            print(f"[コマンド同期] サーバー限定同期のみを実行しました（グローバル同期はスキップ）")
+            sync_logger.info("サーバー限定同期のみを実行しました（グローバル同期はスキップ）")
         elif guild_sync_success:
-            print(f"[コマンド同期] サーバー限定同期が成功したため、グローバル同期はスキップしました（即座に反映されます）")
+            sync_logger.info("サーバー限定同期が成功したため、グローバル同期はスキップしました（即座に反映されます）")
         else:
-            print(f"[コマンド同期] デバッグ: 予期しない条件分岐に入りました")
+            sync_logger.debug("予期しない条件分岐に入りました")
         
         # 全コマンドの一覧を表示
         all_commands = set(synced_commands)
-        print(f"[コマンド同期] 同期された全コマンド（{len(all_commands)}個）: {sorted(all_commands)}")
+        sync_logger.info(f"同期された全コマンド（{len(all_commands)}個）: {sorted(all_commands)}")
+        
+        # 記録する同期先（guild_id設定時はサーバー限定、未設定時はグローバル）に同期できた場合だけハッシュ値を記録
+        # （次回起動時に変更がなければスキップ。サーバー限定同期が失敗してグローバルに同期した場合は次回も再試行する）
+        scope_synced = global_sync_success if scope.endswith(":global") else guild_sync_success
+        if all_commands and scope_synced:
+            command_sync_state.mark_synced(scope, fingerprint)
         
         # 期待されるコマンドと比較
         expected_commands = {"send_question", "show_summary", "set_send_time", "set_summary_time", "view_auto_times", "sync_commands"}
         missing_commands = expected_commands - all_commands
         if missing_commands:
-            print(f"[コマンド同期] 警告: 以下のコマンドが同期されていません: {sorted(missing_commands)}")
+            sync_logger.warning(f"以下のコマンドが同期されていません: {sorted(missing_commands)}")
         else:
-            print(f"[コマンド同期] すべてのコマンドが正常に同期されました")
+            sync_logger.info("すべてのコマンドが正常に同期されました")
         
         return all_commands
         
     except Exception as e:
-        print(f"[コマンド同期] コマンドの同期に失敗しました: {e}")
-        import traceback
-        traceback.print_exc()
+        sync_logger.exception(f"コマンドの同期に失敗しました: {e}")
         return set()
 
 
 @bot.event
 async def on_ready():
     """Bot起動時の処理"""
-    print(f"{bot.user} がログインしました")
+    gateway_logger.info(f"{bot.user} がログインしました")
+
+    # Cloud Run Job向け（2フェーズ）: 送信または集計を1回だけ行って即終了
+    if run_once_send_flag or run_once_summary_flag:
+        now = datetime.now(pytz.timezone("Asia/Tokyo"))
+        try:
+            if run_once_send_flag:
+                await run_once_send_phase(now)
+            else:
+                await run_once_summary_phase(now)
+        except Exception as e:
+            run_once_logger.exception(f"送信・集計でエラーが発生しました: {e}")
+        await bot.close()
+        return
 
     # Cloud Run Job等向け: 起動後に1回だけ送信して終了（常駐しない）
     global run_once_flag, holiday_eve_only_flag, run_once_summary_buffer_minutes
     if run_once_flag:
-        await asyncio.sleep(2)  # Discord APIの準備待ち
         jst = pytz.timezone("Asia/Tokyo")
         now = datetime.now(jst)
 
-        if holiday_eve_only_flag:
-            holiday_tomorrow = holiday_manager.get_holiday_before_date(now)
-            should_send = holiday_tomorrow is not None
-            print(f"[run-once] 祝前日判定: {should_send} (tomorrow_holiday={holiday_tomorrow})")
-        else:
-            should_send = scheduler.should_send_today(now)
-            print(f"[run-once] 送信対象判定: {should_send}")
+        # 起動前の判定と同じ基準（予約を含む）で判定
+        scheduler.load_state()
+        should_send = should_send_run_once(scheduler, holiday_eve_only_flag, now)
 
         if should_send:
-            auto_send_channel_id = config.get("auto_send_channel_id") or config.get("channel_id")
-            if not auto_send_channel_id:
-                print("[run-once] エラー: channel_id / auto_send_channel_id が設定されていません")
+            if not get_auto_send_channel_ids():
+                run_once_logger.error("channel_id / auto_send_channel_id が設定されていません")
             else:
                 try:
-                    channel = await bot.fetch_channel(int(auto_send_channel_id))
-                    await send_question_message(channel, now)
-                    print(f"[run-once] メッセージを送信しました（チャンネルID: {auto_send_channel_id}）")
-
-                    # 集計送信用に送信日を記録
-                    date_str = now.strftime("%Y-%m-%d")
-                    sent_dates.add(date_str)
+                    # 各チャンネルに送信し、集計送信用に送信日とメッセージIDを記録
+                    sent = await send_questions_to_channels(now)
+                    run_once_logger.info(f"{sent}件のチャンネルにメッセージを送信しました")
 
                     # 集計時刻まで待って集計を送信（同一プロセス内で回答を受け付ける）
                     summary_time = scheduler.summary_time
                     summary_dt = jst.localize(datetime.combine(now.date(), summary_time))
 
                     if now >= summary_dt:
-                        print("[run-once] 既に集計時刻を過ぎているため、集計をすぐ送信します")
+                        run_once_logger.info("既に集計時刻を過ぎているため、集計をすぐ送信します")
                         await scheduled_summary_callback(now)
                         if run_once_summary_buffer_minutes > 0:
                             await asyncio.sleep(run_once_summary_buffer_minutes * 60)
                     else:
                         wait_seconds = (summary_dt - now).total_seconds()
-                        print(f"[run-once] 集計送信まで待機します: {int(wait_seconds)}秒")
+                        run_once_logger.info(f"集計送信まで待機します: {int(wait_seconds)}秒")
                         await asyncio.sleep(wait_seconds)
                         await scheduled_summary_callback(summary_dt)
                         if run_once_summary_buffer_minutes > 0:
-                            print(f"[run-once] 追加待機: {run_once_summary_buffer_minutes}分")
+                            run_once_logger.info(f"追加待機: {run_once_summary_buffer_minutes}分")
                             await asyncio.sleep(run_once_summary_buffer_minutes * 60)
                 except Exception as e:
-                    print(f"[run-once] エラー: メッセージ送信に失敗しました: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    run_once_logger.exception(f"メッセージ送信に失敗しました: {e}")
         else:
-            print("[run-once] 送信対象外のため終了します")
+            run_once_logger.info("送信対象外のため終了します")
 
         await bot.close()
         return
     
-    # 少し待ってからコマンドを同期（Discord APIの準備を待つ）
-    await asyncio.sleep(2)
-    
     # テスト用: 即座にメッセージを送信
     global force_send_flag
     if force_send_flag:
-        await asyncio.sleep(2)  # ボットが完全に準備できるまで少し待つ
-        # 自動送信用のチャンネルIDを取得（設定されていない場合は通常のchannel_idを使用）
-        auto_send_channel_id = config.get("auto_send_channel_id") or config.get("channel_id")
-        if auto_send_channel_id:
-            channel = bot.get_channel(int(auto_send_channel_id))
-            if channel:
-                now = datetime.now(pytz.timezone("Asia/Tokyo"))
-                await send_question_message(channel, now)
-                print(f"[テスト] メッセージを即座に送信しました（チャンネルID: {auto_send_channel_id}）")
-                force_send_flag = False  # フラグをリセット
-            else:
-                print(f"[テスト] エラー: チャンネルが見つかりません。channel_id={auto_send_channel_id}")
+        # 自動送信用のチャンネル（設定されていない場合は通常のchannel_id）すべてに送信
+        channel_ids = get_auto_send_channel_ids()
+        if channel_ids:
+            now = datetime.now(pytz.timezone("Asia/Tokyo"))
+            
+            async def send_to(channel_id: int):
+                channel = await resolve_sendable_channel(channel_id)
+                return await send_question_message(channel, now)
+            
+            results = await fan_out(
+                channel_ids,
+                send_to,
+                limit=FAN_OUT_LIMIT,
+                name="テスト送信"
+            )
+            logger.info(f"メッセージを即座に送信しました（{sum(1 for r in results if r.ok)}/{len(channel_ids)}チャンネル）")
+            force_send_flag = False  # フラグをリセット
         else:
-            print(f"[テスト] エラー: channel_idが設定されていません")
+            logger.error("channel_idが設定されていません")
+    
+    # スケジューラーの開始・コマンド同期は起動パイプライン（setup_hook）で実行
+
+
+async def run_once_send_phase(now: datetime):
+    """
+    run-onceの送信フェーズ: 質問メッセージを送信し、送信記録を保存して終了
     
-    # スケジューラーのコールバックを設定
+    集計は別プロセス（--run-once-summary）が送信記録を引き継いで行うため、
+    集計時刻まで待機しません。
+    """
+    date_str = now.strftime("%Y-%m-%d")
+    if send_ledger.was_sent(date_str):
+        # ジョブの再試行などで二重送信しないようにする（集計後の再実行も含む）
+        run_once_logger.info(f"{date_str} は送信済みのため送信しません")
+        return
+    
+    scheduler.load_state()
+    if not should_send_run_once(scheduler, holiday_eve_only_flag, now):
+        run_once_logger.info("送信対象外のため終了します")
+        return
+    
+    sent = await send_questions_to_channels(now)
+    run_once_logger.info(f"{sent}件のチャンネルにメッセージを送信しました。集計は --run-once-summary で送信します")
+
+
+async def run_once_summary_phase(now: datetime):
+    """run-onceの集計フェーズ: 送信記録がある日の集計結果を送信して終了"""
+    date_str = now.strftime("%Y-%m-%d")
+    if not send_ledger.has_sent(date_str):
+        run_once_logger.info(f"{date_str} の送信記録がないため集計を送信しません")
+        return
+    await scheduled_summary_callback(now)
+
+
+async def warm_caches():
+    """回答データと祝日インデックスを事前に読み込む"""
+    this_year = datetime.now(pytz.timezone("Asia/Tokyo")).year
+    await asyncio.gather(
+        asyncio.to_thread(data_manager.warm),
+        asyncio.to_thread(holiday_manager.warm, [this_year, this_year + 1])
+    )
+
+
+async def restore_scheduler_state():
+    """予約を復元し、コールバックを設定してスケジューラーを開始"""
+    scheduler.load_state()
     scheduler.set_send_callback(scheduled_send_callback)
     scheduler.set_summary_callback(scheduled_summary_callback)
     
-    # スケジュールチェックタスクを開始
+    # リーダー選出を使う場合はハートビートを開始（リーダーになるまで送信・集計は行わない）
+    if leader_heartbeat_task is not None and not leader_heartbeat_task.is_running():
+        leader_heartbeat_task.start()
+    
+    # スケジュールチェックタスクを開始（最初のチェックはDiscordの準備完了後）
     global scheduler_task
     if scheduler_task is None:
         scheduler_task = create_scheduler_task()
     if not scheduler_task.is_running():
         scheduler_task.start()
+
+
+async def resolve_channels():
+    """設定されたチャンネルを解決（Discordの準備完了を待ってから）"""
+    await bot.wait_until_ready()
+    channel_ids = set(get_auto_send_channel_ids())
+    if config.get("channel_id") and str(config.get("channel_id")).strip():
+        channel_ids.add(int(config.get("channel_id")))
     
-    # コマンドが定義されるまで待つ（ファイル読み込み完了を待つ）
-    await asyncio.sleep(3)
-    
-    # コマンドツリーに登録されているコマンドを確認
-    all_commands = [cmd.name for cmd in bot.tree.get_commands()]
-    print(f"[コマンド確認] 定義されているコマンド: {all_commands}")
-    
-    if not all_commands:
-        print(f"[コマンド確認] 警告: コマンドが定義されていません。もう少し待ってから再試行します。")
-        await asyncio.sleep(5)
-        all_commands = [cmd.name for cmd in bot.tree.get_commands()]
-        print(f"[コマンド確認] 再確認後のコマンド: {all_commands}")
+    async def check(channel_id: int):
+        channel = await resolve_sendable_channel(channel_id)
+        startup_logger.info(f"チャンネルを確認しました: {getattr(channel, 'name', channel_id)}（{channel_id}）")
     
-    # コマンドを同期（サーバー限定同期を優先）
+    # 取得できないチャンネルは警告のみ（fan_outがログに記録）
+    await fan_out(sorted(channel_ids), check, limit=FAN_OUT_LIMIT, name="起動")
+
+
+async def sync_commands_on_startup():
+    """コマンドツリーに変更があれば同期（Discordの準備完了を待ってから）"""
+    await bot.wait_until_ready()
     guild_id = config.get("guild_id")
     if guild_id and str(guild_id).strip():
         # サーバー限定同期のみを実行（即座に反映される）
@@ -302,74 +545,390 @@ async def on_ready():
         await sync_commands(force_guild_only=False)
 
 
+async def report_memory_on_startup():
+    """Discordの準備完了後（ギルド・チャンネルのキャッシュ後）のRSSを記録し、定期計測を開始"""
+    await bot.wait_until_ready()
+    memory_reporter.report("起動完了", **gateway_cache_details())
+    if not memory_report_task.is_running():
+        memory_report_task.start()
+
+
+def build_startup_pipeline() -> StartupPipeline:
+    """
+    起動パイプラインを組み立てる
+    
+    データ読み込みはGateway接続と並行して進み、チャンネル解決とコマンド同期は
+    準備完了のシグナル（wait_until_ready）を待ってから同時に実行されます。
+    """
+    pipeline = StartupPipeline()
+    pipeline.add_step("データ読み込み", warm_caches)
+    if run_once_flag or run_once_send_flag or run_once_summary_flag:
+        # run-once時は常駐処理（スケジューラー・コマンド同期）を行わない
+        return pipeline
+    pipeline.add_step("メモリ計測", report_memory_on_startup)
+    if not owns_schedule():
+        # シャード分割時、スケジュール送信とコマンド同期は担当プロセスだけが行う
+        shard_logger.info("スケジュール送信とコマンド同期は他のワーカーが担当します")
+        return pipeline
+    pipeline.add_step("スケジューラー状態の復元", restore_scheduler_state, depends_on=["データ読み込み"])
+    pipeline.add_step("チャンネル解決", resolve_channels)
+    pipeline.add_step("コマンド同期", sync_commands_on_startup)
+    return pipeline
+
+
+# 起動パイプラインのタスク（ガベージコレクションされないよう参照を保持）
+startup_task = None
+# SIGTERMで開始した終了処理のタスク（同上）
+shutdown_task = None
+
+
+def handle_sigterm():
+    """SIGTERM（コーディネーターの停止やレプリカの入れ替え）でも、回答の書き込みを待ってから終了する"""
+    global shutdown_task
+    if shutdown_task is None:
+        gateway_logger.info("SIGTERMを受信したため終了します")
+        shutdown_task = asyncio.create_task(bot.close())
+
+
+@bot.event
+async def setup_hook():
+    """ログイン直後、Gateway接続前に呼ばれる処理"""
+    global startup_task
+    # 参加可否・集計ページ切り替えボタンの処理を登録（メッセージの数によらず1つずつ）
+    bot.add_dynamic_items(AttendanceButton, SummaryPageButton)
+    if diagnostics is not None:
+        diagnostics.start(asyncio.get_running_loop())
+    if health_server is not None:
+        await health_server.start()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, handle_sigterm)
+    except NotImplementedError:
+        # Windowsではシグナルハンドラーを登録できない
+        pass
+    memory_reporter.report("ログイン直後")
+    # パイプラインの完了を待たずにGateway接続へ進む
+    startup_task = asyncio.create_task(build_startup_pipeline().run())
+
+
+# 複数チャンネルへ同時に送信する数の上限
+FAN_OUT_LIMIT = 10
+
+
+def get_auto_send_channel_ids() -> list:
+    """
+    自動送信先のチャンネルID一覧を取得
+    
+    auto_send_channel_idはカンマ区切りで複数指定できます（未設定の場合はchannel_id）。
+    
+    Returns:
+        チャンネルIDのリスト（重複なし、設定順）
+    """
+    raw = config.get("auto_send_channel_id") or config.get("channel_id") or ""
+    channel_ids = []
+    for value in str(raw).split(","):
+        value = value.strip()
+        if value and int(value) not in channel_ids:
+            channel_ids.append(int(value))
+    return channel_ids
+
+
+def is_allowed_command_channel(channel_id: int) -> bool:
+    """
+    コマンドを実行できるチャンネルかどうか（channel_idと自動送信先のいずれか、制限がなければ常にTrue）
+    
+    Args:
+        channel_id: コマンドが実行されたチャンネルのID
+    """
+    allowed = set(get_auto_send_channel_ids())
+    if config.get("channel_id"):
+        allowed.add(int(config.get("channel_id")))
+    return not allowed or int(channel_id) in allowed
+
+
+def has_send_permissions(channel) -> bool:
+    """ボットがチャンネルにメッセージ（埋め込み付き）を送信できるかどうか"""
+    guild = getattr(channel, "guild", None)
+    me = guild.me if guild is not None else None
+    if me is None:
+        # ギルドがキャッシュにない場合は判定できないため、送信を試みる
+        return True
+    permissions = channel.permissions_for(me)
+    return permissions.view_channel and permissions.send_messages and permissions.embed_links
+
+
+# チャンネルと権限チェックのキャッシュ（キャッシュにない場合は同じIDにつき1回だけAPIから取得）
+channel_resolver = ChannelResolver(bot.get_channel, bot.fetch_channel, has_send_permissions)
+
+
+async def resolve_sendable_channel(channel_id: int):
+    """
+    送信先チャンネルを取得し、送信権限を確認
+    
+    Args:
+        channel_id: チャンネルID
+        
+    Returns:
+        チャンネル
+        
+    Raises:
+        PermissionError: 送信権限がない場合
+    """
+    channel = await channel_resolver.resolve(channel_id)
+    if not channel_resolver.can_send(channel):
+        raise PermissionError(f"チャンネル {channel_id} への送信権限がありません")
+    return channel
+
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    """チャンネルの設定（権限の上書きなど）が変わったらキャッシュを破棄"""
+    channel_resolver.invalidate(after.id)
+
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    """チャンネルが削除されたらキャッシュを破棄"""
+    channel_resolver.invalidate(channel.id)
+
+
+@bot.event
+async def on_guild_role_update(before, after):
+    """ロールの権限が変わったら権限チェックの結果を破棄"""
+    channel_resolver.invalidate_permissions()
+
+
+async def send_questions_to_channels(date: datetime, channel_ids: list = None) -> int:
+    """
+    自動送信先の各チャンネルに質問メッセージを並行して送信し、送信記録を保存
+    
+    1つのチャンネルが遅い・失敗しても他のチャンネルへの送信は待たされません。
+    
+    Args:
+        date: 対象日時
+        channel_ids: 送信先（Noneの場合は自動送信先すべて）
+        
+    Returns:
+        送信できたチャンネル数
+    """
+    if channel_ids is None:
+        channel_ids = get_auto_send_channel_ids()
+    if not channel_ids:
+        send_logger.error("channel_id / auto_send_channel_id が設定されていません")
+        return 0
+    date_str = date.strftime("%Y-%m-%d")
+    
+    async def send_to(channel_id: int):
+        channel = await resolve_sendable_channel(channel_id)
+        message = await send_question_message(channel, date)
+        if message is None:
+            raise RuntimeError("質問メッセージを送信できませんでした")
+        # 送信した日付とメッセージIDを記録（集計結果送信用）
+        send_ledger.record_send(date_str, channel.id, message.id)
+        return message
+    
+    results = await fan_out(channel_ids, send_to, limit=FAN_OUT_LIMIT, name="質問送信")
+    for result in results:
+        if result.ok:
+            send_logger.info(f"チャンネル {result.item} に送信しました（{result.seconds * 1000:.1f}ms）")
+    return sum(1 for result in results if result.ok)
+
+
 async def scheduled_summary_callback(date: datetime):
     """スケジュール集計結果送信コールバック"""
-    print(f"[コールバック] 集計結果送信コールバックが呼ばれました: {date.strftime('%Y-%m-%d %H:%M:%S')}")
+    scheduler_logger.info(f"集計結果送信コールバックが呼ばれました: {date.strftime('%Y-%m-%d %H:%M:%S')}")
     date_str = date.strftime("%Y-%m-%d")
     
-    # 今日メッセージを送信したかチェック
-    if date_str in sent_dates:
-        # 自動送信用のチャンネルIDを取得（設定されていない場合は通常のchannel_idを使用）
-        auto_send_channel_id = config.get("auto_send_channel_id") or config.get("channel_id")
-        if auto_send_channel_id:
-            channel = bot.get_channel(int(auto_send_channel_id))
-            if channel:
-                summary = data_manager.get_summary(date)
-                
-                embed = discord.Embed(
-                    title=f"{summary['date']} の集計結果",
-                    color=discord.Color.green()
-                )
-                
-                embed.add_field(
-                    name="総回答数",
-                    value=f"{summary['total_responses']}件",
-                    inline=True
-                )
-                
-                embed.add_field(
-                    name="参加可能",
-                    value=f"{summary['attendable_count']}人",
-                    inline=True
-                )
-                
-                embed.add_field(
-                    name="参加不可",
-                    value=f"{summary['not_attendable_count']}人",
-                    inline=True
-                )
-                
-                if summary['attendable_users']:
-                    user_list = []
-                    for user_data in summary['attendable_users']:
-                        user_id = user_data['user_id']
-                        start_time = user_data.get('start_time', '未設定')
-                        end_time = user_data.get('end_time', '未設定')
-                        # 表示用に00:00を24:00に変換
-                        start_time_display = format_time_display(start_time) if start_time != '未設定' else start_time
-                        end_time_display = format_time_display(end_time) if end_time != '未設定' else end_time
-                        user_list.append(f"<@{user_id}>: {start_time_display} ～ {end_time_display}")
-                    
-                    embed.add_field(
-                        name="参加可能なユーザー",
-                        value="\n".join(user_list) if user_list else "なし",
-                        inline=False
-                    )
-                else:
-                    embed.add_field(
-                        name="参加可能なユーザー",
-                        value="なし",
-                        inline=False
-                    )
-                
-                await channel.send(embed=embed)
-                # 送信済みフラグを削除（1日1回のみ送信）
-                sent_dates.discard(date_str)
-                print(f"[コールバック] 集計結果を送信しました。送信日付を削除: {date_str}")
-            else:
-                print(f"[コールバック] エラー: チャンネルが見つかりません。channel_id={auto_send_channel_id}")
-        else:
-            print(f"[コールバック] エラー: channel_idが設定されていません")
+    # 今日メッセージを送信したかチェック（別プロセスでの送信も含む）
+    if not send_ledger.has_sent(date_str):
+        return
+    
+    # 質問を送信したチャンネルそれぞれに集計を送信
+    channel_ids = []
+    for record in send_ledger.get_messages(date_str):
+        if record["channel_id"] not in channel_ids:
+            channel_ids.append(record["channel_id"])
+    
+    # 受け付け済みの回答の書き込みを待ってから集計
+    await response_writer.flush()
+    # 集計結果（人数が多い場合はページ切り替えボタン付き、全チャンネルで共通）
+    summary_message = build_summary_message(date_str)
+    
+    async def send_to(channel_id: int):
+        channel = await resolve_sendable_channel(channel_id)
+        return await dispatcher.send(channel.id, lambda: channel.send(**summary_message), PRIORITY_SUMMARY)
+    
+    results = await fan_out(channel_ids, send_to, limit=FAN_OUT_LIMIT, name="集計送信")
+    for result in results:
+        if result.ok:
+            scheduler_logger.info(f"チャンネル {result.item} に集計結果を送信しました（{result.seconds * 1000:.1f}ms）")
+    # 集計済みとして記録（1日1回のみ送信、失敗したチャンネルはログに記録済み）
+    send_ledger.mark_summarized(date_str)
+    scheduler_logger.info(f"集計結果の送信が完了しました。集計済みとして記録: {date_str}")
+
+
+def build_page_embed(page: dict, color: discord.Color) -> discord.Embed:
+    """
+    render_summary_pagesのページから埋め込みを作成
+    
+    Args:
+        page: 集計ページ
+        color: 埋め込みの色
+        
+    Returns:
+        埋め込み
+    """
+    embed = discord.Embed(title=page["title"], description=page.get("description"), color=color)
+    for field in page["fields"]:
+        embed.add_field(name=field["name"], value=field["value"], inline=field["inline"])
+    if page.get("footer"):
+        embed.set_footer(text=page["footer"])
+    return embed
+
+
+# 日付ごとの集計ページ（ページ切り替えのたびに集計し直さない。回答が保存されたら破棄し、
+# 他のレプリカが保存した回答はデータの版が変わったことで検出して作り直す）
+summary_page_cache = SummaryPageCache()
+response_writer.add_listener(summary_page_cache.invalidate)
+
+
+def get_summary_pages(date_str: str) -> list:
+    """
+    指定日の集計ページを取得（キャッシュになければ作成）
+    
+    Args:
+        date_str: 対象日付（YYYY-MM-DD形式）
+        
+    Returns:
+        集計ページのリスト
+    """
+    version = data_manager.data_version()
+    pages = summary_page_cache.get(date_str, version)
+    if pages is None:
+        date = pytz.timezone("Asia/Tokyo").localize(datetime.strptime(date_str, "%Y-%m-%d"))
+        pages = render_summary_pages(data_manager.get_summary(date))
+        summary_page_cache.put(date_str, pages, version)
+    return pages
+
+
+def build_summary_message(date_str: str, page: int = 0) -> dict:
+    """
+    集計結果メッセージの内容を作成（/show_summaryと定期送信で共通）
+    
+    Args:
+        date_str: 対象日付（YYYY-MM-DD形式）
+        page: 表示するページ番号（0始まり）
+        
+    Returns:
+        send_message / edit_message に渡すキーワード引数
+    """
+    pages = get_summary_pages(date_str)
+    page = max(0, min(page, len(pages) - 1))
+    kwargs = {"embed": build_page_embed(pages[page], discord.Color.green())}
+    if len(pages) > 1:
+        kwargs["view"] = SummaryPageView(date_str, page, len(pages))
+    return kwargs
+
+
+class SummaryPageButton(discord.ui.DynamicItem[discord.ui.Button], template=r"summary:(?P<date>\d{8}):(?P<page>\d+)"):
+    """
+    集計結果のページ切り替えボタン
+    
+    custom_idに日付と移動先のページを含めるため、再起動後も押せます。
+    """
+    
+    def __init__(self, date_str: str, page: int, label: str, disabled: bool = False):
+        """
+        Args:
+            date_str: 対象日付（YYYYMMDD形式）
+            page: 押したときに表示するページ番号（0始まり）
+            label: ボタンの表示名
+            disabled: 押せない状態にするかどうか
+        """
+        super().__init__(
+            discord.ui.Button(
+                label=label,
+                style=discord.ButtonStyle.secondary,
+                custom_id=f"summary:{date_str}:{page}",
+                disabled=disabled
+            )
+        )
+        self.date_str = date_str
+        self.page = page
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["date"], int(match["page"]), item.label or "")
+    
+    @timed("interaction.summary_page")
+    async def callback(self, interaction: discord.Interaction):
+        date_str = datetime.strptime(self.date_str, "%Y%m%d").strftime("%Y-%m-%d")
+        await interaction.response.edit_message(**build_summary_message(date_str, self.page))
+
+
+class SummaryPageView(discord.ui.View):
+    """集計結果のページ切り替え用のビュー（ボタンはSummaryPageButtonで処理される）"""
+    
+    def __init__(self, date_str: str, page: int, page_count: int):
+        """
+        Args:
+            date_str: 対象日付（YYYY-MM-DD形式）
+            page: 表示中のページ番号（0始まり）
+            page_count: 総ページ数
+        """
+        super().__init__(timeout=None)
+        compact = date_str.replace("-", "")
+        self.add_item(SummaryPageButton(compact, max(page - 1, 0), "◀ 前へ", disabled=page == 0))
+        self.add_item(SummaryPageButton(compact, page + 1, "次へ ▶", disabled=page >= page_count - 1))
+
+
+def build_live_summary_embed(summary: dict) -> discord.Embed:
+    """
+    リアルタイム更新する集計メッセージの埋め込みを作成
+    
+    Args:
+        summary: DataManager.get_summaryの集計結果
+        
+    Returns:
+        集計メッセージの埋め込み（1ページに収まらない分は/show_summaryで確認）
+    """
+    pages = render_summary_pages(summary, title=f"{summary['date']} の回答状況（リアルタイム）")
+    embed = build_page_embed(pages[0], discord.Color.teal())
+    if len(pages) > 1:
+        embed.set_footer(text=f"続きは/show_summaryで確認できます（全{len(pages)}ページ）")
+    else:
+        embed.set_footer(text="回答に合わせて自動で更新されます")
+    return embed
+
+
+async def update_live_summaries(date_str: str):
+    """
+    指定日の集計メッセージを最新の集計で編集
+    
+    Args:
+        date_str: 対象日付（YYYY-MM-DD形式）
+    """
+    records = send_ledger.get_live_summaries(date_str)
+    if not records:
+        return
+    date = pytz.timezone("Asia/Tokyo").localize(datetime.strptime(date_str, "%Y-%m-%d"))
+    # 集計は回答の保存時に差分で更新されているため、ここでは読み出すだけ
+    embed = build_live_summary_embed(data_manager.get_summary(date))
+    for record in records:
+        try:
+            channel = await channel_resolver.resolve(record["channel_id"])
+            message = channel.get_partial_message(record["message_id"])
+            await dispatcher.send(channel.id, lambda: message.edit(embed=embed), PRIORITY_ANALYTICS, idempotent=True)
+        except discord.NotFound:
+            live_summary_logger.info(f"メッセージが削除されています: {record['message_id']}")
+
+
+# 集計メッセージの更新（同じ日付の編集は最短 live_summary_interval 秒に1回にまとめる）
+live_summary_updater = LiveSummaryUpdater(
+    update_live_summaries,
+    interval=float(config.get("live_summary_interval", 5))
+)
+if config.get("live_summary", False):
+    response_writer.add_listener(live_summary_updater.mark_dirty)
 
 
 async def send_question_message(channel: discord.TextChannel, date: datetime = None):
@@ -379,6 +938,9 @@ async def send_question_message(channel: discord.TextChannel, date: datetime = N
     Args:
         channel: 送信先チャンネル
         date: 対象日付（Noneの場合は今日）
+        
+    Returns:
+        送信したメッセージ
     """
     try:
         if date is None:
@@ -395,54 +957,107 @@ async def send_question_message(channel: discord.TextChannel, date: datetime = N
         # ボタンの作成
         view = AttendanceView(date)
         
-        await channel.send(embed=embed, view=view)
+        message = await dispatcher.send(channel.id, lambda: channel.send(embed=embed, view=view), PRIORITY_QUESTION)
+        
+        # 回答に合わせて更新する集計メッセージを送信（有効な場合のみ）
+        if config.get("live_summary", False):
+            summary = data_manager.get_summary(date)
+            live_embed = build_live_summary_embed(summary)
+            live_message = await dispatcher.send(channel.id, lambda: channel.send(embed=live_embed), PRIORITY_ANALYTICS)
+            send_ledger.record_live_summary(summary['date'], channel.id, live_message.id)
+        
+        return message
     except Exception as e:
-        print(f"send_question_messageでエラーが発生しました: {e}")
-        import traceback
-        traceback.print_exc()
+        send_logger.exception(f"send_question_messageでエラーが発生しました: {e}")
         raise
 
 
 # スケジューラーのコールバックを設定
-# メッセージ送信日を記録（集計結果送信用）
-sent_dates = set()
 force_send_flag = False  # テスト用: 即座にメッセージを送信するフラグ
 run_once_flag = False  # Cloud Run Job等向け: 起動後に1回だけ判定・送信して終了
 holiday_eve_only_flag = False  # --run-once時に祝前日のみ送信（曜日設定は無視）
 run_once_summary_buffer_minutes = 10  # --run-once時、集計送信後に待機する分数（0でも可）
+run_once_send_flag = False  # --run-once-send: 質問メッセージを送信して即終了（送信記録を保存）
+run_once_summary_flag = False  # --run-once-summary: 送信記録をもとに集計結果を送信して終了
 
 async def scheduled_send_callback(date: datetime):
     """スケジュール送信コールバック"""
-    print(f"[コールバック] メッセージ送信コールバックが呼ばれました: {date.strftime('%Y-%m-%d %H:%M:%S')}")
-    # 自動送信用のチャンネルIDを取得（設定されていない場合は通常のchannel_idを使用）
-    auto_send_channel_id = config.get("auto_send_channel_id") or config.get("channel_id")
-    if auto_send_channel_id:
-        channel = bot.get_channel(int(auto_send_channel_id))
-        if channel:
-            print(f"[コールバック] チャンネルが見つかりました: {channel.name}")
-            await send_question_message(channel, date)
-            # 送信した日付を記録（集計結果送信用）
-            date_str = date.strftime("%Y-%m-%d")
-            sent_dates.add(date_str)
-            print(f"[コールバック] メッセージを送信しました。送信日付を記録: {date_str}")
-        else:
-            print(f"[コールバック] エラー: チャンネルが見つかりません。channel_id={auto_send_channel_id}")
-    else:
-        print(f"[コールバック] エラー: channel_idが設定されていません")
+    scheduler_logger.info(f"メッセージ送信コールバックが呼ばれました: {date.strftime('%Y-%m-%d %H:%M:%S')}")
+    sent = await send_questions_to_channels(date)
+    scheduler_logger.info(f"{sent}件のチャンネルにメッセージを送信しました。送信日付を記録: {date.strftime('%Y-%m-%d')}")
 
 
 scheduler.set_send_callback(scheduled_send_callback)
 
 
-class AttendanceView(discord.ui.View):
-    """参加可否選択用のビュー"""
+def notify_save_failure(interaction: discord.Interaction):
+    """
+    回答の保存に失敗したことをフォローアップで本人に伝える関数を作成
     
-    def __init__(self, date: datetime):
-        super().__init__(timeout=None)
-        self.date = date
+    Args:
+        interaction: 回答したときのインタラクション
+        
+    Returns:
+        ResponseWriter.submitのon_errorに渡すコルーチン関数
+    """
+    async def notify(error: Exception):
+        await dispatcher.send(
+            interaction.channel_id,
+            lambda: interaction.followup.send(
+                "回答の保存に失敗しました。お手数ですが、もう一度回答してください。",
+                ephemeral=True
+            ),
+            PRIORITY_SUMMARY
+        )
+    return notify
+
+
+class AttendanceButton(discord.ui.DynamicItem[discord.ui.Button], template=r"attendance:(?P<choice>yes|no):(?P<date>\d{8})"):
+    """
+    参加可否ボタン（custom_idに回答内容と対象日付を埋め込む）
+    
+    押されたときはcustom_idから日付を復元して処理するため、メッセージごとにビューを
+    保持する必要がなく、再起動後や別プロセスが送信したメッセージのボタンも動作します。
+    起動時にbot.add_dynamic_itemsで一度だけ登録します。
+    """
     
-    @discord.ui.button(label="参加可能", style=discord.ButtonStyle.success, emoji="✅")
-    async def can_attend(self, interaction: discord.Interaction, button: discord.ui.Button):
+    def __init__(self, can_attend: bool, date_str: str):
+        """
+        Args:
+            can_attend: 参加可能ボタンならTrue、参加不可ボタンならFalse
+            date_str: 対象日付（YYYYMMDD形式）
+        """
+        choice = "yes" if can_attend else "no"
+        super().__init__(
+            discord.ui.Button(
+                label="参加可能" if can_attend else "参加不可",
+                style=discord.ButtonStyle.success if can_attend else discord.ButtonStyle.danger,
+                emoji="✅" if can_attend else "❌",
+                custom_id=f"attendance:{choice}:{date_str}"
+            )
+        )
+        self.can_attend = can_attend
+        self.date_str = date_str
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        """custom_idからボタンを復元"""
+        return cls(match["choice"] == "yes", match["date"])
+    
+    @property
+    def date(self) -> datetime:
+        """対象日付（日本時間）"""
+        return pytz.timezone("Asia/Tokyo").localize(datetime.strptime(self.date_str, "%Y%m%d"))
+    
+    @timed("interaction.attendance")
+    async def callback(self, interaction: discord.Interaction):
+        """ボタンが押されたときの処理"""
+        if self.can_attend:
+            await self._can_attend(interaction)
+        else:
+            await self._cannot_attend(interaction)
+    
+    async def _can_attend(self, interaction: discord.Interaction):
         """参加可能ボタンが押されたときの処理"""
         try:
             await interaction.response.send_message(
@@ -451,9 +1066,7 @@ class AttendanceView(discord.ui.View):
                 ephemeral=True
             )
         except Exception as e:
-            print(f"can_attendボタンでエラーが発生しました: {e}")
-            import traceback
-            traceback.print_exc()
+            command_logger.exception(f"can_attendボタンでエラーが発生しました: {e}")
             try:
                 if not interaction.response.is_done():
                     await interaction.response.send_message(
@@ -466,199 +1079,216 @@ class AttendanceView(discord.ui.View):
                     ephemeral=True
                 )
     
-    @discord.ui.button(label="参加不可", style=discord.ButtonStyle.danger, emoji="❌")
-    async def cannot_attend(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """参加不可ボタンが押されたときの処理"""
-        data_manager.save_response(
-            user_id=interaction.user.id,
-            date=self.date,
-            can_attend=False
-        )
-        
-        await interaction.response.send_message(
-            "回答を記録しました。ありがとうございます！",
-            ephemeral=True
+    async def _cannot_attend(self, interaction: discord.Interaction):
+        """参加不可ボタンが押されたときの処理"""
+        started = perf_counter()
+        # 保存はバックグラウンドで行い、応答を先に返す
+        response_writer.submit(
+            user_id=interaction.user.id,
+            date=self.date,
+            can_attend=False,
+            on_error=notify_save_failure(interaction)
+        )
+        
+        await interaction.response.send_message(
+            "回答を記録しました。ありがとうございます！",
+            ephemeral=True
+        )
+        response_writer.record_ack(perf_counter() - started)
+
+
+class AttendanceView(discord.ui.View):
+    """
+    参加可否選択用のビュー
+    
+    ボタンはすべてAttendanceButton（custom_idで処理される）なので、送信後に
+    このビュー自体がメモリに保持されることはありません。
+    """
+    
+    def __init__(self, date: datetime):
+        super().__init__(timeout=None)
+        date_str = date.strftime("%Y%m%d")
+        self.add_item(AttendanceButton(True, date_str))
+        self.add_item(AttendanceButton(False, date_str))
+
+
+def _build_time_options() -> list:
+    """時刻選択オプションを作成（30分単位、降順、24:00～20:00）"""
+    # 24:00（0:00）から20:00まで30分刻みで降順
+    # 24:00, 23:30, 23:00, 22:30, 22:00, 21:30, 21:00, 20:30, 20:00
+    all_options = []
+    
+    # 24:00（0:00）を最初に追加
+    all_options.append(
+        discord.SelectOption(
+            label="24:00",
+            value="00:00",
+            description="24:00に設定"
         )
+    )
+    
+    # 23:30から20:00まで30分刻みで降順
+    for hour in range(23, 19, -1):  # 23時から20時まで降順
+        for minute in [30, 0]:  # 30分、0分の順（降順）
+            time_str = f"{hour:02d}:{minute:02d}"
+            all_options.append(
+                discord.SelectOption(
+                    label=time_str,
+                    value=time_str,
+                    description=f"{time_str}に設定"
+                )
+            )
+    
+    # DiscordのSelectは25個までだが、全9個なので開始時刻と終了時刻で同じリストを使用できる
+    return all_options
 
 
-def format_time_display(time_str: str) -> str:
-    """時刻表示を整形（00:00を24:00に変換）"""
-    if time_str == "00:00":
-        return "24:00"
-    return time_str
+# 時刻選択オプション（起動時に一度だけ作成し、すべてのTimeSelectionViewで共有する）
+TIME_OPTIONS = _build_time_options()
 
 
-class TimeSelectionView(discord.ui.View):
-    """時刻選択用のビュー"""
+class TimeSelection:
+    """ユーザーごとの時刻選択状態"""
+    
+    __slots__ = ("date", "user_id", "can_attend", "start_time", "end_time")
     
     def __init__(self, date: datetime, user_id: int, can_attend: bool, start_time: str = None, end_time: str = None):
-        super().__init__(timeout=300)  # 5分でタイムアウト
         self.date = date
         self.user_id = user_id
         self.can_attend = can_attend
         self.start_time = start_time
         self.end_time = end_time
+    
+    def has_any_time(self) -> bool:
+        """開始時刻・終了時刻のどちらかが選択されているかどうか"""
+        return bool(self.start_time or self.end_time)
+
+
+class TimeSelectionView(discord.ui.View):
+    """
+    時刻選択用のビュー
+    
+    選択のたびに作り直さず、同じビューの表示を更新して再利用します。
+    """
+    
+    def __init__(self, date: datetime, user_id: int, can_attend: bool, start_time: str = None, end_time: str = None):
+        super().__init__(timeout=300)  # 5分でタイムアウト
+        self.selection = TimeSelection(date, user_id, can_attend, start_time, end_time)
         
         # 開始時刻選択ドロップダウン（30分単位）
-        start_placeholder = f"開始時刻を選択{' (選択済み: ' + self.start_time + ')' if self.start_time else ''}"
-        self.start_time_select = discord.ui.Select(
-            placeholder=start_placeholder[:100],  # Discordのプレースホルダーは100文字制限
-            options=self._create_time_options("start")
-        )
+        self.start_time_select = discord.ui.Select(options=TIME_OPTIONS)
         self.start_time_select.callback = self._start_time_callback
         self.add_item(self.start_time_select)
         
         # 終了時刻選択ドロップダウン（30分単位）
-        end_placeholder = f"終了時刻を選択{' (選択済み: ' + self.end_time + ')' if self.end_time else ''}"
-        self.end_time_select = discord.ui.Select(
-            placeholder=end_placeholder[:100],
-            options=self._create_time_options("end")
-        )
+        self.end_time_select = discord.ui.Select(options=TIME_OPTIONS)
         self.end_time_select.callback = self._end_time_callback
         self.add_item(self.end_time_select)
         
         # 確定ボタン（どちらか一方が選択されていれば有効）
         self.confirm_button = discord.ui.Button(
             label="確定",
-            style=discord.ButtonStyle.primary,
-            disabled=not (self.start_time or self.end_time)
+            style=discord.ButtonStyle.primary
         )
         self.confirm_button.callback = self._confirm_callback
         self.add_item(self.confirm_button)
+        
+        self._refresh_components()
     
-    def _create_time_options(self, select_type: str = "start"):
-        """時刻選択オプションを作成（30分単位、降順、24:00～20:00）"""
-        # 24:00（0:00）から20:00まで30分刻みで降順
-        # 24:00, 23:30, 23:00, 22:30, 22:00, 21:30, 21:00, 20:30, 20:00
-        all_options = []
-        
-        # 24:00（0:00）を最初に追加
-        all_options.append(
-            discord.SelectOption(
-                label="24:00",
-                value="00:00",
-                description="24:00に設定"
-            )
+    def _refresh_components(self):
+        """選択状態に合わせてプレースホルダーと確定ボタンの状態を更新"""
+        start_time = self.selection.start_time
+        end_time = self.selection.end_time
+        start_placeholder = f"開始時刻を選択{' (選択済み: ' + format_time_display(start_time) + ')' if start_time else ''}"
+        end_placeholder = f"終了時刻を選択{' (選択済み: ' + format_time_display(end_time) + ')' if end_time else ''}"
+        # Discordのプレースホルダーは100文字制限
+        self.start_time_select.placeholder = start_placeholder[:100]
+        self.end_time_select.placeholder = end_placeholder[:100]
+        self.confirm_button.disabled = not self.selection.has_any_time()
+    
+    def _render_content(self) -> str:
+        """選択状態を表示するメッセージ本文を作成"""
+        start_time = self.selection.start_time
+        end_time = self.selection.end_time
+        return (
+            "参加可能時間帯を選択してください\n\n"
+            f"開始時刻: {format_time_display(start_time) if start_time else '未選択'}\n"
+            f"終了時刻: {format_time_display(end_time) if end_time else '未選択'}"
         )
-        
-        # 23:30から20:00まで30分刻みで降順
-        for hour in range(23, 19, -1):  # 23時から20時まで降順
-            for minute in [30, 0]:  # 30分、0分の順（降順）
-                time_str = f"{hour:02d}:{minute:02d}"
-                all_options.append(
-                    discord.SelectOption(
-                        label=time_str,
-                        value=time_str,
-                        description=f"{time_str}に設定"
-                    )
-                )
-        
-        # DiscordのSelectは25個までなので、開始時刻と終了時刻で範囲を分ける
-        # 全9個なので、両方とも同じリストを使用可能
-        # ただし、開始時刻と終了時刻で同じリストを使うと混乱する可能性があるため、
-        # 開始時刻用と終了時刻用で同じリストを返す（9個なので25個以内）
-        return all_options
     
-    async def _start_time_callback(self, interaction: discord.Interaction):
-        """開始時刻が選択されたときの処理"""
-        if interaction.user.id != self.user_id:
+    async def _reject_other_user(self, interaction: discord.Interaction) -> bool:
+        """本人以外の操作を拒否（拒否した場合True）"""
+        if interaction.user.id != self.selection.user_id:
             await interaction.response.send_message(
                 "あなたの回答ではありません。",
                 ephemeral=True
             )
+            return True
+        return False
+    
+    @timed("interaction.select_start_time")
+    async def _start_time_callback(self, interaction: discord.Interaction):
+        """開始時刻が選択されたときの処理"""
+        if await self._reject_other_user(interaction):
             return
         
-        self.start_time = interaction.data["values"][0]
+        self.selection.start_time = interaction.data["values"][0]
         
-        # 確定ボタンの状態を更新（どちらか一方でも選択されていれば有効）
-        if self.start_time or self.end_time:
-            self.confirm_button.disabled = False
-        else:
-            self.confirm_button.disabled = True
-        
-        # メッセージを更新して確定ボタンの状態を反映
-        view = TimeSelectionView(self.date, self.user_id, self.can_attend)
-        view.start_time = self.start_time
-        view.end_time = self.end_time
-        if view.start_time or view.end_time:
-            view.confirm_button.disabled = False
-        else:
-            view.confirm_button.disabled = True
-        
-        await interaction.response.edit_message(
-            content=f"参加可能時間帯を選択してください\n\n開始時刻: {format_time_display(self.start_time) if self.start_time else '未選択'}\n終了時刻: {format_time_display(self.end_time) if self.end_time else '未選択'}",
-            view=view
-        )
+        # 同じビューの表示を更新して確定ボタンの状態を反映
+        self._refresh_components()
+        await interaction.response.edit_message(content=self._render_content(), view=self)
     
+    @timed("interaction.select_end_time")
     async def _end_time_callback(self, interaction: discord.Interaction):
         """終了時刻が選択されたときの処理"""
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message(
-                "あなたの回答ではありません。",
-                ephemeral=True
-            )
+        if await self._reject_other_user(interaction):
             return
         
-        self.end_time = interaction.data["values"][0]
-        
-        # 確定ボタンの状態を更新（どちらか一方でも選択されていれば有効）
-        if self.start_time or self.end_time:
-            self.confirm_button.disabled = False
-        else:
-            self.confirm_button.disabled = True
-        
-        # メッセージを更新して確定ボタンの状態を反映
-        view = TimeSelectionView(self.date, self.user_id, self.can_attend)
-        view.start_time = self.start_time
-        view.end_time = self.end_time
-        if view.start_time or view.end_time:
-            view.confirm_button.disabled = False
-        else:
-            view.confirm_button.disabled = True
+        self.selection.end_time = interaction.data["values"][0]
         
-        await interaction.response.edit_message(
-            content=f"参加可能時間帯を選択してください\n\n開始時刻: {self.start_time or '未選択'}\n終了時刻: {self.end_time or '未選択'}",
-            view=view
-        )
+        # 同じビューの表示を更新して確定ボタンの状態を反映
+        self._refresh_components()
+        await interaction.response.edit_message(content=self._render_content(), view=self)
     
+    @timed("interaction.confirm_time")
     async def _confirm_callback(self, interaction: discord.Interaction):
         """確定ボタンが押されたときの処理"""
-        if interaction.user.id != self.user_id:
-            await interaction.response.send_message(
-                "あなたの回答ではありません。",
-                ephemeral=True
-            )
+        if await self._reject_other_user(interaction):
             return
         
+        selection = self.selection
         # どちらか一方でも選択されていればOK
-        if not self.start_time and not self.end_time:
+        if not selection.has_any_time():
             await interaction.response.send_message(
                 "開始時刻または終了時刻のどちらかを選択してください。",
                 ephemeral=True
             )
             return
         
-        # データを保存
-        data_manager.save_response(
-            user_id=self.user_id,
-            date=self.date,
-            can_attend=self.can_attend,
-            start_time=self.start_time,
-            end_time=self.end_time
+        started = perf_counter()
+        # 保存はバックグラウンドで行い、応答を先に返す
+        response_writer.submit(
+            user_id=selection.user_id,
+            date=selection.date,
+            can_attend=selection.can_attend,
+            start_time=selection.start_time,
+            end_time=selection.end_time,
+            on_error=notify_save_failure(interaction)
         )
         
         # メッセージの組み立て
-        if self.start_time and self.end_time:
-            message = f"回答を記録しました。\n参加可能時間: {format_time_display(self.start_time)} ～ {format_time_display(self.end_time)}"
-        elif self.start_time:
-            message = f"回答を記録しました。\n参加可能開始時刻: {format_time_display(self.start_time)}"
+        if selection.start_time and selection.end_time:
+            message = f"回答を記録しました。\n参加可能時間: {format_time_display(selection.start_time)} ～ {format_time_display(selection.end_time)}"
+        elif selection.start_time:
+            message = f"回答を記録しました。\n参加可能開始時刻: {format_time_display(selection.start_time)}"
         else:
-            message = f"回答を記録しました。\n参加可能終了時刻: {format_time_display(self.end_time)}"
+            message = f"回答を記録しました。\n参加可能終了時刻: {format_time_display(selection.end_time)}"
         
         await interaction.response.send_message(
             message,
             ephemeral=True
         )
+        response_writer.record_ack(perf_counter() - started)
         
         # ビューを無効化
         self.stop()
@@ -676,18 +1306,8 @@ async def send_question(interaction: discord.Interaction):
             return
         
         # 指定されたチャンネルでのみコマンドを実行可能
-        # channel_idとauto_send_channel_idの両方で実行可能
-        allowed_channel_id = config.get("channel_id")
-        auto_send_channel_id = config.get("auto_send_channel_id")
-        
-        # どちらかのチャンネルで実行されているかチェック
-        is_allowed_channel = (
-            (not allowed_channel_id and not auto_send_channel_id) or  # チャンネル制限がない場合
-            (allowed_channel_id and str(interaction.channel.id) == str(allowed_channel_id)) or  # channel_idと一致
-            (auto_send_channel_id and str(interaction.channel.id) == str(auto_send_channel_id))  # auto_send_channel_idと一致
-        )
-        
-        if not is_allowed_channel:
+        # channel_idとauto_send_channel_id（複数可）のいずれかで実行可能
+        if not is_allowed_command_channel(interaction.channel.id):
             await interaction.response.send_message(
                 f"このコマンドは指定されたチャンネルでのみ使用できます。",
                 ephemeral=True
@@ -712,9 +1332,7 @@ async def send_question(interaction: discord.Interaction):
             view=view
         )
     except Exception as e:
-        print(f"send_questionコマンドでエラーが発生しました: {e}")
-        import traceback
-        traceback.print_exc()
+        command_logger.exception(f"send_questionコマンドでエラーが発生しました: {e}")
         try:
             if not interaction.response.is_done():
                 await interaction.response.send_message(
@@ -727,25 +1345,15 @@ async def send_question(interaction: discord.Interaction):
                     ephemeral=True
                 )
         except Exception as followup_error:
-            print(f"エラーメッセージの送信に失敗しました: {followup_error}")
+            command_logger.warning(f"エラーメッセージの送信に失敗しました: {followup_error}")
 
 
 @bot.tree.command(name="show_summary", description="集計結果を表示")
 async def show_summary(interaction: discord.Interaction):
     """集計結果を表示"""
     # 指定されたチャンネルでのみコマンドを実行可能
-    # channel_idとauto_send_channel_idの両方で実行可能
-    allowed_channel_id = config.get("channel_id")
-    auto_send_channel_id = config.get("auto_send_channel_id")
-    
-    # どちらかのチャンネルで実行されているかチェック
-    is_allowed_channel = (
-        (not allowed_channel_id and not auto_send_channel_id) or  # チャンネル制限がない場合
-        (allowed_channel_id and str(interaction.channel.id) == str(allowed_channel_id)) or  # channel_idと一致
-        (auto_send_channel_id and str(interaction.channel.id) == str(auto_send_channel_id))  # auto_send_channel_idと一致
-    )
-    
-    if not is_allowed_channel:
+    # channel_idとauto_send_channel_id（複数可）のいずれかで実行可能
+    if not is_allowed_command_channel(interaction.channel.id):
         await interaction.response.send_message(
             f"このコマンドは指定されたチャンネルでのみ使用できます。",
             ephemeral=True
@@ -753,60 +1361,13 @@ async def show_summary(interaction: discord.Interaction):
         return
     
     date = datetime.now(pytz.timezone("Asia/Tokyo"))
-    summary = data_manager.get_summary(date)
-    
-    embed = discord.Embed(
-        title=f"{summary['date']} の集計結果",
-        color=discord.Color.green()
-    )
-    
-    embed.add_field(
-        name="総回答数",
-        value=f"{summary['total_responses']}件",
-        inline=True
-    )
-    
-    embed.add_field(
-        name="参加可能",
-        value=f"{summary['attendable_count']}人",
-        inline=True
-    )
-    
-    embed.add_field(
-        name="参加不可",
-        value=f"{summary['not_attendable_count']}人",
-        inline=True
-    )
-    
-    if summary['attendable_users']:
-        user_list = []
-        for user_data in summary['attendable_users']:
-            user_id = user_data['user_id']
-            start_time = user_data.get('start_time', '未設定')
-            end_time = user_data.get('end_time', '未設定')
-            # 表示用に00:00を24:00に変換
-            start_time_display = format_time_display(start_time) if start_time != '未設定' else start_time
-            end_time_display = format_time_display(end_time) if end_time != '未設定' else end_time
-            user_list.append(f"<@{user_id}>: {start_time_display} ～ {end_time_display}")
-        
-        embed.add_field(
-            name="参加可能なユーザー",
-            value="\n".join(user_list) if user_list else "なし",
-            inline=False
-        )
-    else:
-        embed.add_field(
-            name="参加可能なユーザー",
-            value="なし",
-            inline=False
-        )
     
     try:
-        await interaction.response.send_message(embed=embed)
+        # 受け付け済みの回答（実行したユーザー自身の回答を含む）の書き込みを待ってから集計
+        await flush_responses(COMMAND_FLUSH_TIMEOUT)
+        await interaction.response.send_message(**build_summary_message(date.strftime("%Y-%m-%d")))
     except Exception as e:
-        print(f"show_summaryコマンドでエラーが発生しました: {e}")
-        import traceback
-        traceback.print_exc()
+        command_logger.exception(f"show_summaryコマンドでエラーが発生しました: {e}")
         try:
             if not interaction.response.is_done():
                 await interaction.response.send_message(
@@ -819,7 +1380,7 @@ async def show_summary(interaction: discord.Interaction):
                     ephemeral=True
                 )
         except Exception as followup_error:
-            print(f"エラーメッセージの送信に失敗しました: {followup_error}")
+            command_logger.warning(f"エラーメッセージの送信に失敗しました: {followup_error}")
 
 
 def validate_time_format(time_str: str) -> bool:
@@ -846,30 +1407,6 @@ def validate_date_format(date_str: str) -> bool:
         return False
 
 
-def save_config_to_file(config_data: dict):
-    """設定をconfig.jsonに保存"""
-    config_path = "config.json"
-    # 環境変数が設定されている場合は、config.jsonに保存しない
-    if os.environ.get("DISCORD_TOKEN"):
-        print("[設定] 環境変数が設定されているため、config.jsonには保存しません")
-        return
-    
-    try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            existing_config = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        existing_config = {}
-    
-    # 既存の設定を更新（トークンなどの機密情報は保持）
-    for key, value in config_data.items():
-        if key != "token":  # トークンは保存しない
-            existing_config[key] = value
-    
-    with open(config_path, "w", encoding="utf-8") as f:
-        json.dump(existing_config, f, ensure_ascii=False, indent=2)
-    print(f"[設定] config.jsonに保存しました: {list(config_data.keys())}")
-
-
 @bot.tree.command(name="set_send_time", description="send_questionの自動実行時間を設定")
 async def set_send_time(interaction: discord.Interaction, time: str):
     """send_questionの自動実行時間を設定"""
@@ -882,28 +1419,22 @@ async def set_send_time(interaction: discord.Interaction, time: str):
             )
             return
         
-        # 即座に応答を送信（タイムアウトを防ぐ）
-        await interaction.response.defer(ephemeral=True)
-        
-        # 設定を更新
-        config["send_time"] = time
-        scheduler.send_time = scheduler._parse_time(time)
-        
-        # config.jsonに保存（環境変数が設定されていない場合のみ）
-        save_config_to_file({"send_time": time})
+        # 設定を即座に反映（スケジューラータスクは止めない、configも更新される）
+        due_now = scheduler.apply_config({"send_time": time})
+        if due_now:
+            # 変更後の時刻が現在の分に該当する場合は次の定期チェックを待たずに確認
+            scheduler.request_tick()
         
-        # スケジューラーを再起動
-        await restart_scheduler()
+        # config.jsonへの保存はバックグラウンドで行う（環境変数が設定されていない場合のみ）
+        config_store.schedule_save({"send_time": time})
         
         # 完了メッセージを送信
-        await interaction.followup.send(
+        await interaction.response.send_message(
             f"send_questionの自動実行時間を {time} に設定しました。",
             ephemeral=True
         )
     except Exception as e:
-        print(f"set_send_timeコマンドでエラーが発生しました: {e}")
-        import traceback
-        traceback.print_exc()
+        command_logger.exception(f"set_send_timeコマンドでエラーが発生しました: {e}")
         try:
             if not interaction.response.is_done():
                 await interaction.response.send_message(
@@ -916,7 +1447,7 @@ async def set_send_time(interaction: discord.Interaction, time: str):
                     ephemeral=True
                 )
         except Exception as followup_error:
-            print(f"エラーメッセージの送信に失敗しました: {followup_error}")
+            command_logger.warning(f"エラーメッセージの送信に失敗しました: {followup_error}")
 
 
 @bot.tree.command(name="set_summary_time", description="show_summaryの自動実行時間を設定")
@@ -931,28 +1462,22 @@ async def set_summary_time(interaction: discord.Interaction, time: str):
             )
             return
         
-        # 即座に応答を送信（タイムアウトを防ぐ）
-        await interaction.response.defer(ephemeral=True)
-        
-        # 設定を更新
-        config["summary_time"] = time
-        scheduler.summary_time = scheduler._parse_time(time)
-        
-        # config.jsonに保存（環境変数が設定されていない場合のみ）
-        save_config_to_file({"summary_time": time})
+        # 設定を即座に反映（スケジューラータスクは止めない、configも更新される）
+        due_now = scheduler.apply_config({"summary_time": time})
+        if due_now:
+            # 変更後の時刻が現在の分に該当する場合は次の定期チェックを待たずに確認
+            scheduler.request_tick()
         
-        # スケジューラーを再起動
-        await restart_scheduler()
+        # config.jsonへの保存はバックグラウンドで行う（環境変数が設定されていない場合のみ）
+        config_store.schedule_save({"summary_time": time})
         
         # 完了メッセージを送信
-        await interaction.followup.send(
+        await interaction.response.send_message(
             f"show_summaryの自動実行時間を {time} に設定しました。",
             ephemeral=True
         )
     except Exception as e:
-        print(f"set_summary_timeコマンドでエラーが発生しました: {e}")
-        import traceback
-        traceback.print_exc()
+        command_logger.exception(f"set_summary_timeコマンドでエラーが発生しました: {e}")
         try:
             if not interaction.response.is_done():
                 await interaction.response.send_message(
@@ -965,7 +1490,7 @@ async def set_summary_time(interaction: discord.Interaction, time: str):
                     ephemeral=True
                 )
         except Exception as followup_error:
-            print(f"エラーメッセージの送信に失敗しました: {followup_error}")
+            command_logger.warning(f"エラーメッセージの送信に失敗しました: {followup_error}")
 
 
 @bot.tree.command(name="view_auto_times", description="自動実行時間の設定を確認")
@@ -1000,6 +1525,22 @@ async def view_auto_times(interaction: discord.Interaction):
             inline=False
         )
         
+        next_send = scheduler.next_send_at.strftime('%Y-%m-%d %H:%M') if scheduler.next_send_at else "なし"
+        next_summary = scheduler.next_summary_at.strftime('%Y-%m-%d %H:%M') if scheduler.next_summary_at else "なし"
+        embed.add_field(
+            name="次回の予定",
+            value=f"送信: {next_send}\n集計: {next_summary}",
+            inline=False
+        )
+
+        if leader_lease is not None:
+            # 複数レプリカ時、送信・集計を行うのはリーダーのみ
+            embed.add_field(
+                name="リーダー選出",
+                value="このレプリカがリーダーです" if leader_lease.is_leader else "他のレプリカがリーダーです（このレプリカは送信・集計しません）",
+                inline=False
+            )
+
         if is_env_send or is_env_summary:
             embed.set_footer(
                 text="環境変数が設定されている場合、コマンドで変更しても環境変数が優先されます。"
@@ -1007,9 +1548,7 @@ async def view_auto_times(interaction: discord.Interaction):
         
         await interaction.response.send_message(embed=embed)
     except Exception as e:
-        print(f"view_auto_timesコマンドでエラーが発生しました: {e}")
-        import traceback
-        traceback.print_exc()
+        command_logger.exception(f"view_auto_timesコマンドでエラーが発生しました: {e}")
         try:
             if not interaction.response.is_done():
                 await interaction.response.send_message(
@@ -1022,7 +1561,7 @@ async def view_auto_times(interaction: discord.Interaction):
                     ephemeral=True
                 )
         except Exception as followup_error:
-            print(f"エラーメッセージの送信に失敗しました: {followup_error}")
+            command_logger.warning(f"エラーメッセージの送信に失敗しました: {followup_error}")
 
 
 @bot.tree.command(name="check_schedule", description="指定された日付に自動実行されるかどうかを確認")
@@ -1080,11 +1619,29 @@ async def check_schedule(interaction: discord.Interaction, date: str = None):
             inline=False
         )
         
+        # 祝日情報
+        holiday_info = []
+        if result['next_holiday']:
+            next_date, next_name = result['next_holiday']
+            holiday_info.append(f"次の祝日: {next_date.strftime('%Y年%m月%d日')}（{next_name}）")
+        if result['holiday_block']:
+            block_start, block_end = result['holiday_block']
+            block_days = (block_end - block_start).days + 1
+            holiday_info.append(f"連休: {block_start.strftime('%m月%d日')} ～ {block_end.strftime('%m月%d日')}（{block_days}日間）")
+        
+        # 今後30日間の送信予定
+        upcoming = scheduler.get_send_dates(target_date, target_date + timedelta(days=29))
+        holiday_info.append(f"今後30日間の送信予定: {len(upcoming)}回")
+        
+        embed.add_field(
+            name="祝日・今後の予定",
+            value="\n".join(holiday_info),
+            inline=False
+        )
+        
         await interaction.response.send_message(embed=embed)
     except Exception as e:
-        print(f"check_scheduleコマンドでエラーが発生しました: {e}")
-        import traceback
-        traceback.print_exc()
+        command_logger.exception(f"check_scheduleコマンドでエラーが発生しました: {e}")
         try:
             if not interaction.response.is_done():
                 await interaction.response.send_message(
@@ -1097,7 +1654,7 @@ async def check_schedule(interaction: discord.Interaction, date: str = None):
                     ephemeral=True
                 )
         except Exception as followup_error:
-            print(f"エラーメッセージの送信に失敗しました: {followup_error}")
+            command_logger.warning(f"エラーメッセージの送信に失敗しました: {followup_error}")
 
 
 @bot.tree.command(name="schedule_send", description="指定された日時にメッセージを送信するように予約")
@@ -1148,9 +1705,7 @@ async def schedule_send(interaction: discord.Interaction, date: str, time: str =
             ephemeral=True
         )
     except Exception as e:
-        print(f"schedule_sendコマンドでエラーが発生しました: {e}")
-        import traceback
-        traceback.print_exc()
+        command_logger.exception(f"schedule_sendコマンドでエラーが発生しました: {e}")
         try:
             if not interaction.response.is_done():
                 await interaction.response.send_message(
@@ -1163,7 +1718,7 @@ async def schedule_send(interaction: discord.Interaction, date: str, time: str =
                     ephemeral=True
                 )
         except Exception as followup_error:
-            print(f"エラーメッセージの送信に失敗しました: {followup_error}")
+            command_logger.warning(f"エラーメッセージの送信に失敗しました: {followup_error}")
 
 
 @bot.tree.command(name="list_schedules", description="予約されている送信の一覧を表示")
@@ -1198,9 +1753,7 @@ async def list_schedules(interaction: discord.Interaction):
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
     except Exception as e:
-        print(f"list_schedulesコマンドでエラーが発生しました: {e}")
-        import traceback
-        traceback.print_exc()
+        command_logger.exception(f"list_schedulesコマンドでエラーが発生しました: {e}")
         try:
             if not interaction.response.is_done():
                 await interaction.response.send_message(
@@ -1213,7 +1766,7 @@ async def list_schedules(interaction: discord.Interaction):
                     ephemeral=True
                 )
         except Exception as followup_error:
-            print(f"エラーメッセージの送信に失敗しました: {followup_error}")
+            command_logger.warning(f"エラーメッセージの送信に失敗しました: {followup_error}")
 
 
 @bot.tree.command(name="cancel_schedule", description="予約されている送信をキャンセル")
@@ -1257,9 +1810,78 @@ async def cancel_schedule(interaction: discord.Interaction, date: str, time: str
                 ephemeral=True
             )
     except Exception as e:
-        print(f"cancel_scheduleコマンドでエラーが発生しました: {e}")
-        import traceback
-        traceback.print_exc()
+        command_logger.exception(f"cancel_scheduleコマンドでエラーが発生しました: {e}")
+        try:
+            if not interaction.response.is_done():
+                await interaction.response.send_message(
+                    "エラーが発生しました。管理者に連絡してください。",
+                    ephemeral=True
+                )
+            else:
+                await interaction.followup.send(
+                    "エラーが発生しました。管理者に連絡してください。",
+                    ephemeral=True
+                )
+        except Exception as followup_error:
+            command_logger.warning(f"エラーメッセージの送信に失敗しました: {followup_error}")
+
+
+# 一括登録で受け付ける祝日ファイルの最大サイズ（バイト）
+MAX_HOLIDAY_FILE_SIZE = 1024 * 1024
+
+
+@bot.tree.command(name="import_holidays", description="CSV/ICSファイルから祝日を一括登録（管理者用）")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(file="祝日ファイル（CSV: 日付,祝日名 / ICS: iCalendar形式）")
+async def import_holidays(interaction: discord.Interaction, file: discord.Attachment):
+    """CSV/ICSファイルから祝日を一括登録"""
+    try:
+        if file.size > MAX_HOLIDAY_FILE_SIZE:
+            await interaction.response.send_message(
+                f"ファイルが大きすぎます（上限: {MAX_HOLIDAY_FILE_SIZE // 1024}KB）。",
+                ephemeral=True
+            )
+            return
+        
+        # 即座に応答を送信（タイムアウトを防ぐ）
+        await interaction.response.defer(ephemeral=True)
+        
+        data = await file.read()
+        try:
+            entries = parse_holiday_file(file.filename, data)
+        except (ValueError, UnicodeDecodeError) as e:
+            await interaction.followup.send(
+                f"ファイルを読み込めませんでした: {e}",
+                ephemeral=True
+            )
+            return
+        
+        if not entries:
+            await interaction.followup.send(
+                "登録できる祝日が見つかりませんでした。",
+                ephemeral=True
+            )
+            return
+        
+        # まとめて登録（holidays.jsonへの書き込みは1回）
+        try:
+            count = holiday_manager.import_holidays(entries)
+        except ValueError as e:
+            await interaction.followup.send(
+                f"祝日を登録できませんでした: {e}",
+                ephemeral=True
+            )
+            return
+        first = min(d for d, _ in entries)
+        last = max(d for d, _ in entries)
+        holiday_logger.info(f"{file.filename} から {count} 件の祝日を登録しました（{first} ～ {last}）")
+        
+        await interaction.followup.send(
+            f"{count}件の祝日を登録しました（{first.strftime('%Y年%m月%d日')} ～ {last.strftime('%Y年%m月%d日')}）。",
+            ephemeral=True
+        )
+    except Exception as e:
+        command_logger.exception(f"import_holidaysコマンドでエラーが発生しました: {e}")
         try:
             if not interaction.response.is_done():
                 await interaction.response.send_message(
@@ -1272,7 +1894,7 @@ async def cancel_schedule(interaction: discord.Interaction, date: str, time: str
                     ephemeral=True
                 )
         except Exception as followup_error:
-            print(f"エラーメッセージの送信に失敗しました: {followup_error}")
+            command_logger.warning(f"エラーメッセージの送信に失敗しました: {followup_error}")
 
 
 @bot.tree.command(name="sync_commands", description="コマンドを手動で同期（コマンドが表示されない場合に使用）")
@@ -1289,10 +1911,11 @@ async def sync_commands_cmd(interaction: discord.Interaction):
         
         # サーバー限定同期のみを強制的に実行（即座に反映される）
         guild_id = config.get("guild_id")
+        # 手動実行時はコマンド定義に変更がなくても同期する
         if guild_id and str(guild_id).strip():
-            synced_commands = await sync_commands(force_guild_only=True)
+            synced_commands = await sync_commands(force_guild_only=True, force=True)
         else:
-            synced_commands = await sync_commands(force_guild_only=False)
+            synced_commands = await sync_commands(force_guild_only=False, force=True)
         
         if synced_commands:
             command_list = "\n".join(f"- `/{cmd}`" for cmd in sorted(synced_commands))
@@ -1321,86 +1944,315 @@ async def sync_commands_cmd(interaction: discord.Interaction):
                 ephemeral=True
             )
     except Exception as e:
-        print(f"sync_commandsコマンドでエラーが発生しました: {e}")
-        import traceback
-        traceback.print_exc()
+        command_logger.exception(f"sync_commandsコマンドでエラーが発生しました: {e}")
         try:
             await interaction.followup.send(
                 "エラーが発生しました。管理者に連絡してください。",
                 ephemeral=True
             )
         except Exception as followup_error:
-            print(f"エラーメッセージの送信に失敗しました: {followup_error}")
+            command_logger.warning(f"エラーメッセージの送信に失敗しました: {followup_error}")
 
 
-# Cloud Run用のHTTPサーバー（ヘルスチェック対応）
-class HealthCheckHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'text/plain')
-        self.end_headers()
-        self.wfile.write(b'OK')
-    
-    def log_message(self, format, *args):
-        # ログを抑制（Discordボットのログと混在しないように）
-        pass
+@bot.tree.command(name="bot_stats", description="処理時間・キュー・メモリなどの統計を表示（管理者用）")
+@app_commands.default_permissions(administrator=True)
+async def bot_stats(interaction: discord.Interaction):
+    """処理時間・キュー・メモリなどの統計を表示"""
+    try:
+        instrumentation = get_instrumentation()
+        embed = discord.Embed(title="ボットの統計", color=discord.Color.blue())
+        
+        operations = instrumentation.stats()
+        operation_lines = [
+            f"`{name}` {stat['count']}回 平均{stat['avg_ms']}ms p95 {stat['p95_ms']}ms 最大{stat['max_ms']}ms"
+            + (f" エラー{stat['errors']}回" if stat["errors"] else "")
+            for name, stat in operations.items()
+        ]
+        embed.add_field(name="処理時間（直近）", value="\n".join(operation_lines)[:1024] or "記録なし", inline=False)
+        
+        io_lines = [
+            f"`{name}` " + " / ".join(f"{'読込' if direction == 'read' else '書込'} {amount / 1024:.1f}KiB"
+                                      for direction, amount in sorted(directions.items()))
+            for name, directions in instrumentation.io_stats().items()
+        ]
+        embed.add_field(name="ファイルI/O（累計）", value="\n".join(io_lines)[:1024] or "記録なし", inline=False)
+        
+        queue_lines = [f"`{name}` {depth}件" for name, depth in instrumentation.queue_depths().items()]
+        embed.add_field(name="キュー", value="\n".join(queue_lines) or "なし", inline=True)
+        
+        def ms(value) -> str:
+            return f"{value}ms" if value is not None else "-"
+        
+        writer = response_writer.stats()
+        sender = dispatcher.stats()
+        resolver = channel_resolver.stats()
+        embed.add_field(
+            name="応答・送信",
+            value=(
+                f"応答 平均{ms(writer['ack']['avg_ms'])} p95 {ms(writer['ack']['p95_ms'])}\n"
+                f"保存 平均{ms(writer['write']['avg_ms'])} p95 {ms(writer['write']['p95_ms'])} 失敗{writer['failures']}件\n"
+                f"送信 {sender['sent']}件 再試行{sender['retries']}回 失敗{sender['failures']}件 "
+                f"{sender['messages_per_second']}件/秒\n"
+                f"チャンネル キャッシュ{resolver['cached']}件 ヒット{resolver['hits']}回 取得{resolver['fetches']}回"
+            ),
+            inline=True
+        )
+        
+        tick_age = scheduler.seconds_since_last_tick()
+        job_lines = [f"最後のチェック: {f'{tick_age:.0f}秒前' if tick_age is not None else 'なし'}"]
+        for kind, latencies in scheduler.job_latencies.items():
+            if latencies:
+                job_lines.append(f"{kind}ジョブ: {len(latencies)}回 最大{max(latencies) * 1000:.0f}ms")
+        embed.add_field(name="スケジューラー", value="\n".join(job_lines), inline=False)
+        
+        if diagnostics is not None:
+            loop_stats = diagnostics.stats()
+            loop_lines = [
+                f"遅いコールバック {loop_stats['slow_callbacks']}回 / 停止 {loop_stats['stalls']}回 "
+                f"最大{loop_stats['max_blocked_ms']}ms"
+            ]
+            loop_lines.extend(
+                f"{event['kind']} {event['seconds'] * 1000:.0f}ms `{event['description'][:80]}`"
+                for event in loop_stats["recent"]
+            )
+            embed.add_field(name="イベントループ（診断モード）", value="\n".join(loop_lines)[:1024], inline=False)
+        
+        memory_reporter.sample()
+        memory = memory_reporter.stats()
+        embed.add_field(
+            name="メモリ",
+            value=(
+                f"RSS {format_bytes(memory['rss_bytes'])} / ピーク {format_bytes(memory['peak_rss_bytes'])}"
+                + (f" / 余裕 {format_bytes(memory['headroom_bytes'])}" if memory["limit_bytes"] else "")
+            ),
+            inline=False
+        )
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    except Exception as e:
+        command_logger.exception(f"bot_statsコマンドでエラーが発生しました: {e}")
+        try:
+            if not interaction.response.is_done():
+                await interaction.response.send_message(
+                    "エラーが発生しました。管理者に連絡してください。",
+                    ephemeral=True
+                )
+        except Exception as followup_error:
+            command_logger.warning(f"エラーメッセージの送信に失敗しました: {followup_error}")
+
+
+@bot.tree.command(name="profile", description="イベントループのプロファイルを取得（管理者用・診断モードのみ）")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(
+    seconds="取得する秒数（1～60）",
+    mode="cProfile（全関数の呼び出し回数と時間）またはサンプリング（5msごとのスタック、負荷が小さい）"
+)
+@app_commands.choices(mode=[
+    app_commands.Choice(name="cProfile", value="cprofile"),
+    app_commands.Choice(name="サンプリング", value="sampling"),
+])
+async def profile(
+    interaction: discord.Interaction,
+    seconds: app_commands.Range[int, 1, 60] = 10,
+    mode: str = "sampling"
+):
+    """イベントループのプロファイルを取得してファイルで返す"""
+    try:
+        if diagnostics is None:
+            await interaction.response.send_message(
+                "診断モードが無効です。環境変数DIAGNOSTICS=true または --diagnostics で起動してください。",
+                ephemeral=True
+            )
+            return
+        
+        # 即座に応答を送信（タイムアウトを防ぐ）
+        await interaction.response.defer(ephemeral=True)
+        try:
+            summary, report = await diagnostics.profile(seconds, mode)
+        except RuntimeError as e:
+            await interaction.followup.send(f"{e}。完了してから再度実行してください。", ephemeral=True)
+            return
+        
+        filename = f"profile-{mode}-{datetime.now(pytz.timezone('Asia/Tokyo')).strftime('%Y%m%d-%H%M%S')}.txt"
+        await interaction.followup.send(
+            summary,
+            file=discord.File(io.BytesIO(report.encode("utf-8")), filename=filename),
+            ephemeral=True
+        )
+    except Exception as e:
+        command_logger.exception(f"profileコマンドでエラーが発生しました: {e}")
+        try:
+            if not interaction.response.is_done():
+                await interaction.response.send_message(
+                    "エラーが発生しました。管理者に連絡してください。",
+                    ephemeral=True
+                )
+        except Exception as followup_error:
+            command_logger.warning(f"エラーメッセージの送信に失敗しました: {followup_error}")
 
-def start_health_check_server(port=8080):
-    """Cloud Run用のヘルスチェックサーバーを起動"""
-    server = HTTPServer(('', port), HealthCheckHandler)
-    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
-    server_thread.start()
-    print(f"[ヘルスチェック] HTTPサーバーをポート{port}で起動しました")
 
+# キューの長さ（/metricsのbot_queue_depthと/bot_statsで表示）
+get_instrumentation().add_queue("dispatcher", lambda: dispatcher.stats()["queued"])
+get_instrumentation().add_queue("dispatcher_waiting_for_slot", lambda: dispatcher.stats()["waiting_for_slot"])
+get_instrumentation().add_queue("response_writer", lambda: response_writer.pending_count)
+get_instrumentation().add_queue("live_summary", lambda: live_summary_updater.pending_count)
+get_instrumentation().add_queue("channel_fetches", lambda: channel_resolver.stats()["inflight"])
 
-if __name__ == "__main__":
-    # Cloud Run用のHTTPサーバーを起動（環境変数PORTが設定されている場合）
-    port = int(os.environ.get('PORT', 0))
-    if port > 0:
-        start_health_check_server(port)
+
+# Gatewayから切断されてから、再接続できないまま再起動が必要とみなすまでの秒数
+GATEWAY_RECONNECT_GRACE_SECONDS = 600
+# 最後のスケジューラーチェックからこの秒数を超えたら準備未完了（チェックは1分ごと）
+SCHEDULER_READY_TICK_AGE_SECONDS = 180
+# 最後のスケジューラーチェックからこの秒数を超えたら固まっているとみなし、再起動させる
+SCHEDULER_LIVE_TICK_AGE_SECONDS = 600
+
+# ヘルスチェックサーバー（環境変数PORTが設定されている場合のみ起動）
+health_server = None
+# Gatewayから切断された時刻（time.monotonic、接続中はNone）
+gateway_disconnected_at = None
+
+
+@bot.event
+async def on_connect():
+    """Gatewayに接続したときの処理"""
+    global gateway_disconnected_at
+    gateway_disconnected_at = None
+
+
+@bot.event
+async def on_resumed():
+    """Gatewayのセッションを再開したときの処理"""
+    global gateway_disconnected_at
+    gateway_disconnected_at = None
+
+
+@bot.event
+async def on_disconnect():
+    """Gatewayから切断されたときの処理（discord.pyが自動で再接続する）"""
+    global gateway_disconnected_at
+    if gateway_disconnected_at is None:
+        gateway_disconnected_at = monotonic()
+
+
+def scheduler_expected() -> bool:
+    """このプロセスでスケジューラータスクが動いているべきかどうか"""
+    return owns_schedule() and not (run_once_flag or run_once_send_flag or run_once_summary_flag)
+
+
+def check_gateway_ready():
+    """Gatewayに接続済みで、準備が完了しているか"""
+    if bot.is_closed():
+        return False, "クライアントが終了しています"
+    if not bot.is_ready():
+        return False, "Gatewayの準備が完了していません"
+    if gateway_disconnected_at is not None:
+        return False, f"Gatewayから切断中です（{monotonic() - gateway_disconnected_at:.0f}秒）"
+    return True, f"接続中（レイテンシ {bot.latency * 1000:.0f}ms）"
+
+
+def check_gateway_alive():
+    """Gatewayからの切断が長く続いていないか（再接続できずに固まっていないか）"""
+    if gateway_disconnected_at is None:
+        return True, "切断は続いていません"
+    disconnected = monotonic() - gateway_disconnected_at
+    return disconnected < GATEWAY_RECONNECT_GRACE_SECONDS, f"{disconnected:.0f}秒間切断されています"
+
+
+def check_scheduler(max_tick_age: float, require_started: bool):
+    """
+    スケジューラータスクが動いていて、最後のチェックから時間が経ちすぎていないか
     
-    # コマンドライン引数の解析
-    parser = argparse.ArgumentParser(description="Discordボット")
-    parser.add_argument(
-        "--test-send-time",
-        type=str,
-        help="テスト用の送信時刻を指定（HH:MM形式、例: 20:00）"
+    Args:
+        max_tick_age: 最後のチェックからの経過秒数の上限
+        require_started: タスクが開始済みであることを必須にする場合True
+    """
+    if not scheduler_expected():
+        return True, "このプロセスはスケジュール送信を担当しません"
+    task = scheduler_task.get_task()
+    if scheduler_task.failed() or (task is not None and task.done()):
+        # 開始後に終了したタスク（before_loopでの例外を含む）は再開されない
+        return False, "スケジューラータスクが停止しました"
+    if not scheduler_task.is_running():
+        return (not require_started), "スケジューラータスクが開始されていません"
+    age = scheduler.seconds_since_last_tick()
+    if age is None:
+        return (not require_started), "まだチェックを実行していません"
+    return age < max_tick_age, f"最後のチェックから{age:.0f}秒"
+
+
+def register_metrics(registry):
+    """ボットの状態をメトリクスとして登録（値は/metricsの出力時に取得）"""
+    registry.gauge("bot_gateway_connected", "Gatewayに接続済みなら1").set_function(
+        lambda: 1 if check_gateway_ready()[0] else 0
     )
-    parser.add_argument(
-        "--force-send",
-        action="store_true",
-        help="即座にメッセージを送信（テスト用）"
+    registry.gauge("bot_gateway_latency_seconds", "Gatewayのハートビートのレイテンシ").set_function(
+        lambda: bot.latency if math.isfinite(bot.latency) else None
     )
-    parser.add_argument(
-        "--run-once",
-        action="store_true",
-        help="起動後に送信対象を判定し、1回だけ送信して終了（Cloud Run Job向け）"
+    registry.gauge("bot_guilds", "参加しているギルド数").set_function(lambda: len(bot.guilds))
+    registry.gauge("bot_scheduler_last_tick_age_seconds", "最後のスケジューラーチェックからの経過秒数").set_function(
+        scheduler.seconds_since_last_tick
     )
-    parser.add_argument(
-        "--holiday-eve-only",
-        action="store_true",
-        help="--run-once時に祝前日のみ送信（曜日設定は無視）"
+    registry.gauge("bot_scheduler_running_jobs", "実行中の送信・集計ジョブ数", ["kind"]).set_function(
+        lambda: {kind: len(scheduler.running_jobs(kind)) for kind in ("send", "summary")}
     )
-    parser.add_argument(
-        "--run-once-summary-buffer-minutes",
-        type=int,
-        default=10,
-        help="--run-once時、集計送信後に待機する分数（デフォルト: 10）"
+    registry.gauge("bot_dispatcher_messages_per_second", "直近の送信レート").set_function(
+        dispatcher.messages_per_second
     )
-    args = parser.parse_args()
+    registry.gauge("bot_memory_rss_bytes", "常駐メモリ（RSS）").set_function(memory_reporter.sample)
+    if leader_lease is not None:
+        registry.gauge("bot_scheduler_leader", "このレプリカがスケジューラーのリーダーなら1").set_function(
+            lambda: 1 if leader_lease.is_leader else 0
+        )
 
-    # Cloud Run Job向け: 祝前日以外はDiscordにログインせず即終了（最小コスト）
-    if args.run_once and args.holiday_eve_only:
-        jst = pytz.timezone("Asia/Tokyo")
-        now = datetime.now(jst)
-        hm = HolidayManager()
-        holiday_tomorrow = hm.get_holiday_before_date(now)
-        if holiday_tomorrow is None:
-            print("[run-once] 祝前日ではないため、Discordにログインせず終了します")
-            exit(0)
+
+def build_health_server(port: int) -> HealthServer:
+    """ヘルスチェックサーバーを作成（/healthz, /readyz, /metrics）"""
+    registry = get_registry()
+    register_metrics(registry)
+    server = HealthServer(registry, port)
+    server.add_check("gateway", check_gateway_ready)
+    server.add_check("gateway_reconnect", check_gateway_alive, liveness=True)
+    server.add_check(
+        "scheduler",
+        lambda: check_scheduler(SCHEDULER_READY_TICK_AGE_SECONDS, require_started=True)
+    )
+    server.add_check(
+        "scheduler_alive",
+        lambda: check_scheduler(SCHEDULER_LIVE_TICK_AGE_SECONDS, require_started=False),
+        liveness=True
+    )
+    return server
+
+
+if __name__ == "__main__":
+    # Cloud Run用のヘルスチェックサーバー（環境変数PORTが設定されている場合、setup_hookでボットのループ上に起動）
+    port = int(os.environ.get('PORT', 0))
+    if port > 0:
+        health_server = build_health_server(port)
+    
+    # コマンドライン引数の解析
+    # run-onceの送信対象外判定はファイル先頭（discord.pyの読み込み前）で済んでいる
+    args = build_arg_parser().parse_args()
+    
+    # 診断モード（イベントループの停止の検知と/profileコマンド）
+    if args.diagnostics or config.get("diagnostics", False):
+        diagnostics = LoopDiagnostics(
+            slow_callback_seconds=float(config.get("diagnostics_slow_callback_ms", 100)) / 1000,
+            stall_seconds=float(config.get("diagnostics_stall_seconds", 1))
+        )
+    
+    if shard_config is not None and schedule_guild_id(config) is None:
+        # 回答は各ギルドを担当するプロセスに届くため、送信・集計するギルドを決めておく必要がある
+        shard_logger.error("シャード分割時はguild_id（環境変数GUILD_ID）の設定が必要です。")
+        sys.exit(2)
+    
+    if leader_lease is not None and not leader_lease.verify_shared_directory(os.path.dirname(data_manager.data_file)):
+        # 回答・送信記録・予約がレプリカごとに分かれると、引き継いだリーダーが二重送信や送信漏れを起こす
+        logger.error("複数レプリカで動かす場合はdata/を全レプリカ共有のボリューム（POSIXのファイルロックに対応したもの）に置いてください。")
+        sys.exit(2)
     
     if not config.get("token"):
-        print("エラー: config.jsonにトークンが設定されていません。")
+        logger.error("config.jsonにトークンが設定されていません。")
     else:
         # テスト用の送信時刻が指定されている場合
         if args.test_send_time:
@@ -1409,9 +2261,9 @@ if __name__ == "__main__":
                 test_send_time = time(hour, minute)
                 # スケジューラーの送信時刻を一時的に変更
                 scheduler.send_time = test_send_time
-                print(f"[テスト] 送信時刻を {args.test_send_time} に設定しました")
+                logger.info(f"送信時刻を {args.test_send_time} に設定しました")
             except ValueError:
-                print(f"エラー: 送信時刻の形式が正しくありません。HH:MM形式で指定してください（例: 20:00）")
+                logger.error("送信時刻の形式が正しくありません。HH:MM形式で指定してください（例: 20:00）")
                 exit(1)
         
         # 即座に送信する場合（テスト用）
@@ -1426,5 +2278,19 @@ if __name__ == "__main__":
             globals()['holiday_eve_only_flag'] = bool(args.holiday_eve_only)
             globals()['run_once_summary_buffer_minutes'] = int(args.run_once_summary_buffer_minutes)
         
-        bot.run(config["token"])
+        # Cloud Run Job向け（2フェーズ: 送信と集計を別々のジョブで実行）
+        if args.run_once_send:
+            globals()['run_once_send_flag'] = True
+            globals()['holiday_eve_only_flag'] = bool(args.holiday_eve_only)
+        if args.run_once_summary:
+            globals()['run_once_summary_flag'] = True
+        
+        # discord.pyのログもsetup_loggingの出力先に流す（discord.py独自のハンドラーは設定しない）
+        bot.run(config["token"], log_handler=None)
+        
+        # 正常終了時はリースを手放し、他のレプリカがTTLを待たずに引き継げるようにする
+        if leader_lease is not None:
+            leader_lease.release()
+        if diagnostics is not None:
+            diagnostics.stop()
 
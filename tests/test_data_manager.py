@@ -0,0 +1,47 @@
+"""utils.data_manager のテスト（複数レプリカでの共有）"""
+import os
+from datetime import datetime
+
+import pytz
+
+from utils.data_manager import DataManager
+from utils.summary_renderer import SummaryPageCache, render_summary_pages
+
+
+def test_shared_managers_keep_each_others_responses(tmp_path):
+    path = str(tmp_path / "responses.json")
+    date = pytz.timezone("Asia/Tokyo").localize(datetime(2026, 1, 2))
+    first = DataManager(path, shared=True)
+    second = DataManager(path, shared=True)
+    first.warm()
+    second.warm()
+
+    # それぞれのレプリカが、もう一方の保存後に古いキャッシュのまま保存しようとする
+    first.save_response(1, date, True, "20:00", "22:00")
+    second.save_response(2, date, False)
+    first.save_response(3, date, True, "21:00", "23:00")
+
+    responses = DataManager(path).get_responses_for_date(date)
+    assert sorted(response["user_id"] for response in responses) == [1, 2, 3]
+    assert DataManager(path).get_summary(date)["attendable_count"] == 2
+
+
+def test_page_cache_notices_responses_saved_by_another_replica(tmp_path):
+    path = str(tmp_path / "responses.json")
+    date = pytz.timezone("Asia/Tokyo").localize(datetime(2026, 1, 2))
+    leader = DataManager(path, shared=True)
+    follower = DataManager(path, shared=True)
+    cache = SummaryPageCache()
+
+    leader.save_response(1, date, True, "20:00", "22:00")
+    version = leader.data_version()
+    cache.put("2026-01-02", render_summary_pages(leader.get_summary(date)), version)
+    assert cache.get("2026-01-02", leader.data_version()) is not None
+
+    # 別のレプリカが受け付けた回答は、リーダーのResponseWriterからは通知されない
+    follower.save_response(2, date, True, "21:00", "23:00")
+    os.utime(path, (os.stat(path).st_mtime + 1,) * 2)
+
+    assert leader.data_version() != version
+    assert cache.get("2026-01-02", leader.data_version()) is None
+    assert leader.get_summary(date)["attendable_count"] == 2
@@ -0,0 +1,199 @@
+"""utils.dispatcher のテスト"""
+import asyncio
+import time
+
+import pytest
+
+from utils.dispatcher import (
+    PRIORITY_ANALYTICS,
+    PRIORITY_QUESTION,
+    PRIORITY_SUMMARY,
+    MessageDispatcher,
+    default_retry_delay,
+)
+
+
+class FakeHTTPError(Exception):
+    """discord.HTTPException / discord.RateLimited と同じ属性を持つ例外"""
+
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"status={status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class FakeSender:
+    """送信内容と時刻を記録し、指定した例外を順に送出する送信先"""
+
+    def __init__(self, errors=None):
+        self.sent = []
+        self.times = []
+        self.calls = 0
+        self._errors = list(errors or [])
+
+    def __call__(self, label):
+        async def send():
+            self.calls += 1
+            if self._errors:
+                raise self._errors.pop(0)
+            self.sent.append(label)
+            self.times.append(time.monotonic())
+            return label
+        return send
+
+
+def fast_retry_delay(error, attempt, idempotent=False):
+    """テスト用に待ち時間を縮めた default_retry_delay"""
+    delay = default_retry_delay(error, attempt, idempotent, base_delay=0.01, max_delay=0.05)
+    return None if delay is None else min(delay, 0.05)
+
+
+def test_questions_are_sent_before_summaries():
+    async def scenario():
+        dispatcher = MessageDispatcher(retry_delay=fast_retry_delay)
+        sender = FakeSender()
+        # ワーカーが動き出す前にすべてキューに入るので、優先度順（同じ優先度は投入順）に送信される
+        futures = [
+            dispatcher.submit(1, sender("summary-1"), PRIORITY_SUMMARY),
+            dispatcher.submit(1, sender("analytics"), PRIORITY_ANALYTICS),
+            dispatcher.submit(1, sender("summary-2"), PRIORITY_SUMMARY),
+            dispatcher.submit(1, sender("question"), PRIORITY_QUESTION),
+        ]
+        await asyncio.gather(*futures)
+        return sender.sent
+
+    sent = asyncio.run(scenario())
+    assert sent == ["question", "summary-1", "summary-2", "analytics"]
+
+
+def test_per_channel_bucket_waits_for_window():
+    async def scenario():
+        dispatcher = MessageDispatcher(bucket_limit=2, bucket_per=0.2, retry_delay=fast_retry_delay)
+        sender = FakeSender()
+        await asyncio.gather(*(dispatcher.submit(1, sender(i)) for i in range(3)))
+        return sender.times
+
+    times = asyncio.run(scenario())
+    # 2件送った後、3件目はバケットが空くまで待つ
+    assert times[1] - times[0] < 0.1
+    assert times[2] - times[0] >= 0.19
+
+
+def test_buckets_are_independent_per_channel():
+    async def scenario():
+        dispatcher = MessageDispatcher(bucket_limit=1, bucket_per=0.5, retry_delay=fast_retry_delay)
+        sender = FakeSender()
+        start = time.monotonic()
+        await asyncio.gather(*(dispatcher.submit(channel, sender(channel)) for channel in range(3)))
+        return time.monotonic() - start
+
+    # チャンネルが異なればバケットを待たない
+    assert asyncio.run(scenario()) < 0.25
+
+
+def test_global_limit_spans_channels():
+    async def scenario():
+        dispatcher = MessageDispatcher(global_per_second=3, retry_delay=fast_retry_delay)
+        sender = FakeSender()
+        start = time.monotonic()
+        await asyncio.gather(*(dispatcher.submit(channel, sender(channel)) for channel in range(4)))
+        return [t - start for t in sorted(sender.times)]
+
+    offsets = asyncio.run(scenario())
+    # 1秒あたり3件までなので、4件目は最初の送信から1秒後になる
+    assert offsets[2] < 0.5
+    assert offsets[3] >= 0.95
+
+
+def test_rate_limited_send_waits_retry_after():
+    async def scenario():
+        dispatcher = MessageDispatcher(retry_delay=default_retry_delay)
+        sender = FakeSender(errors=[FakeHTTPError(429, retry_after=0.2)])
+        start = time.monotonic()
+        result = await dispatcher.send(1, sender("message"))
+        return result, time.monotonic() - start, sender, dispatcher.stats()
+
+    result, elapsed, sender, stats = asyncio.run(scenario())
+    assert result == "message"
+    assert elapsed >= 0.19
+    assert sender.calls == 2
+    assert stats["retries"] == 1
+    assert stats["sent"] == 1
+
+
+def test_server_error_is_retried_with_backoff_when_idempotent():
+    async def scenario():
+        dispatcher = MessageDispatcher(max_retries=3, retry_delay=fast_retry_delay)
+        sender = FakeSender(errors=[FakeHTTPError(503), FakeHTTPError(502)])
+        result = await dispatcher.send(1, sender("edit"), idempotent=True)
+        return result, sender.calls, dispatcher.stats()
+
+    result, calls, stats = asyncio.run(scenario())
+    assert result == "edit"
+    assert calls == 3
+    assert stats["retries"] == 2
+
+
+def test_server_error_is_not_retried_by_default():
+    async def scenario():
+        dispatcher = MessageDispatcher(retry_delay=fast_retry_delay)
+        sender = FakeSender(errors=[FakeHTTPError(500)])
+        with pytest.raises(FakeHTTPError):
+            await dispatcher.send(1, sender("message"))
+        return sender.calls, dispatcher.stats()
+
+    calls, stats = asyncio.run(scenario())
+    # channel.sendを再試行すると二重投稿になりうるため、そのまま呼び出し元に返す
+    assert calls == 1
+    assert stats["failures"] == 1
+    assert stats["retries"] == 0
+
+
+def test_retries_give_up_after_max_retries():
+    async def scenario():
+        dispatcher = MessageDispatcher(max_retries=2, retry_delay=fast_retry_delay)
+        sender = FakeSender(errors=[FakeHTTPError(429, retry_after=0.01)] * 5)
+        with pytest.raises(FakeHTTPError):
+            await dispatcher.send(1, sender("message"))
+        return sender.calls
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_non_retryable_error_surfaces_and_queue_continues():
+    async def scenario():
+        dispatcher = MessageDispatcher(retry_delay=fast_retry_delay)
+        sender = FakeSender(errors=[FakeHTTPError(403)])
+        failed = dispatcher.submit(1, sender("forbidden"))
+        ok = dispatcher.submit(1, sender("next"))
+        results = await asyncio.gather(failed, ok, return_exceptions=True)
+        await dispatcher.flush()
+        return results, dispatcher.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert isinstance(results[0], FakeHTTPError)
+    assert results[0].status == 403
+    assert results[1] == "next"
+    assert stats["failures"] == 1
+    assert stats["queued"] == 0
+
+
+@pytest.mark.parametrize(
+    "error, idempotent, expected",
+    [
+        (FakeHTTPError(429, retry_after=2.5), False, 2.5),
+        (FakeHTTPError(429, retry_after=120), False, 30.0),
+        (FakeHTTPError(400), True, None),
+        (FakeHTTPError(500), False, None),
+        (ValueError("not http"), True, None),
+    ],
+)
+def test_default_retry_delay(error, idempotent, expected):
+    assert default_retry_delay(error, 1, idempotent) == expected
+
+
+def test_default_retry_delay_backs_off_exponentially_for_idempotent_5xx():
+    delays = [default_retry_delay(FakeHTTPError(502), attempt, True) for attempt in (1, 2, 3)]
+    assert 0.5 <= delays[0] <= 1.0
+    assert 1.0 <= delays[1] <= 2.0
+    assert 2.0 <= delays[2] <= 4.0
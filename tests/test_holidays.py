@@ -0,0 +1,41 @@
+"""utils.holidays のテスト"""
+import os
+from datetime import datetime
+
+import pytest
+
+from utils.holidays import HolidayManager
+
+
+def test_rolled_back_batch_is_not_saved_or_notified(tmp_path):
+    path = str(tmp_path / "holidays.json")
+    manager = HolidayManager(path, use_builtin=False)
+    notified = []
+    manager.add_listener(lambda: notified.append(True))
+
+    with pytest.raises(RuntimeError):
+        with manager.batch():
+            manager.add_holiday(datetime(2026, 1, 5), "臨時休日")
+            raise RuntimeError("取り込み失敗")
+
+    assert not manager.is_holiday(datetime(2026, 1, 5))
+    assert notified == []
+    assert not os.path.exists(path) or "2026-01-05" not in open(path, encoding="utf-8").read()
+
+    # 次のバッチは変更がなければ保存しない
+    with manager.batch():
+        pass
+    assert notified == []
+
+
+def test_batch_saves_once_on_exit(tmp_path):
+    manager = HolidayManager(str(tmp_path / "holidays.json"), use_builtin=False)
+    notified = []
+    manager.add_listener(lambda: notified.append(True))
+
+    with manager.batch():
+        manager.add_holiday(datetime(2026, 1, 5), "臨時休日")
+        manager.add_holiday(datetime(2026, 1, 6), "臨時休日")
+
+    assert notified == [True]
+    assert HolidayManager(str(tmp_path / "holidays.json"), use_builtin=False).is_holiday(datetime(2026, 1, 6))
@@ -0,0 +1,59 @@
+"""utils.leader のテスト"""
+from utils.leader import LeaderLease
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_only_one_replica_holds_the_lease(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "leader.db")
+    first = LeaderLease(path, ttl=30, holder_id="a", clock=clock)
+    second = LeaderLease(path, ttl=30, holder_id="b", clock=clock)
+
+    assert first.renew()
+    assert not second.renew()
+    assert second.current_holder() == "a"
+
+
+def test_lease_moves_after_ttl_expires(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "leader.db")
+    first = LeaderLease(path, ttl=30, holder_id="a", clock=clock)
+    second = LeaderLease(path, ttl=30, holder_id="b", clock=clock)
+    assert first.renew()
+
+    clock.now += 31
+    assert not first.is_leader
+    assert second.renew()
+    assert not first.renew()
+
+
+def test_release_lets_another_replica_take_over(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "leader.db")
+    first = LeaderLease(path, ttl=30, holder_id="a", clock=clock)
+    second = LeaderLease(path, ttl=30, holder_id="b", clock=clock)
+    assert first.renew()
+
+    first.release()
+    assert second.renew()
+
+
+def test_verify_shared_directory_accepts_shared_data(tmp_path):
+    path = str(tmp_path / "leader.db")
+    data_dir = str(tmp_path / "data")
+    assert LeaderLease(path, holder_id="a").verify_shared_directory(data_dir)
+    assert LeaderLease(path, holder_id="b").verify_shared_directory(data_dir)
+
+
+def test_verify_shared_directory_rejects_per_replica_data(tmp_path):
+    path = str(tmp_path / "leader.db")
+    assert LeaderLease(path, holder_id="a").verify_shared_directory(str(tmp_path / "replica-a"))
+    # 2つ目のレプリカが別のdata/を使っている
+    assert not LeaderLease(path, holder_id="b").verify_shared_directory(str(tmp_path / "replica-b"))
@@ -0,0 +1,127 @@
+"""utils.scheduler のテスト（複数レプリカでの状態の共有とリーダー交代時の補完）"""
+import asyncio
+import os
+from datetime import datetime, time, timedelta
+
+import pytz
+
+from utils.holidays import HolidayManager
+from utils.scheduler import Scheduler
+
+JST = pytz.timezone("Asia/Tokyo")
+
+
+def make_scheduler(tmp_path, send_time, shared_state=True):
+    holidays = HolidayManager(str(tmp_path / "holidays.json"), use_builtin=False)
+    config = {
+        "weekdays": list(range(7)),
+        "send_before_holidays": False,
+        "send_time": send_time.strftime("%H:%M"),
+        "summary_time": "23:59" if send_time != time(23, 59) else "00:00",
+    }
+    return Scheduler(config, holidays, state_file=str(tmp_path / "scheduler_state.json"), shared_state=shared_state)
+
+
+def record_sends(scheduler):
+    sent = []
+
+    async def send_callback(date):
+        sent.append(date)
+
+    scheduler.set_send_callback(send_callback)
+    return sent
+
+
+async def run_tick(scheduler, since=None):
+    await scheduler.tick(since)
+    if scheduler._jobs:
+        await asyncio.gather(*scheduler._jobs)
+
+
+def test_new_leader_catches_up_missed_send(tmp_path):
+    # 前のリーダーが送信時刻の直前に停止し、2分後に引き継いだ
+    send_at = datetime.now(JST).replace(second=0, microsecond=0) - timedelta(minutes=2)
+    scheduler = make_scheduler(tmp_path, send_at.time())
+    sent = record_sends(scheduler)
+
+    asyncio.run(run_tick(scheduler, since=send_at - timedelta(minutes=1)))
+
+    assert [date.strftime("%H:%M") for date in sent] == [send_at.strftime("%H:%M")]
+
+
+def test_new_leader_skips_send_made_by_previous_leader(tmp_path):
+    send_at = datetime.now(JST).replace(second=0, microsecond=0) - timedelta(minutes=2)
+    previous = make_scheduler(tmp_path, send_at.time())
+    previous_sent = record_sends(previous)
+    asyncio.run(run_tick(previous, since=send_at))
+    assert len(previous_sent) == 1
+
+    # 同じ状態ファイルを共有する別のレプリカが引き継ぐ
+    leader = make_scheduler(tmp_path, send_at.time())
+    leader.load_state()
+    sent = record_sends(leader)
+    asyncio.run(run_tick(leader, since=send_at - timedelta(minutes=1)))
+
+    assert sent == []
+
+
+def test_last_sent_minute_survives_restart(tmp_path):
+    now = datetime.now(JST)
+    scheduler = make_scheduler(tmp_path, now.time(), shared_state=False)
+    scheduler._last_sent_minute = f"{now.year}-{now.month}-{now.day}-{now.hour}-{now.minute}"
+    scheduler.save_state()
+
+    restarted = make_scheduler(tmp_path, now.time(), shared_state=False)
+    restarted.load_state()
+    assert restarted._last_sent_minute == scheduler._last_sent_minute
+
+
+def test_shared_state_picks_up_changes_from_other_replicas(tmp_path):
+    leader = make_scheduler(tmp_path, time(20, 0))
+    follower = make_scheduler(tmp_path, time(20, 0))
+    leader.load_state()
+
+    # フォロワーが受け付けたコマンドの変更
+    follower.apply_config({"send_time": "21:30"})
+    follower.add_scheduled_send(datetime.now(JST) + timedelta(days=1), time(19, 0))
+    # 同じ秒のうちの更新でも検出できるよう、更新時刻をずらす
+    state_file = str(tmp_path / "scheduler_state.json")
+    mtime = os.stat(state_file).st_mtime + 1
+    os.utime(state_file, (mtime, mtime))
+
+    assert leader.reload_state_if_changed()
+    assert leader.send_time == time(21, 30)
+    assert len(leader.scheduled_sends) == 1
+
+
+def test_unshared_state_does_not_store_settings(tmp_path):
+    scheduler = make_scheduler(tmp_path, time(20, 0), shared_state=False)
+    scheduler.apply_config({"send_time": "21:30"})
+    scheduler.save_state()
+
+    restarted = make_scheduler(tmp_path, time(20, 0), shared_state=False)
+    restarted.load_state()
+    assert restarted.send_time == time(20, 0)
+
+
+def test_interleaved_saves_from_replicas_keep_each_others_changes(tmp_path):
+    send_at = datetime.now(JST).replace(second=0, microsecond=0)
+    first = make_scheduler(tmp_path, send_at.time())
+    second = make_scheduler(tmp_path, send_at.time())
+    first.load_state()
+    second.load_state()
+    sent = record_sends(second)
+    tomorrow = datetime.now(JST) + timedelta(days=1)
+
+    # 同じ秒のうちに、互いの保存を知らないまま交互に保存する
+    first.add_scheduled_send(tomorrow, time(19, 0))
+    asyncio.run(run_tick(second, since=send_at))
+    first.add_scheduled_send(tomorrow, time(21, 0))
+    second.remove_scheduled_send(tomorrow, time(19, 0))
+
+    restarted = make_scheduler(tmp_path, send_at.time())
+    restarted.load_state()
+    assert len(sent) == 1
+    assert restarted._last_sent_minute == f"{send_at.year}-{send_at.month}-{send_at.day}-{send_at.hour}-{send_at.minute}"
+    assert [t for _, t in restarted.get_scheduled_sends()] == [time(21, 0)]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
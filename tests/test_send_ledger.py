@@ -0,0 +1,79 @@
+"""utils.send_ledger のテスト"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from utils.cli import exit_if_nothing_to_do
+from utils.send_ledger import SendLedger
+
+
+def today_str():
+    return datetime.now(pytz.timezone("Asia/Tokyo")).strftime("%Y-%m-%d")
+
+
+def test_summarized_date_is_still_recorded_as_sent(tmp_path):
+    ledger = SendLedger(str(tmp_path / "send_ledger.json"))
+    ledger.record_send("2026-01-02", 1, 100)
+    ledger.record_live_summary("2026-01-02", 1, 101)
+    assert ledger.has_sent("2026-01-02")
+    assert ledger.pending_dates() == ["2026-01-02"]
+
+    ledger.mark_summarized("2026-01-02")
+
+    # 集計は済んだが、送信したことは残る（同じ日の送信の再実行を防ぐ）
+    assert not ledger.has_sent("2026-01-02")
+    assert ledger.pending_dates() == []
+    assert ledger.was_sent("2026-01-02")
+    assert ledger.get_live_summaries("2026-01-02") == []
+    assert SendLedger(str(tmp_path / "send_ledger.json")).was_sent("2026-01-02")
+
+
+def test_send_after_summary_starts_a_new_round(tmp_path):
+    ledger = SendLedger(str(tmp_path / "send_ledger.json"))
+    ledger.record_send("2026-01-02", 1, 100)
+    ledger.mark_summarized("2026-01-02")
+
+    # 集計後の予約送信などは、もう一度集計の対象になる
+    ledger.record_send("2026-01-02", 1, 200)
+    assert ledger.has_sent("2026-01-02")
+    assert [m["message_id"] for m in ledger.get_messages("2026-01-02")] == [200]
+
+
+def test_old_summarized_dates_are_pruned(tmp_path):
+    ledger = SendLedger(str(tmp_path / "send_ledger.json"))
+    ledger.record_send("2026-01-01", 1, 100)
+    ledger.mark_summarized("2026-01-01")
+    ledger.record_send("2026-01-02", 1, 200)  # 集計未送信は残す
+
+    ledger.record_send("2026-01-20", 1, 300)
+
+    assert not ledger.was_sent("2026-01-01")
+    assert ledger.has_sent("2026-01-02")
+    assert ledger.pending_dates() == ["2026-01-02", "2026-01-20"]
+
+
+def test_run_once_send_is_not_repeated_after_summary(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    today = today_str()
+    ledger = SendLedger()
+
+    # 送信フェーズ → 集計フェーズ
+    ledger.record_send(today, 1, 100)
+    ledger.mark_summarized(today)
+
+    # 同じ日に送信フェーズのジョブが再実行されても、Discordにログインせずに終了する
+    with pytest.raises(SystemExit) as exit_info:
+        exit_if_nothing_to_do(["--run-once-send"])
+    assert exit_info.value.code == 0
+    # 集計フェーズも送信記録がないのと同じ扱いで終了する
+    with pytest.raises(SystemExit):
+        exit_if_nothing_to_do(["--run-once-summary"])
+
+
+def test_legacy_entries_without_summary_marker_are_pending(tmp_path):
+    path = tmp_path / "send_ledger.json"
+    yesterday = (datetime.now(pytz.timezone("Asia/Tokyo")) - timedelta(days=1)).strftime("%Y-%m-%d")
+    path.write_text(json.dumps({yesterday: {"messages": [{"channel_id": 1, "message_id": 2, "sent_at": ""}]}}))
+    assert SendLedger(str(path)).pending_dates() == [yesterday]
@@ -0,0 +1,259 @@
+"""utils.sharding のテスト"""
+import os
+import sys
+import time
+
+import pytest
+
+from utils.sharding import (
+    ShardConfig,
+    ShardCoordinator,
+    assign_shards,
+    format_shard_ids,
+    parse_shard_ids,
+    schedule_guild_id,
+    shard_for_guild,
+)
+
+# シャード0・1・2に属するギルドID（(guild_id >> 22) % shard_count で決まる）
+GUILD_ON_SHARD_0 = 0 << 22
+GUILD_ON_SHARD_1 = 1 << 22
+GUILD_ON_SHARD_2 = 2 << 22
+
+
+@pytest.mark.parametrize(
+    "shard_count, workers, expected",
+    [
+        (4, 1, [[0, 1, 2, 3]]),
+        (4, 2, [[0, 1], [2, 3]]),
+        (5, 2, [[0, 1, 2], [3, 4]]),
+        (16, 4, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9, 10, 11], [12, 13, 14, 15]]),
+        (2, 4, [[0], [1]]),
+        (3, 0, [[0, 1, 2]]),
+    ],
+)
+def test_assign_shards(shard_count, workers, expected):
+    assert assign_shards(shard_count, workers) == expected
+
+
+def test_assign_shards_rejects_zero_shards():
+    with pytest.raises(ValueError):
+        assign_shards(0, 1)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("0-3", [0, 1, 2, 3]),
+        ("0,2", [0, 2]),
+        ("5, 0-1 ,1", [0, 1, 5]),
+        ("", []),
+    ],
+)
+def test_parse_shard_ids(value, expected):
+    assert parse_shard_ids(value) == expected
+
+
+@pytest.mark.parametrize(
+    "shard_ids, expected",
+    [
+        ([0, 1, 2, 3], "0-3"),
+        ([2, 0], "0,2"),
+        ([3], "3"),
+        ([], ""),
+    ],
+)
+def test_format_shard_ids(shard_ids, expected):
+    assert format_shard_ids(shard_ids) == expected
+
+
+def test_format_and_parse_round_trip():
+    for shard_ids in ([0], [0, 1, 2], [1, 3, 4], [7, 8]):
+        assert parse_shard_ids(format_shard_ids(shard_ids)) == shard_ids
+
+
+def test_shard_config_from_env():
+    assert ShardConfig.from_env({}) is None
+    config = ShardConfig.from_env({"SHARD_COUNT": "8", "SHARD_IDS": "4-7", "SHARD_WORKER": "1"})
+    assert config.shard_count == 8
+    assert config.shard_ids == [4, 5, 6, 7]
+    assert config.worker_index == 1
+    assert ShardConfig.from_env({"SHARD_COUNT": "2"}).shard_ids == [0, 1]
+
+
+def test_shard_config_rejects_out_of_range_ids():
+    with pytest.raises(ValueError):
+        ShardConfig(4, [0, 4])
+
+
+def test_shard_config_data_path():
+    assert ShardConfig(8, [0, 1, 2, 3]).data_path("data/responses.json") == os.path.join(
+        "data", "shards-0-3-of-8", "responses.json"
+    )
+    assert ShardConfig(4, [0, 2]).data_path("data/send_ledger.json") == os.path.join(
+        "data", "shards-0_2-of-4", "send_ledger.json"
+    )
+
+
+def test_shard_config_owns_guild():
+    config = ShardConfig(4, [0, 1])
+    assert shard_for_guild(GUILD_ON_SHARD_2, 4) == 2
+    assert config.owns_guild(GUILD_ON_SHARD_0)
+    assert config.owns_guild(GUILD_ON_SHARD_1)
+    assert not config.owns_guild(GUILD_ON_SHARD_2)
+    # シャード数で折り返す
+    assert config.owns_guild(5 << 22)
+
+
+@pytest.mark.parametrize(
+    "guild_id, expected",
+    [("123", 123), (" 456 ", 456), (789, 789), ("", None), (None, None), ("abc", None)],
+)
+def test_schedule_guild_id(guild_id, expected):
+    assert schedule_guild_id({"guild_id": guild_id}) == expected
+
+
+def test_migrate_data_copies_unsharded_files(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "responses.json").write_text('{"legacy": true}', encoding="utf-8")
+    config = ShardConfig(4, [0, 1])
+
+    migrated = config.migrate_data([str(data_dir / "responses.json"), str(data_dir / "send_ledger.json")])
+
+    target = config.data_path(str(data_dir / "responses.json"))
+    assert migrated == [(str(data_dir / "responses.json"), target)]
+    assert open(target, encoding="utf-8").read() == '{"legacy": true}'
+    # コピー元は残す
+    assert (data_dir / "responses.json").exists()
+
+
+def test_migrate_data_prefers_newest_previous_layout(tmp_path):
+    data_dir = tmp_path / "data"
+    old_layout = data_dir / "shards-0-1-of-4"
+    other_layout = data_dir / "shards-2-3-of-4"
+    old_layout.mkdir(parents=True)
+    other_layout.mkdir(parents=True)
+    (data_dir / "responses.json").write_text('"unsharded"', encoding="utf-8")
+    (old_layout / "responses.json").write_text('"newest"', encoding="utf-8")
+    (other_layout / "responses.json").write_text('"stale"', encoding="utf-8")
+    now = time.time()
+    os.utime(data_dir / "responses.json", (now - 300, now - 300))
+    os.utime(other_layout / "responses.json", (now - 200, now - 200))
+    os.utime(old_layout / "responses.json", (now - 100, now - 100))
+
+    config = ShardConfig(4, [0, 1, 2, 3])
+    migrated = config.migrate_data([str(data_dir / "responses.json")])
+
+    assert migrated == [(str(old_layout / "responses.json"), config.data_path(str(data_dir / "responses.json")))]
+    assert open(migrated[0][1], encoding="utf-8").read() == '"newest"'
+
+
+def test_migrate_data_ignores_empty_files_from_other_workers(tmp_path):
+    data_dir = tmp_path / "data"
+    other_worker = data_dir / "shards-2-3-of-4"
+    other_worker.mkdir(parents=True)
+    (data_dir / "responses.json").write_text('{"2026-01-01": []}', encoding="utf-8")
+    # 他のワーカーが起動時に作成した空のファイル（こちらの方が新しい）
+    (other_worker / "responses.json").write_text("{}", encoding="utf-8")
+    now = time.time()
+    os.utime(data_dir / "responses.json", (now - 100, now - 100))
+
+    config = ShardConfig(4, [0, 1])
+    migrated = config.migrate_data([str(data_dir / "responses.json")])
+
+    assert [source for source, _ in migrated] == [str(data_dir / "responses.json")]
+
+
+def test_migrate_data_keeps_existing_shard_files(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "responses.json").write_text('{"legacy": true}', encoding="utf-8")
+    config = ShardConfig(2, [0, 1])
+    target = config.data_path(str(data_dir / "responses.json"))
+    os.makedirs(os.path.dirname(target))
+    with open(target, "w", encoding="utf-8") as f:
+        f.write("current")
+
+    assert config.migrate_data([str(data_dir / "responses.json")]) == []
+    assert open(target, encoding="utf-8").read() == "current"
+
+
+def python_command(code):
+    return [sys.executable, "-c", code]
+
+
+def wait_until(predicate, timeout=10.0, interval=0.05):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return False
+
+
+def test_coordinator_worker_env():
+    coordinator = ShardCoordinator(["true"], 8, 2, env={"PORT": "8080", "OTHER": "x"})
+    env0 = coordinator.worker_env(0)
+    env1 = coordinator.worker_env(1)
+    assert (env0["SHARD_COUNT"], env0["SHARD_IDS"], env0["SHARD_WORKER"]) == ("8", "0-3", "0")
+    assert (env1["SHARD_COUNT"], env1["SHARD_IDS"], env1["SHARD_WORKER"]) == ("8", "4-7", "1")
+    # HTTPサーバーはワーカー0だけ
+    assert env0["PORT"] == "8080"
+    assert "PORT" not in env1
+    assert env1["OTHER"] == "x"
+
+
+def test_coordinator_finishes_when_workers_exit_cleanly():
+    coordinator = ShardCoordinator(python_command("pass"), 2, 2, env=dict(os.environ))
+    coordinator.start()
+    assert wait_until(lambda: not coordinator.poll())
+    assert coordinator.exit_codes == {0: 0, 1: 0}
+
+
+def test_coordinator_restarts_crashed_worker_with_backoff(tmp_path):
+    counter = tmp_path / "starts"
+    # 起動回数を記録し、2回目までは異常終了する
+    code = (
+        "import os, sys\n"
+        f"path = {str(counter)!r}\n"
+        "with open(path, 'a') as f: f.write('x')\n"
+        "sys.exit(1 if len(open(path).read()) < 3 else 0)\n"
+    )
+    coordinator = ShardCoordinator(python_command(code), 1, 1, env=dict(os.environ), max_restart_delay=0.5)
+    coordinator.start()
+
+    assert wait_until(lambda: 0 in coordinator._restart_at or not coordinator.poll())
+    # 待ち時間は0.5秒の2倍ずつ延びるが、max_restart_delayで頭打ちになる
+    assert coordinator._restart_delays[0] == 0.5
+    assert wait_until(lambda: not coordinator.poll())
+    assert counter.read_text() == "xxx"
+    assert coordinator.exit_codes[0] == 0
+
+
+def test_coordinator_backoff_doubles_up_to_limit():
+    coordinator = ShardCoordinator(python_command("import sys; sys.exit(3)"), 1, 1, env=dict(os.environ), max_restart_delay=60)
+    coordinator.start()
+    delays = []
+    for _ in range(3):
+        assert wait_until(lambda: coordinator.poll() and 0 in coordinator._restart_at)
+        assert coordinator.exit_codes[0] == 3
+        delays.append(coordinator._restart_delays[0])
+        # 待ち時間を経過したことにしてすぐに再起動させる
+        coordinator._restart_at[0] = 0
+        coordinator.poll()
+    coordinator.stop()
+    assert delays == [1.0, 2.0, 4.0]
+
+
+def test_coordinator_stop_terminates_workers_without_restart():
+    coordinator = ShardCoordinator(python_command("import time; time.sleep(60)"), 2, 2, env=dict(os.environ))
+    coordinator.start()
+    assert coordinator.poll()
+    started = time.monotonic()
+    coordinator.stop(timeout=5)
+    assert time.monotonic() - started < 5
+    assert not coordinator.poll()
+    assert set(coordinator.exit_codes) == {0, 1}
+    assert all(code != 0 for code in coordinator.exit_codes.values())
+    assert not coordinator._restart_at
@@ -0,0 +1,130 @@
+"""チャンネルの解決・キャッシュ機能"""
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class ChannelResolver:
+    """
+    チャンネルIDからチャンネルを取得し、結果と権限チェックをキャッシュするクラス
+
+    キャッシュにない場合はAPIから取得しますが、同じIDの取得が同時に要求されても
+    APIへのリクエストは1回だけにまとめます。チャンネルの更新・削除時は
+    invalidateでキャッシュを破棄してください。
+    """
+
+    def __init__(
+        self,
+        get_cached: Callable[[int], Optional[Any]],
+        fetch: Callable[[int], Awaitable[Any]],
+        check_permissions: Optional[Callable[[Any], bool]] = None,
+        maxsize: int = 256
+    ):
+        """
+        Args:
+            get_cached: Discordクライアントのキャッシュから取得する関数（bot.get_channelなど）
+            fetch: APIから取得するコルーチン関数（bot.fetch_channelなど）
+            check_permissions: チャンネルに送信できるかどうかを判定する関数（Noneの場合は常に送信可能）
+            maxsize: キャッシュするチャンネル数の上限（超えた場合は最近使っていないものから破棄）
+        """
+        self.get_cached = get_cached
+        self.fetch = fetch
+        self.check_permissions = check_permissions
+        self.maxsize = maxsize
+        self._channels: "OrderedDict[int, Any]" = OrderedDict()
+        self._permissions: Dict[int, bool] = {}
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self.hits = 0
+        self.fetches = 0
+
+    async def resolve(self, channel_id: int) -> Any:
+        """
+        チャンネルを取得
+
+        Args:
+            channel_id: チャンネルID
+
+        Returns:
+            チャンネル
+
+        Raises:
+            APIからの取得に失敗した場合はその例外
+        """
+        channel_id = int(channel_id)
+        channel = self._channels.get(channel_id)
+        if channel is not None:
+            self._channels.move_to_end(channel_id)
+        else:
+            channel = self.get_cached(channel_id)
+            if channel is not None:
+                self._remember(channel_id, channel)
+        if channel is not None:
+            self.hits += 1
+            return channel
+
+        # 取得中のリクエストがあればその結果を待つ
+        inflight = self._inflight.get(channel_id)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[channel_id] = future
+        try:
+            self.fetches += 1
+            channel = await self.fetch(channel_id)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 待っている呼び出し元がいない場合に「例外が取得されていない」警告を出さない
+            future.exception()
+            raise
+        else:
+            self._remember(channel_id, channel)
+            future.set_result(channel)
+            return channel
+        finally:
+            del self._inflight[channel_id]
+
+    def _remember(self, channel_id: int, channel: Any):
+        """チャンネルをキャッシュ（上限を超えた分は古いものから破棄）"""
+        self._channels[channel_id] = channel
+        self._channels.move_to_end(channel_id)
+        while len(self._channels) > self.maxsize:
+            evicted, _ = self._channels.popitem(last=False)
+            self._permissions.pop(evicted, None)
+
+    def can_send(self, channel: Any) -> bool:
+        """
+        チャンネルに送信できるかどうか（結果はチャンネルごとにキャッシュ）
+
+        Args:
+            channel: resolveで取得したチャンネル
+        """
+        if self.check_permissions is None:
+            return True
+        allowed = self._permissions.get(channel.id)
+        if allowed is None:
+            allowed = bool(self.check_permissions(channel))
+            self._permissions[channel.id] = allowed
+        return allowed
+
+    def invalidate(self, channel_id: int):
+        """指定チャンネルのキャッシュを破棄（チャンネルの更新・削除時）"""
+        channel_id = int(channel_id)
+        self._channels.pop(channel_id, None)
+        self._permissions.pop(channel_id, None)
+
+    def invalidate_permissions(self):
+        """すべての権限チェック結果を破棄（ロールの変更時など）"""
+        self._permissions.clear()
+
+    def stats(self) -> dict:
+        """キャッシュの統計を取得"""
+        return {
+            "cached": len(self._channels),
+            "hits": self.hits,
+            "fetches": self.fetches,
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,188 @@
+"""コマンドライン引数とrun-once判定
+
+このモジュールはDiscord関連のモジュールを読み込みません。
+送信対象外の日はDiscordへのログインはもちろん、discord.pyの読み込みすら行わずに終了できます。
+"""
+import argparse
+import sys
+from datetime import datetime
+from typing import List, Optional
+
+import pytz
+
+from utils.log import get_logger
+
+logger = get_logger("run_once")
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """コマンドライン引数のパーサーを作成"""
+    parser = argparse.ArgumentParser(description="Discordボット")
+    parser.add_argument(
+        "--test-send-time",
+        type=str,
+        help="テスト用の送信時刻を指定（HH:MM形式、例: 20:00）"
+    )
+    parser.add_argument(
+        "--force-send",
+        action="store_true",
+        help="即座にメッセージを送信（テスト用）"
+    )
+    run_once_group = parser.add_mutually_exclusive_group()
+    run_once_group.add_argument(
+        "--run-once",
+        action="store_true",
+        help="起動後に送信対象を判定し、1回だけ送信して終了（Cloud Run Job向け）"
+    )
+    run_once_group.add_argument(
+        "--run-once-send",
+        action="store_true",
+        help="送信対象であれば質問メッセージを送信し、送信記録を保存してすぐに終了（集計を待たない）"
+    )
+    run_once_group.add_argument(
+        "--run-once-summary",
+        action="store_true",
+        help="--run-once-sendの送信記録がある場合に集計結果を送信して終了"
+    )
+    parser.add_argument(
+        "--holiday-eve-only",
+        action="store_true",
+        help="--run-once / --run-once-send時に祝前日のみ送信（曜日設定は無視）"
+    )
+    parser.add_argument(
+        "--run-once-summary-buffer-minutes",
+        type=int,
+        default=10,
+        help="--run-once時、集計送信後に待機する分数（デフォルト: 10）"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="シャードを分担するワーカープロセス数（指定するとコーディネーターとして起動）"
+    )
+    parser.add_argument(
+        "--shard-count",
+        type=int,
+        default=0,
+        help="--workers時の全体のシャード数（デフォルト: ワーカー数と同じ）"
+    )
+    parser.add_argument(
+        "--diagnostics",
+        action="store_true",
+        help="診断モードで起動（イベントループの停止の検知と/profileコマンドを有効化）"
+    )
+    return parser
+
+
+def should_send_run_once(scheduler, holiday_eve_only: bool, now: Optional[datetime] = None) -> bool:
+    """
+    run-once時に送信すべきかどうかを判定
+
+    Args:
+        scheduler: Schedulerインスタンス（予約を読み込み済みであること）
+        holiday_eve_only: 祝前日のみ送信する（曜日設定・予約は無視）
+        now: 判定する日時（Noneの場合は現在日時）
+
+    Returns:
+        送信すべき場合True
+    """
+    if now is None:
+        now = datetime.now(pytz.timezone("Asia/Tokyo"))
+
+    if holiday_eve_only:
+        holiday_tomorrow = scheduler.holiday_manager.get_holiday_before_date(now)
+        logger.info(f"祝前日判定: {holiday_tomorrow is not None} (tomorrow_holiday={holiday_tomorrow})")
+        return holiday_tomorrow is not None
+
+    # 曜日・祝前日に加えて予約も含めて判定
+    result = scheduler.check_schedule_for_date(now)
+    logger.info(f"送信対象判定: {result['will_send']}（{result['reason']}）", extra={"will_send": result['will_send']})
+    return result['will_send']
+
+
+def exit_if_nothing_to_do(argv: Optional[List[str]] = None):
+    """
+    run-once時に送信対象外であれば、Discordにログインせず即終了する
+
+    discord.pyを読み込む前に呼び出すことで、送信がない日のCloud Run Jobを
+    数十ミリ秒で終了させます。run-once以外のモードでは何もしません。
+
+    Args:
+        argv: コマンドライン引数（Noneの場合はsys.argv[1:]）
+    """
+    args = build_arg_parser().parse_args(argv)
+    if not (args.run_once or args.run_once_send or args.run_once_summary):
+        return
+
+    # 必要なモジュールだけをここで読み込む（.envはbot.pyの起動時に読み込み済み）
+    from utils.config_store import load_config
+    from utils.holidays import get_holiday_manager
+    from utils.scheduler import DEFAULT_STATE_FILE, Scheduler
+    from utils.send_ledger import SendLedger
+
+    today = datetime.now(pytz.timezone("Asia/Tokyo")).strftime("%Y-%m-%d")
+
+    if args.run_once_summary:
+        # 集計フェーズ: 送信フェーズの送信記録がなければ何もしない
+        if not SendLedger().has_sent(today):
+            logger.info(f"{today} の送信記録がないため、Discordにログインせず終了します")
+            sys.exit(0)
+        return
+
+    if args.run_once_send and SendLedger().was_sent(today):
+        logger.info(f"{today} は送信済みのため、Discordにログインせず終了します")
+        sys.exit(0)
+
+    config = load_config()
+    holiday_manager = get_holiday_manager(use_builtin=config.get("use_builtin_holidays", True))
+    scheduler = Scheduler(config, holiday_manager, state_file=DEFAULT_STATE_FILE)
+    scheduler.load_state()
+
+    if not should_send_run_once(scheduler, args.holiday_eve_only):
+        logger.info("送信対象外のため、Discordにログインせず終了します")
+        sys.exit(0)
+
+
+def run_coordinator_if_requested(argv: List[str], script: str):
+    """
+    --workersが指定されていれば、シャードを割り当てたワーカープロセスを起動して監視し、終了する
+
+    コーディネーター自身はDiscordに接続しません。各ワーカーは環境変数SHARD_COUNT / SHARD_IDSを
+    受け取り、--workers / --shard-count以外の引数をそのまま引き継いで起動します。
+    --workersが指定されていない場合は何もしません。
+
+    Args:
+        argv: コマンドライン引数
+        script: ワーカーとして実行するスクリプトのパス
+    """
+    args = build_arg_parser().parse_args(argv)
+    if args.workers <= 0:
+        return
+    if args.run_once or args.run_once_send or args.run_once_summary:
+        logger.error("--workersは常駐モードでのみ使用できます（run-onceとは併用できません）")
+        sys.exit(2)
+
+    from utils.config_store import load_config
+    from utils.sharding import ShardCoordinator, schedule_guild_id
+
+    if schedule_guild_id(load_config()) is None:
+        # ワーカーが起動直後に終了して再起動を繰り返さないよう、起動前に確認する
+        logger.error("--workersを使う場合はguild_id（環境変数GUILD_ID）の設定が必要です")
+        sys.exit(2)
+
+    worker_argv = []
+    skip_value = False
+    for arg in argv:
+        if skip_value:
+            skip_value = False
+            continue
+        name = arg.split("=", 1)[0]
+        if name in ("--workers", "--shard-count"):
+            skip_value = "=" not in arg
+            continue
+        worker_argv.append(arg)
+
+    shard_count = args.shard_count or args.workers
+    coordinator = ShardCoordinator([sys.executable, script] + worker_argv, shard_count, args.workers)
+    sys.exit(coordinator.run())
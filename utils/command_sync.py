@@ -0,0 +1,76 @@
+"""コマンド同期状態の管理機能"""
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+
+def fingerprint_commands(payloads: List[dict]) -> str:
+    """
+    シリアライズしたコマンド定義からハッシュ値を算出
+
+    Args:
+        payloads: Discord APIに送信するコマンド定義のリスト
+
+    Returns:
+        SHA-256のハッシュ値（16進数文字列）
+    """
+    ordered = sorted(payloads, key=lambda p: (p.get("type", 1), p.get("name", "")))
+    serialized = json.dumps(ordered, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class CommandSyncState:
+    """同期済みコマンドのハッシュ値を同期先（ギルド/グローバル）ごとに保存するクラス"""
+
+    def __init__(self, state_file: str = "data/command_sync.json"):
+        """
+        Args:
+            state_file: 同期状態ファイルのパス
+        """
+        self.state_file = state_file
+        self._hashes: Dict[str, str] = self._load()
+
+    def _load(self) -> Dict[str, str]:
+        """同期状態を読み込む"""
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self):
+        """同期状態を保存"""
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        with open(self.state_file, "w", encoding="utf-8") as f:
+            json.dump(self._hashes, f, ensure_ascii=False, indent=2)
+
+    def get(self, scope: str) -> Optional[str]:
+        """
+        前回同期したハッシュ値を取得
+
+        Args:
+            scope: 同期先のキー
+
+        Returns:
+            ハッシュ値、未同期の場合はNone
+        """
+        return self._hashes.get(scope)
+
+    def is_synced(self, scope: str, fingerprint: str) -> bool:
+        """前回同期したハッシュ値と一致するかどうか"""
+        return self._hashes.get(scope) == fingerprint
+
+    def mark_synced(self, scope: str, fingerprint: str):
+        """
+        同期したハッシュ値を記録
+
+        Args:
+            scope: 同期先のキー
+            fingerprint: 同期したコマンドツリーのハッシュ値
+        """
+        if self._hashes.get(scope) == fingerprint:
+            return
+        self._hashes[scope] = fingerprint
+        self._save()
@@ -0,0 +1,140 @@
+"""設定の読み込み・保存機能"""
+import asyncio
+import json
+import os
+from typing import Optional
+
+from utils.log import get_logger
+
+logger = get_logger("config")
+
+
+def load_config():
+    """設定ファイルを読み込む（環境変数優先）"""
+    # 環境変数から読み込む（.envファイルまたはRailway等のクラウド環境向け）
+    discord_token = os.environ.get("DISCORD_TOKEN")
+    if discord_token:
+        config = {
+            "token": discord_token,
+            "guild_id": os.environ.get("GUILD_ID", ""),
+            "channel_id": os.environ.get("CHANNEL_ID", ""),
+            "auto_send_channel_id": os.environ.get("AUTO_SEND_CHANNEL_ID", ""),
+            "send_time": os.environ.get("SEND_TIME", "19:00"),
+            "summary_time": os.environ.get("SUMMARY_TIME", "22:00"),
+            "weekdays": json.loads(os.environ.get("WEEKDAYS", "[4,5]")),
+            "send_before_holidays": os.environ.get("SEND_BEFORE_HOLIDAYS", "true").lower() == "true",
+            "use_builtin_holidays": os.environ.get("USE_BUILTIN_HOLIDAYS", "true").lower() == "true",
+            "live_summary": os.environ.get("LIVE_SUMMARY", "false").lower() == "true",
+            "live_summary_interval": float(os.environ.get("LIVE_SUMMARY_INTERVAL", "5")),
+            "lean_gateway": os.environ.get("LEAN_GATEWAY", "false").lower() == "true",
+            "memory_report_minutes": float(os.environ.get("MEMORY_REPORT_MINUTES", "30")),
+            "leader_lease_path": os.environ.get("LEADER_LEASE_PATH", ""),
+            "leader_lease_ttl": float(os.environ.get("LEADER_LEASE_TTL", "30")),
+            "diagnostics": os.environ.get("DIAGNOSTICS", "false").lower() == "true",
+            "diagnostics_slow_callback_ms": float(os.environ.get("DIAGNOSTICS_SLOW_CALLBACK_MS", "100")),
+            "diagnostics_stall_seconds": float(os.environ.get("DIAGNOSTICS_STALL_SECONDS", "1"))
+        }
+        return config
+    
+    # 設定ファイルから読み込む（ローカル環境向け）
+    config_path = "config.json"
+    if os.path.exists(config_path):
+        with open(config_path, "r", encoding="utf-8") as f:
+            config_data = json.load(f)
+            # summary_timeが存在しない場合はデフォルト値を設定
+            if "summary_time" not in config_data:
+                config_data["summary_time"] = "22:00"
+            return config_data
+    else:
+        # 環境変数も設定ファイルもない場合はエラー
+        raise ValueError(
+            "設定が見つかりません。環境変数DISCORD_TOKENを設定するか、"
+            "config.jsonファイルを作成してください。"
+        )
+
+
+class ConfigStore:
+    """config.jsonへの書き込みを管理するクラス"""
+
+    def __init__(self, config_path: str = "config.json", enabled: bool = True):
+        """
+        Args:
+            config_path: 設定ファイルのパス
+            enabled: Falseの場合は保存しない（環境変数で設定している場合など）
+        """
+        self.config_path = config_path
+        self.enabled = enabled
+        # ファイルの内容（初回書き込み時に一度だけ読み込み、以降はメモリ上で更新）
+        self._file_data: Optional[dict] = None
+        # まだ書き込んでいない変更
+        self._pending: dict = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _read_file(self) -> dict:
+        """設定ファイルを読み込む"""
+        try:
+            with open(self.config_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_file(self, data: dict):
+        """設定ファイルを書き込む（一時ファイルに書いてから置き換え）"""
+        tmp_path = f"{self.config_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.config_path)
+
+    def _merge(self, updates: dict) -> dict:
+        """変更をファイルの内容に反映し、書き込む内容を返す"""
+        if self._file_data is None:
+            self._file_data = self._read_file()
+        for key, value in updates.items():
+            if key != "token":  # トークンは保存しない
+                self._file_data[key] = value
+        return dict(self._file_data)
+
+    def save(self, updates: dict):
+        """
+        設定を同期的に保存
+
+        Args:
+            updates: 保存する設定
+        """
+        if not self.enabled:
+            logger.info("環境変数が設定されているため、config.jsonには保存しません")
+            return
+        self._write_file(self._merge(updates))
+        logger.info(f"config.jsonに保存しました: {list(updates.keys())}", extra={"keys": list(updates.keys())})
+
+    def schedule_save(self, updates: dict):
+        """
+        設定をバックグラウンドで保存
+
+        連続した変更はまとめて1回の書き込みになります。書き込みは別スレッドで行うため、
+        イベントループをブロックしません。
+
+        Args:
+            updates: 保存する設定
+        """
+        if not self.enabled:
+            logger.info("環境変数が設定されているため、config.jsonには保存しません")
+            return
+        self._pending.update(updates)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_pending())
+
+    async def _flush_pending(self):
+        """保留中の変更がなくなるまで書き込む"""
+        while self._pending:
+            updates, self._pending = self._pending, {}
+            try:
+                await asyncio.to_thread(lambda: self._write_file(self._merge(updates)))
+                logger.info(f"config.jsonに保存しました: {list(updates.keys())}", extra={"keys": list(updates.keys())})
+            except Exception as e:
+                logger.error(f"config.jsonの保存に失敗しました: {e}", exc_info=True)
+
+    async def flush(self):
+        """バックグラウンドの書き込みが完了するまで待つ"""
+        if self._task is not None and not self._task.done():
+            await self._task
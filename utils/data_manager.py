@@ -1,21 +1,102 @@
 """データ管理機能"""
 import json
 import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict, List, Optional
 import pytz
+from utils.file_lock import file_lock
+from utils.instrumentation import get_instrumentation, timed
+
+
+class DateAggregate:
+    """
+    日付ごとの集計結果
+    
+    回答が保存されるたびに差分だけを反映するため、集計のたびに
+    全回答を数え直す必要がありません。
+    """
+    
+    __slots__ = ("total", "attendable")
+    
+    def __init__(self):
+        self.total = 0
+        # ユーザーID: 参加可能な回答（登録時間の昇順に並ぶよう、更新時は末尾に移動する）
+        self.attendable: Dict[int, Dict] = {}
+    
+    @classmethod
+    def from_responses(cls, responses: List[Dict]) -> "DateAggregate":
+        """保存済みの回答から集計を作成"""
+        aggregate = cls()
+        aggregate.total = len(responses)
+        ordered = sorted(responses, key=lambda x: x.get("updated_at", x.get("created_at", "")))
+        for response in ordered:
+            if response.get("can_attend", False):
+                aggregate.attendable[response["user_id"]] = response
+        return aggregate
+    
+    def apply(self, response: Dict, is_new: bool):
+        """
+        保存した回答を集計に反映
+        
+        Args:
+            response: 保存した回答
+            is_new: そのユーザーの最初の回答かどうか
+        """
+        if is_new:
+            self.total += 1
+        user_id = response["user_id"]
+        self.attendable.pop(user_id, None)
+        if response.get("can_attend", False):
+            self.attendable[user_id] = response
+    
+    def to_summary(self, date_str: str) -> Dict:
+        """DataManager.get_summaryと同じ形式の集計結果を作成"""
+        attendable_users = [
+            {
+                "user_id": r["user_id"],
+                "start_time": r.get("start_time"),
+                "end_time": r.get("end_time")
+            }
+            for r in reversed(self.attendable.values())
+        ]
+        return {
+            "date": date_str,
+            "total_responses": self.total,
+            "attendable_count": len(attendable_users),
+            "attendable_users": attendable_users,
+            "not_attendable_count": self.total - len(attendable_users)
+        }
 
 
 class DataManager:
     """回答データを管理するクラス"""
     
-    def __init__(self, data_file: str = "data/responses.json"):
+    # 集計を保持する日付数の上限（古いものから破棄し、必要になれば作り直す）
+    MAX_AGGREGATES = 32
+    
+    def __init__(self, data_file: str = "data/responses.json", shared: bool = False):
         """
         Args:
             data_file: データファイルのパス
+            shared: 複数のレプリカが同じファイルに書き込む場合True（保存時にファイルロックで
+                レプリカ間でも排他し、ロックを取ってから最新の内容を読み直す）
         """
         self.data_file = data_file
+        self.shared = shared
         self.jst = pytz.timezone("Asia/Tokyo")
+        # 読み込んだデータとその時点のファイル更新時刻（ファイルが変わらない限り再読み込みしない）
+        self._cache: Optional[dict] = None
+        self._cache_mtime: Optional[float] = None
+        # ファイルを読み込むたびに増える版（他のプロセスの保存で集計ページのキャッシュなどが古くなったかの判定用。
+        # このインスタンスでの保存はResponseWriterのリスナーで通知されるため版を変えない）
+        self._version = 0
+        # 日付ごとの集計（必要になった日付だけ作成し、以降は保存時に差分で更新）
+        self._aggregates: "OrderedDict[str, DateAggregate]" = OrderedDict()
+        # 書き込みは別スレッドからも行われるため、読み込み～保存を排他する
+        self._lock = threading.RLock()
         self._ensure_file_exists()
     
     def _ensure_file_exists(self):
@@ -25,19 +106,68 @@ class DataManager:
             with open(self.data_file, "w", encoding="utf-8") as f:
                 json.dump({}, f, ensure_ascii=False, indent=2)
     
+    def _get_mtime(self) -> Optional[float]:
+        """データファイルの更新時刻を取得（存在しない場合はNone）"""
+        try:
+            return os.stat(self.data_file).st_mtime
+        except OSError:
+            return None
+    
     def _load_data(self) -> dict:
-        """データを読み込む"""
+        """データを読み込む（ファイルが更新されていなければキャッシュを返す）"""
+        mtime = self._get_mtime()
+        if self._cache is not None and mtime == self._cache_mtime:
+            return self._cache
         try:
-            with open(self.data_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+            with timed("data.load"), open(self.data_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                get_instrumentation().add_bytes("data.load", "read", f.tell())
         except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+            data = {}
+        self._cache = data
+        self._cache_mtime = mtime
+        self._version += 1
+        # 他のプロセスがファイルを更新した場合などは集計を作り直す
+        self._aggregates.clear()
+        return data
     
     def _save_data(self, data: dict):
-        """データを保存"""
-        with open(self.data_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        """データを保存（一時ファイルに書いてから置き換え）"""
+        tmp_path = f"{self.data_file}.tmp"
+        with timed("data.save"):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+                get_instrumentation().add_bytes("data.save", "write", f.tell())
+            os.replace(tmp_path, self.data_file)
+        self._cache = data
+        self._cache_mtime = self._get_mtime()
+    
+    @contextmanager
+    def _file_lock(self):
+        """読み込み～保存をレプリカ間で排他する（shared時のみ。POSIXのファイルロックを使用）"""
+        if not self.shared:
+            yield
+            return
+        with file_lock(f"{self.data_file}.lock"):
+            yield
+    
+    def data_version(self) -> int:
+        """
+        現在のデータの版を取得（他のプロセスがファイルを更新していれば読み直してから返す）
+        
+        Returns:
+            ファイルを読み込み直すたびに増える整数
+        """
+        with self._lock:
+            self._load_data()
+            return self._version
+    
+    def warm(self):
+        """データを事前に読み込んでキャッシュしておく（起動時用）"""
+        with self._lock:
+            self._load_data()
     
+    @timed("data.save_response")
     def save_response(
         self,
         user_id: int,
@@ -49,6 +179,8 @@ class DataManager:
         """
         回答を保存
         
+        別スレッドから呼び出しても安全です。
+        
         Args:
             user_id: ユーザーID
             date: 回答日付
@@ -56,35 +188,46 @@ class DataManager:
             start_time: 開始時刻（HH:MM形式）
             end_time: 終了時刻（HH:MM形式）
         """
-        data = self._load_data()
-        date_str = date.strftime("%Y-%m-%d")
+        with self._lock, self._file_lock():
+            if self.shared:
+                # 他のレプリカが同じ秒のうちに保存していても取りこぼさないよう、更新時刻によらず読み直す
+                self._cache = None
+            data = self._load_data()
+            date_str = date.strftime("%Y-%m-%d")
         
-        if date_str not in data:
-            data[date_str] = []
+            if date_str not in data:
+                data[date_str] = []
         
-        # 既存の回答を検索して更新、なければ追加
-        response_found = False
-        for response in data[date_str]:
-            if response["user_id"] == user_id:
-                response["can_attend"] = can_attend
-                response["start_time"] = start_time
-                response["end_time"] = end_time
-                response["updated_at"] = datetime.now(self.jst).isoformat()
-                response_found = True
-                break
+            # 既存の回答を検索して更新、なければ追加
+            saved = None
+            for response in data[date_str]:
+                if response["user_id"] == user_id:
+                    response["can_attend"] = can_attend
+                    response["start_time"] = start_time
+                    response["end_time"] = end_time
+                    response["updated_at"] = datetime.now(self.jst).isoformat()
+                    saved = response
+                    break
         
-        if not response_found:
-            data[date_str].append({
-                "user_id": user_id,
-                "can_attend": can_attend,
-                "start_time": start_time,
-                "end_time": end_time,
-                "created_at": datetime.now(self.jst).isoformat(),
-                "updated_at": datetime.now(self.jst).isoformat()
-            })
+            response_found = saved is not None
+            if not response_found:
+                saved = {
+                    "user_id": user_id,
+                    "can_attend": can_attend,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "created_at": datetime.now(self.jst).isoformat(),
+                    "updated_at": datetime.now(self.jst).isoformat()
+                }
+                data[date_str].append(saved)
         
-        self._save_data(data)
+            self._save_data(data)
+            # 集計済みの日付なら差分だけ反映
+            aggregate = self._aggregates.get(date_str)
+            if aggregate is not None:
+                aggregate.apply(saved, is_new=not response_found)
     
+    @timed("data.get_responses_for_date")
     def get_responses_for_date(self, date: datetime) -> List[Dict]:
         """
         指定された日付の回答を取得
@@ -95,9 +238,11 @@ class DataManager:
         Returns:
             回答データのリスト
         """
-        data = self._load_data()
         date_str = date.strftime("%Y-%m-%d")
-        return data.get(date_str, [])
+        with self._lock:
+            data = self._load_data()
+            # 書き込み中のスレッドと共有しないようコピーを返す
+            return [dict(response) for response in data.get(date_str, [])]
     
     def get_attendable_users(self, date: datetime) -> List[Dict]:
         """
@@ -118,6 +263,7 @@ class DataManager:
         attendable.sort(key=lambda x: x.get("updated_at", x.get("created_at", "")), reverse=True)
         return attendable
     
+    @timed("data.get_summary")
     def get_summary(self, date: datetime) -> Dict:
         """
         指定された日付の集計結果を取得
@@ -128,21 +274,15 @@ class DataManager:
         Returns:
             集計結果の辞書
         """
-        responses = self.get_responses_for_date(date)
-        attendable = self.get_attendable_users(date)
-        
-        return {
-            "date": date.strftime("%Y-%m-%d"),
-            "total_responses": len(responses),
-            "attendable_count": len(attendable),
-            "attendable_users": [
-                {
-                    "user_id": r["user_id"],
-                    "start_time": r.get("start_time"),
-                    "end_time": r.get("end_time")
-                }
-                for r in attendable
-            ],
-            "not_attendable_count": len(responses) - len(attendable)
-        }
+        date_str = date.strftime("%Y-%m-%d")
+        with self._lock:
+            data = self._load_data()
+            aggregate = self._aggregates.get(date_str)
+            if aggregate is None:
+                aggregate = DateAggregate.from_responses(data.get(date_str, []))
+                self._aggregates[date_str] = aggregate
+                while len(self._aggregates) > self.MAX_AGGREGATES:
+                    self._aggregates.popitem(last=False)
+            self._aggregates.move_to_end(date_str)
+            return aggregate.to_summary(date_str)
 
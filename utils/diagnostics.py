@@ -0,0 +1,384 @@
+"""イベントループの停止検知とプロファイル取得（診断モード）"""
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from utils.log import get_logger
+from utils.metrics import MetricsRegistry, get_registry
+
+logger = get_logger("diagnostics")
+
+# ループをブロックした時間のヒストグラムのバケット（秒）
+BLOCKED_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PROFILE_MODES = ("cprofile", "sampling")
+
+# asyncioのデバッグモードが出力する遅いコールバックのログ（"Executing %s took %.3f seconds"）の解析用
+_TASK_NAME = re.compile(r"name='([^']*)'")
+_TASK_CORO = re.compile(r"coro=<([^\s>]+)")
+_DEFINED_AT = re.compile(r"defined at ([^\s>]+)")
+_CREATED_AT = re.compile(r" created at \S+>?$")
+# ループがコールバック（タスクの1ステップを含む）を呼び出すフレーム（サンプリングではここより外側を省く）
+_HANDLE_RUN_CODE = asyncio.events.Handle._run.__code__
+
+
+def describe_handle(handle: str) -> Tuple[str, Optional[str]]:
+    """
+    asyncioのハンドルの表示からコルーチン名と定義位置を取り出す
+
+    Args:
+        handle: "<Task finished name='...' coro=<func() done, defined at file:line> ...>" などの文字列
+
+    Returns:
+        (説明, 定義位置)（タスク以外のコールバックは定義位置がNone）
+    """
+    coro = _TASK_CORO.search(handle)
+    if coro:
+        name = _TASK_NAME.search(handle)
+        defined_at = _DEFINED_AT.search(handle)
+        description = coro.group(1) + (f"（タスク: {name.group(1)}）" if name else "")
+        return description, defined_at.group(1) if defined_at else None
+    description = _CREATED_AT.sub("", handle)
+    if description.startswith("<Handle "):
+        description = description[len("<Handle "):]
+    return description.rstrip(">")[:200], None
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """asyncioロガーの遅いコールバックの警告を診断機能に記録するハンドラー"""
+
+    def __init__(self, diagnostics: "LoopDiagnostics"):
+        super().__init__()
+        self.diagnostics = diagnostics
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            if record.msg.startswith("Executing ") and len(record.args or ()) == 2:
+                handle, seconds = record.args
+                self.diagnostics.record_slow_callback(str(handle), float(seconds))
+            else:
+                # それ以外のasyncioのログ（破棄された未完了タスクなど）はそのままボットのログに流す
+                logger.handle(record)
+        except Exception:
+            self.handleError(record)
+
+
+class LoopDiagnostics:
+    """
+    イベントループの停止を検知・記録し、必要に応じてプロファイルを取得するクラス
+
+    - asyncioのデバッグモードを有効にし、slow_callback_durationを超えたコールバック
+      （どのコルーチンが何秒ループを占有したか）を記録します
+    - 別スレッドのウォッチドッグが、ループ上のハートビートがstall_seconds以上途絶えたときに
+      ループのスレッドのスタックを取得し、ループが再開した時点で停止時間と合わせて記録します
+    - profileでcProfileまたはサンプリングのプロファイルを指定秒数だけ取得できます
+
+    Gatewayのハートビートもループ上で送られるため、ここで記録される停止が
+    ハートビートの遅延の原因の候補になります。
+    """
+
+    def __init__(
+        self,
+        slow_callback_seconds: float = 0.1,
+        stall_seconds: float = 1.0,
+        registry: Optional[MetricsRegistry] = None,
+        history_size: int = 50
+    ):
+        """
+        Args:
+            slow_callback_seconds: 遅いコールバックとして記録する実行時間（秒）
+            stall_seconds: ループの停止とみなしてスタックを取得するハートビートの途絶時間（秒）
+            registry: 記録先のメトリクス（Noneの場合はプロセス共通のレジストリ）
+            history_size: 保持する直近のイベント数
+        """
+        self.slow_callback_seconds = slow_callback_seconds
+        self.stall_seconds = stall_seconds
+        # ハートビートの間隔（停止の判定時間の1/4、ただし50ms以上）
+        self.beat_interval = max(0.05, stall_seconds / 4)
+        self.events: Deque[dict] = deque(maxlen=history_size)
+        self.counts: Dict[str, int] = {"slow_callback": 0, "stall": 0}
+        self.max_blocked_seconds = 0.0
+        registry = registry or get_registry()
+        self._blocked = registry.histogram(
+            "bot_loop_blocked_seconds", "イベントループがブロックされた時間", ["kind"], buckets=BLOCKED_BUCKETS
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._last_beat = time.monotonic()
+        # ウォッチドッグが検知した停止中のスタック（停止が終わるまで保持）
+        self._stall: Optional[dict] = None
+        self._lock = threading.Lock()
+        self._handler = _SlowCallbackHandler(self)
+        self._profiling = False
+
+    @property
+    def running(self) -> bool:
+        """監視中かどうか"""
+        return self._loop is not None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """
+        監視を開始（ループのスレッド上から呼び出す）
+
+        Args:
+            loop: 監視するイベントループ
+        """
+        if self._loop is not None:
+            return
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        loop.set_debug(True)
+        loop.slow_callback_duration = self.slow_callback_seconds
+        asyncio_logger = logging.getLogger("asyncio")
+        asyncio_logger.setLevel(logging.WARNING)
+        asyncio_logger.addHandler(self._handler)
+        asyncio_logger.propagate = False
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat_task = loop.create_task(self._heartbeat(), name="diagnostics-heartbeat")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(
+            f"診断モードを開始しました（遅いコールバック: {self.slow_callback_seconds * 1000:.0f}ms以上、"
+            f"停止検知: {self.stall_seconds:.1f}秒以上）",
+            extra={"slow_callback_seconds": self.slow_callback_seconds, "stall_seconds": self.stall_seconds}
+        )
+
+    def stop(self):
+        """監視を停止"""
+        if self._loop is None:
+            return
+        self._stopped.set()
+        if self._heartbeat_task is not None and not self._loop.is_closed():
+            self._heartbeat_task.cancel()
+        if self._watchdog is not None and self._watchdog is not threading.current_thread():
+            self._watchdog.join(timeout=1)
+        asyncio_logger = logging.getLogger("asyncio")
+        asyncio_logger.removeHandler(self._handler)
+        asyncio_logger.propagate = True
+        self._loop = None
+
+    def _record(self, kind: str, seconds: float, description: str, **details) -> dict:
+        event = {"kind": kind, "seconds": round(seconds, 3), "description": description, "at": time.time(), **details}
+        with self._lock:
+            self.events.append(event)
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            self.max_blocked_seconds = max(self.max_blocked_seconds, seconds)
+        self._blocked.observe(seconds, kind=kind)
+        return event
+
+    def record_slow_callback(self, handle: str, seconds: float):
+        """
+        遅いコールバックを記録（asyncioのデバッグモードのログから呼ばれる）
+
+        Args:
+            handle: 実行されたハンドルの表示
+            seconds: 実行時間（秒）
+        """
+        description, defined_at = describe_handle(handle)
+        self._record("slow_callback", seconds, description, defined_at=defined_at)
+        logger.warning(
+            f"{description} がイベントループを{seconds * 1000:.0f}ms占有しました",
+            extra={"blocked_ms": round(seconds * 1000, 1), "callback": description, "defined_at": defined_at}
+        )
+
+    async def _heartbeat(self):
+        """ループ上で一定間隔で時刻を記録し、停止から復帰したら記録する"""
+        while True:
+            await asyncio.sleep(self.beat_interval)
+            now = time.monotonic()
+            with self._lock:
+                previous = self._last_beat
+                self._last_beat = now
+                stall, self._stall = self._stall, None
+            if stall is None:
+                continue
+            # 予定のハートビート間隔を超えた分が停止時間
+            seconds = max(0.0, now - previous - self.beat_interval)
+            self._record("stall", seconds, stall["description"], stack=stall["stack"])
+            logger.warning(
+                f"イベントループが{seconds:.2f}秒停止していました（{stall['description']}）\n{stall['stack']}",
+                extra={"blocked_ms": round(seconds * 1000, 1), "task": stall["description"]}
+            )
+
+    def _watch(self):
+        """別スレッドでハートビートの途絶を監視し、停止中のループのスタックを取得する"""
+        while not self._stopped.wait(self.beat_interval):
+            with self._lock:
+                age = time.monotonic() - self._last_beat
+                already_captured = self._stall is not None
+            if already_captured or age < self.stall_seconds + self.beat_interval:
+                continue
+            stall = self._capture_stall()
+            if stall is not None:
+                with self._lock:
+                    self._stall = stall
+
+    def _capture_stall(self) -> Optional[dict]:
+        """ループのスレッドの現在のスタックと実行中のタスクを取得"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+        stack = "".join(traceback.format_stack(frame)[-15:])
+        description = "不明なコールバック"
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        if task is not None:
+            coro = task.get_coro()
+            description = f"{getattr(coro, '__qualname__', repr(coro))}（タスク: {task.get_name()}）"
+        return {"description": description, "stack": stack}
+
+    async def profile(self, seconds: float, mode: str = "cprofile", limit: int = 30) -> Tuple[str, str]:
+        """
+        指定秒数だけプロファイルを取得
+
+        Args:
+            seconds: 取得する秒数
+            mode: "cprofile"（ループのスレッドの全関数呼び出し）または "sampling"（5msごとのスタックの統計）
+            limit: レポートに表示する関数の数
+
+        Returns:
+            (概要, レポート全文)
+
+        Raises:
+            ValueError: modeが不正な場合
+            RuntimeError: 別のプロファイルを取得中の場合
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"modeは {', '.join(PROFILE_MODES)} のいずれかを指定してください")
+        if self._profiling:
+            raise RuntimeError("別のプロファイルを取得中です")
+        self._profiling = True
+        # デバッグモードはコールバックの登録ごとにスタックを取得するため、プロファイル中は止めて
+        # 通常運転時の負荷を計測する（この間の遅いコールバックはウォッチドッグの停止検知のみで記録）
+        loop = self._loop
+        if loop is not None:
+            loop.set_debug(False)
+        try:
+            if mode == "cprofile":
+                return await self._profile_cprofile(seconds, limit)
+            return await self._profile_sampling(seconds, limit)
+        finally:
+            if loop is not None and self._loop is loop:
+                loop.set_debug(True)
+            self._profiling = False
+
+    async def _profile_cprofile(self, seconds: float, limit: int) -> Tuple[str, str]:
+        # cProfileは有効にしたスレッド（ループのスレッド）の呼び出しだけを記録する
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats("tottime").print_stats(limit)
+        summary = f"cProfile {seconds:.0f}秒: {stats.total_calls}回の呼び出し（関数内の実行時間順）"
+        logger.info(summary, extra={"profile_mode": "cprofile", "profile_seconds": seconds})
+        return summary, stream.getvalue()
+
+    async def _profile_sampling(self, seconds: float, limit: int) -> Tuple[str, str]:
+        thread_id = self._loop_thread_id or threading.get_ident()
+        stacks = await asyncio.to_thread(sample_stacks, thread_id, seconds)
+        summary, report = format_sampling_report(stacks, seconds, limit)
+        logger.info(summary, extra={"profile_mode": "sampling", "profile_seconds": seconds})
+        return summary, report
+
+    def stats(self) -> dict:
+        """停止の統計と直近のイベントを取得"""
+        with self._lock:
+            return {
+                "running": self.running,
+                "slow_callbacks": self.counts.get("slow_callback", 0),
+                "stalls": self.counts.get("stall", 0),
+                "max_blocked_ms": round(self.max_blocked_seconds * 1000, 1),
+                "recent": list(self.events)[-5:],
+            }
+
+
+def sample_stacks(thread_id: int, seconds: float, interval: float = 0.005) -> Counter:
+    """
+    指定スレッドのスタックを一定間隔で取得して集計（ループの外のスレッドから呼び出す）
+
+    Args:
+        thread_id: 対象スレッドのID
+        seconds: 取得する秒数
+        interval: 取得間隔（秒）
+
+    Returns:
+        スタック（外側から順の "関数 (ファイル:行)" のタプル）: 出現回数
+        （コールバックの実行中はイベントループ自体のフレームを省き、コールバックから始まる）
+    """
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                if code is _HANDLE_RUN_CODE:
+                    break
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            stacks[tuple(reversed(stack))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def format_sampling_report(stacks: Counter, seconds: float, limit: int = 30) -> Tuple[str, str]:
+    """
+    サンプリングの結果をレポートに整形
+
+    selectorsモジュールで待機しているサンプルはループが空いている時間として数えます。
+    サンプラーのスレッドはループのスレッドがGILを手放したときに動くため、
+    CPUを使い続ける処理より待機中のほうが多めに記録される傾向があります。
+
+    Args:
+        stacks: sample_stacksの結果
+        seconds: 取得した秒数
+        limit: 表示する関数の数
+
+    Returns:
+        (概要, レポート全文)（全文の末尾はflamegraph.plなどで使える "a;b;c 件数" 形式）
+    """
+    total = sum(stacks.values())
+    idle = sum(count for stack, count in stacks.items() if stack and "(selectors.py:" in stack[-1])
+    busy = total - idle
+    summary = (
+        f"サンプリング {seconds:.0f}秒: {total}サンプル、"
+        f"ループ使用率 {busy / total * 100 if total else 0:.1f}%"
+    )
+    leaf_counts: Counter = Counter()
+    inclusive_counts: Counter = Counter()
+    for stack, count in stacks.items():
+        if stack and "(selectors.py:" not in stack[-1]:
+            leaf_counts[stack[-1]] += count
+            # 呼び出し先を含む集計では行番号を除き、再帰していても1サンプル1回と数える
+            for function in {frame.rsplit(":", 1)[0] + ")" for frame in stack}:
+                inclusive_counts[function] += count
+    lines: List[str] = [summary]
+    for title, counts in (("実行中の関数", leaf_counts), ("呼び出し先を含む関数", inclusive_counts)):
+        lines.extend(["", f"{title}（待機中を除く上位{limit}件）:"])
+        for function, count in counts.most_common(limit):
+            lines.append(f"{count:6d} {count / total * 100 if total else 0:5.1f}%  {function}")
+    lines.extend(["", "スタック（collapsed形式）:"])
+    for stack, count in stacks.most_common():
+        lines.append(f"{';'.join(stack)} {count}")
+    return summary, "\n".join(lines) + "\n"
@@ -0,0 +1,300 @@
+"""メッセージ送信の集中管理機能"""
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from utils.log import get_logger
+
+logger = get_logger("dispatch")
+
+# 優先度（小さいほど先に送信）
+PRIORITY_QUESTION = 0   # 質問メッセージ
+PRIORITY_SUMMARY = 10   # 集計結果・フォローアップ
+PRIORITY_ANALYTICS = 20  # 集計メッセージの更新など、遅れても困らないもの
+
+
+def default_retry_delay(
+    error: Exception,
+    attempt: int,
+    idempotent: bool = False,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0
+) -> Optional[float]:
+    """
+    送信エラーを再試行するまでの待ち時間を決める
+
+    429（レート制限）は常に再試行します。5xx（サーバーエラー）はidempotentの場合のみ再試行します。
+    discord.pyのHTTPClientが500/502/504を内部で再試行済みのうえ、5xxはメッセージが作成された後に
+    返ることもあるため、channel.sendのような冪等でない操作を再試行すると二重投稿になりえます。
+    discord.HTTPException / discord.RateLimited の status・retry_after 属性を参照しますが、
+    discordをインポートしないため同じ属性を持つ任意の例外に使えます。
+
+    Args:
+        error: 送信時に発生した例外
+        attempt: 何回目の再試行か（1始まり）
+        idempotent: 再試行しても結果が変わらない操作（メッセージの編集など）の場合True
+        base_delay: 指数バックオフの基準秒数
+        max_delay: 待ち時間の上限（秒）
+
+    Returns:
+        待ち時間（秒）、再試行しない場合はNone
+    """
+    retry_after = getattr(error, "retry_after", None)
+    status = getattr(error, "status", None)
+    server_error = isinstance(status, int) and status >= 500
+    if retry_after is None and not (status == 429 or (idempotent and server_error)):
+        return None
+    if retry_after is not None:
+        return min(float(retry_after), max_delay)
+    # 指数バックオフ（同時に失敗した送信が一斉に再試行しないよう揺らぎを加える）
+    delay = min(base_delay * (2 ** (attempt - 1)), max_delay)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class _PrioritySemaphore:
+    """待っているものの中から優先度の高い順に通すセマフォ"""
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    async def acquire(self, priority: int):
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 通過を許可された直後にキャンセルされた場合は枠を返す
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+
+class _SlidingWindow:
+    """直近per秒間の送信件数をlimit件までに抑える"""
+
+    def __init__(self, limit: int, per: float):
+        self.limit = limit
+        self.per = per
+        self._times: Deque[float] = deque()
+
+    async def reserve(self):
+        """送信できるようになるまで待ち、1件分の枠を確保"""
+        while True:
+            now = time.monotonic()
+            while self._times and self._times[0] <= now - self.per:
+                self._times.popleft()
+            if len(self._times) < self.limit:
+                self._times.append(now)
+                return
+            await asyncio.sleep(self._times[0] + self.per - now)
+
+
+class _Job:
+    """送信待ちの1件"""
+
+    __slots__ = ("send", "priority", "future", "idempotent")
+
+    def __init__(self, send: Callable[[], Awaitable[Any]], priority: int, future: asyncio.Future, idempotent: bool):
+        self.send = send
+        self.priority = priority
+        self.future = future
+        self.idempotent = idempotent
+
+
+class MessageDispatcher:
+    """
+    Discordへの送信をチャンネルごとのキューで順番に行うクラス
+
+    - 同じチャンネル（DiscordのレートリミットのバケットはチャンネルごとのためチャンネルIDで区切る）
+      への送信は1件ずつ、優先度の高いものから行い、バケットの上限（既定: 5秒に5件）を超えないよう待ちます
+    - チャンネルをまたいだ同時送信数は max_concurrency まで、送信数は1秒あたり global_per_second
+      までに抑えます（グローバル制限対策）
+    - 429で失敗した送信は待ってから再試行します（5xxはidempotent=Trueで投入した送信のみ）
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 5,
+        max_retries: int = 3,
+        retry_delay: Callable[[Exception, int, bool], Optional[float]] = default_retry_delay,
+        bucket_limit: int = 5,
+        bucket_per: float = 5.0,
+        global_per_second: int = 50,
+        window_seconds: float = 60.0
+    ):
+        """
+        Args:
+            max_concurrency: すべてのチャンネルを合わせた同時送信数の上限
+            max_retries: 1件あたりの再試行回数の上限
+            retry_delay: (例外, 再試行回数, 冪等かどうか) から待ち時間を返す関数（Noneなら再試行しない）
+            bucket_limit: 1チャンネルあたり bucket_per 秒間に送信する件数の上限
+            bucket_per: チャンネルごとのバケットの期間（秒）
+            global_per_second: すべてのチャンネルを合わせた1秒あたりの送信数の上限
+            window_seconds: 送信レートを計算する期間（秒）
+        """
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.window_seconds = window_seconds
+        self.bucket_limit = bucket_limit
+        self.bucket_per = bucket_per
+        self._gate = _PrioritySemaphore(max_concurrency)
+        self._global_window = _SlidingWindow(global_per_second, 1.0)
+        self._buckets: Dict[Any, _SlidingWindow] = {}
+        self._queues: Dict[Any, List[Tuple[int, int, _Job]]] = {}
+        self._workers: Dict[Any, asyncio.Task] = {}
+        self._counter = itertools.count()
+        # 直近の送信完了時刻（送信レートの計算用）
+        self._sent_times: Deque[float] = deque()
+        self._started = time.monotonic()
+        self.sent = 0
+        self.retries = 0
+        self.failures = 0
+
+    def submit(
+        self,
+        key: Any,
+        send: Callable[[], Awaitable[Any]],
+        priority: int = PRIORITY_SUMMARY,
+        idempotent: bool = False
+    ) -> "asyncio.Future[Any]":
+        """
+        送信をキューに追加
+
+        Args:
+            key: 送信先のキー（通常はチャンネルID）
+            send: 送信を行うコルーチン関数（再試行時は再度呼び出される）
+            priority: 優先度（PRIORITY_*、小さいほど先に送信）
+            idempotent: 再試行しても二重にならない操作（メッセージの編集など）の場合True（5xxも再試行する）
+
+        Returns:
+            送信結果（sendの戻り値）を受け取るFuture。awaitすると送信完了まで待つ
+        """
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(send, priority, future, idempotent)
+        heapq.heappush(self._queues.setdefault(key, []), (priority, next(self._counter), job))
+        worker = self._workers.get(key)
+        if worker is None or worker.done():
+            self._workers[key] = asyncio.create_task(self._drain(key))
+        return future
+
+    async def send(
+        self,
+        key: Any,
+        send: Callable[[], Awaitable[Any]],
+        priority: int = PRIORITY_SUMMARY,
+        idempotent: bool = False
+    ) -> Any:
+        """submitして送信完了まで待つ（送信に失敗した場合は例外を送出）"""
+        return await self.submit(key, send, priority, idempotent)
+
+    async def _drain(self, key: Any):
+        """キューが空になるまで、このチャンネルへの送信を1件ずつ行う"""
+        queue = self._queues[key]
+        bucket = self._buckets.setdefault(key, _SlidingWindow(self.bucket_limit, self.bucket_per))
+        try:
+            while queue:
+                _, _, job = heapq.heappop(queue)
+                if job.future.done():
+                    continue  # 呼び出し元でキャンセル済み
+                try:
+                    result = await self._send_with_retry(job, bucket)
+                except Exception as e:
+                    self.failures += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    if not job.future.done():
+                        job.future.set_result(result)
+        finally:
+            if not queue:
+                self._queues.pop(key, None)
+                if not bucket._times:
+                    self._buckets.pop(key, None)
+            if self._workers.get(key) is asyncio.current_task():
+                del self._workers[key]
+
+    async def _send_with_retry(self, job: _Job, bucket: _SlidingWindow) -> Any:
+        """送信し、再試行できるエラーなら待ってから送信し直す"""
+        attempt = 0
+        while True:
+            # バケットの上限に達していれば、429を受ける前に空くまで待つ
+            await bucket.reserve()
+            # 同時送信の枠は送信中だけ確保する（再試行の待ち時間中は他のチャンネルに譲る）
+            await self._gate.acquire(job.priority)
+            try:
+                await self._global_window.reserve()
+                result = await job.send()
+            except Exception as e:
+                error = e
+            else:
+                self._record_sent()
+                return result
+            finally:
+                self._gate.release()
+            attempt += 1
+            delay = self.retry_delay(error, attempt, job.idempotent) if attempt <= self.max_retries else None
+            if delay is None:
+                raise error
+            self.retries += 1
+            logger.warning(
+                f"送信に失敗したため {delay:.1f}秒後に再試行します（{attempt}回目）: {error}",
+                extra={"attempt": attempt, "retry_delay": round(delay, 3)}
+            )
+            await asyncio.sleep(delay)
+
+    def _record_sent(self):
+        """送信完了を記録"""
+        now = time.monotonic()
+        self.sent += 1
+        self._sent_times.append(now)
+        while self._sent_times and self._sent_times[0] < now - self.window_seconds:
+            self._sent_times.popleft()
+
+    def messages_per_second(self) -> float:
+        """直近window_seconds秒間の平均送信レート（件/秒）"""
+        now = time.monotonic()
+        while self._sent_times and self._sent_times[0] < now - self.window_seconds:
+            self._sent_times.popleft()
+        elapsed = min(self.window_seconds, now - self._started)
+        return len(self._sent_times) / elapsed if elapsed > 0 else 0.0
+
+    def queue_depths(self) -> Dict[Any, int]:
+        """チャンネルごとの送信待ち件数"""
+        return {key: len(queue) for key, queue in self._queues.items() if queue}
+
+    async def flush(self):
+        """キューが空になり、すべての送信が完了するまで待つ"""
+        while self._workers:
+            await asyncio.wait(list(self._workers.values()))
+
+    def stats(self) -> dict:
+        """送信の統計を取得"""
+        return {
+            "sent": self.sent,
+            "retries": self.retries,
+            "failures": self.failures,
+            "messages_per_second": round(self.messages_per_second(), 2),
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "waiting_for_slot": self._gate.waiting
+        }
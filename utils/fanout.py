@@ -0,0 +1,65 @@
+"""複数の送信先への並行処理機能"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+from utils.log import get_logger
+
+logger = get_logger("fanout")
+
+
+class FanOutResult:
+    """1つの送信先の処理結果"""
+
+    __slots__ = ("item", "result", "error", "seconds")
+
+    def __init__(self, item: Any, result: Any = None, error: Optional[BaseException] = None, seconds: float = 0.0):
+        self.item = item
+        self.result = result
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def ok(self) -> bool:
+        """成功したかどうか"""
+        return self.error is None
+
+
+async def fan_out(
+    items: Iterable[Any],
+    func: Callable[[Any], Awaitable[Any]],
+    limit: int = 10,
+    name: str = "並行処理"
+) -> List[FanOutResult]:
+    """
+    各要素に対してfuncを並行に実行（同時実行数はlimitまで）
+
+    1つの要素の処理が遅い・失敗しても他の要素の処理は待たされず、
+    例外は結果に記録されるだけで送出されません。
+
+    Args:
+        items: 処理対象（チャンネルIDなど）
+        func: 要素を受け取るコルーチン関数
+        limit: 同時実行数の上限
+        name: ログに表示する名前
+
+    Returns:
+        itemsと同じ順序の処理結果のリスト
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(item: Any) -> FanOutResult:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await func(item)
+            except Exception as e:
+                elapsed = time.perf_counter() - started
+                logger.warning(
+                    f"[{name}] {item} の処理に失敗しました（{elapsed * 1000:.1f}ms）: {e}",
+                    extra={"fan_out": name, "item": str(item), "elapsed_ms": round(elapsed * 1000, 1)}
+                )
+                return FanOutResult(item, error=e, seconds=elapsed)
+            return FanOutResult(item, result=result, seconds=time.perf_counter() - started)
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
@@ -0,0 +1,44 @@
+"""複数のプロセス・レプリカ間でのファイルの排他機能"""
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    ロック用のファイルで他のプロセスと排他する（POSIXのファイルロック、NFSなどの共有ボリュームでも有効）
+
+    POSIXのロックはプロセス単位のため、同じプロセス内で同じファイルのロックを入れ子にしないでください
+    （内側の解除で外側のロックも外れます）。
+
+    Args:
+        path: ロック用のファイルのパス（なければ作成）
+    """
+    import fcntl
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as lock_file:
+        fcntl.lockf(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.lockf(lock_file, fcntl.LOCK_UN)
+
+
+def make_temp_path(path: str) -> str:
+    """
+    pathと同じディレクトリに、置き換え用の一意な一時ファイルを作成
+
+    複数のプロセスが同時に保存しても一時ファイルを取り合わないよう、固定の名前は使いません。
+
+    Args:
+        path: 最終的に置き換えるファイルのパス
+
+    Returns:
+        作成した一時ファイルのパス（os.replaceでpathに置き換える）
+    """
+    directory, filename = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f"{filename}.", suffix=".tmp")
+    os.close(fd)
+    return tmp_path
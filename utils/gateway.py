@@ -0,0 +1,33 @@
+"""Discord Gateway接続の設定"""
+import discord
+
+
+def build_bot_options(lean: bool) -> dict:
+    """
+    Botの初期化オプションを作成
+    
+    Args:
+        lean: 省メモリモードにするかどうか。ボタン・スラッシュコマンド（Intent不要）と
+            チャンネル・権限の判定（guilds Intent）以外のイベントを受け取らず、
+            メンバーとメッセージをキャッシュしません
+            
+    Returns:
+        commands.Botに渡すキーワード引数
+    """
+    if not lean:
+        # Intentsの設定
+        intents = discord.Intents.default()
+        # intents.message_content = True  # 必要に応じてDiscord Developer Portalで有効化してください（スラッシュコマンドのみの場合は不要）
+        # intents.members = True  # 必要に応じてDiscord Developer Portalで有効化してください
+        return {"intents": intents}
+    
+    intents = discord.Intents.none()
+    intents.guilds = True  # チャンネル・ロールのキャッシュ（送信権限の判定）に必要
+    return {
+        "intents": intents,
+        # ボット自身以外のメンバーはキャッシュしない（ボット自身は常にキャッシュされる）
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False,
+        # メッセージはキャッシュしない（ボタンの処理はcustom_idだけで行う）
+        "max_messages": None,
+    }
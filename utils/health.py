@@ -0,0 +1,134 @@
+"""ヘルスチェック・メトリクス用のHTTPサーバー"""
+import json
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from utils.metrics import MetricsRegistry
+from utils.log import get_logger
+
+logger = get_logger("health")
+
+# チェック関数の戻り値（正常かどうか, 詳細）
+CheckResult = Tuple[bool, str]
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class HealthServer:
+    """
+    ボットのイベントループ上で動くヘルスチェックサーバー
+
+    - /healthz: 生存確認（livenessのチェックがすべて正常なら200、1つでも異常なら503）
+    - /readyz: 準備完了の確認（すべてのチェックが正常なら200、1つでも異常なら503）
+    - /metrics: Prometheusのテキスト形式のメトリクス
+
+    応答自体がイベントループ上で処理されるため、ループが固まっている場合は応答がなく、
+    Cloud Runなどのプローブはタイムアウトで異常を検知できます。
+    """
+
+    def __init__(self, registry: MetricsRegistry, port: int = 8080, host: str = "0.0.0.0"):
+        """
+        Args:
+            registry: /metricsで出力するメトリクス
+            port: 待ち受けるポート
+            host: 待ち受けるアドレス
+        """
+        self.registry = registry
+        self.port = port
+        self.host = host
+        # チェック名: (チェック関数, livenessにも含めるか)
+        self._checks: Dict[str, Tuple[Callable[[], CheckResult], bool]] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self._requests = registry.counter(
+            "bot_http_requests_total", "ヘルスチェックサーバーへのリクエスト数", ["path", "status"]
+        )
+
+    def add_check(self, name: str, check: Callable[[], CheckResult], liveness: bool = False):
+        """
+        チェックを登録
+
+        Args:
+            name: チェック名（応答のJSONに表示）
+            check: (正常かどうか, 詳細) を返す関数
+            liveness: /healthzにも含める場合True（再起動が必要な異常のみ）
+        """
+        self._checks[name] = (check, liveness)
+
+    def run_checks(self, liveness_only: bool = False) -> Tuple[bool, Dict[str, dict]]:
+        """
+        チェックを実行
+
+        Args:
+            liveness_only: livenessのチェックだけを実行する場合True
+
+        Returns:
+            (すべて正常かどうか, チェック名ごとの結果)
+        """
+        results = {}
+        healthy = True
+        for name, (check, liveness) in self._checks.items():
+            if liveness_only and not liveness:
+                continue
+            try:
+                ok, detail = check()
+            except Exception as e:
+                ok, detail = False, f"チェックに失敗しました: {e}"
+            results[name] = {"ok": bool(ok), "detail": detail}
+            healthy = healthy and bool(ok)
+        return healthy, results
+
+    def _check_response(self, path: str, liveness_only: bool) -> web.Response:
+        healthy, results = self.run_checks(liveness_only)
+        status = 200 if healthy else 503
+        self._requests.inc(path=path, status=status)
+        body = {"status": "ok" if healthy else "unavailable", "checks": results}
+        return web.Response(
+            status=status,
+            text=json.dumps(body, ensure_ascii=False),
+            content_type="application/json"
+        )
+
+    async def _healthz(self, request: web.Request) -> web.Response:
+        return self._check_response("/healthz", liveness_only=True)
+
+    async def _readyz(self, request: web.Request) -> web.Response:
+        return self._check_response("/readyz", liveness_only=False)
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        self._requests.inc(path="/metrics", status=200)
+        return web.Response(
+            body=self.registry.render().encode("utf-8"),
+            headers={"Content-Type": PROMETHEUS_CONTENT_TYPE}
+        )
+
+    async def _root(self, request: web.Request) -> web.Response:
+        # 従来のヘルスチェック（パス指定なし）との互換用
+        return self._check_response("/", liveness_only=True)
+
+    def routes(self) -> List[web.RouteDef]:
+        """サーバーのルート定義"""
+        return [
+            web.get("/", self._root),
+            web.get("/healthz", self._healthz),
+            web.get("/readyz", self._readyz),
+            web.get("/metrics", self._metrics),
+        ]
+
+    async def start(self):
+        """サーバーを起動（実行中のイベントループ上で待ち受ける）"""
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.add_routes(self.routes())
+        # アクセスログはボットのログと混在しないよう出力しない
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"HTTPサーバーをポート{self.port}で起動しました（/healthz, /readyz, /metrics）", extra={"port": self.port})
+
+    async def stop(self):
+        """サーバーを停止"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,142 @@
+"""祝日ファイル（CSV / iCalendar）の読み込み機能"""
+import csv
+import io
+from datetime import date, datetime, timedelta
+from typing import List, Tuple
+
+# 受け付ける日付形式（内閣府の祝日CSVは「2025/1/1」形式）
+_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%Y%m%d")
+
+
+def _decode(data: bytes) -> str:
+    """UTF-8（BOM付き含む）、だめならShift_JIS系としてデコード"""
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp932")
+
+
+def _parse_date(value: str) -> date:
+    """日付文字列をdateに変換"""
+    value = value.strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"日付形式が正しくありません: {value}")
+
+
+def parse_holiday_csv(text: str) -> List[Tuple[date, str]]:
+    """
+    CSV形式の祝日データを解析
+
+    1列目に日付（YYYY-MM-DD、YYYY/MM/DD、YYYYMMDD）、2列目に祝日名を記載します。
+    1行目が日付として解釈できない場合はヘッダー行とみなして読み飛ばします。
+
+    Args:
+        text: CSVの内容
+
+    Returns:
+        (日付, 祝日名) のリスト
+
+    Raises:
+        ValueError: 日付が解釈できない行がある場合
+    """
+    entries = []
+    for line_no, row in enumerate(csv.reader(io.StringIO(text)), 1):
+        if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+            continue
+        try:
+            holiday_date = _parse_date(row[0])
+        except ValueError:
+            if line_no == 1:
+                continue  # ヘッダー行
+            raise ValueError(f"{line_no}行目: 日付形式が正しくありません: {row[0]}")
+        name = row[1].strip() if len(row) > 1 else ""
+        entries.append((holiday_date, name))
+    return entries
+
+
+def _unfold_ics_lines(text: str) -> List[str]:
+    """iCalendarの折り返し行（先頭が空白）を連結"""
+    lines: List[str] = []
+    for raw in text.splitlines():
+        if raw[:1] in (" ", "\t") and lines:
+            lines[-1] += raw[1:]
+        else:
+            lines.append(raw)
+    return lines
+
+
+def _unescape_ics_text(value: str) -> str:
+    """iCalendarのTEXT値のエスケープを解除"""
+    return (value.replace("\\n", " ").replace("\\N", " ")
+            .replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\"))
+
+
+def parse_holiday_ics(text: str) -> List[Tuple[date, str]]:
+    """
+    iCalendar（.ics）形式の祝日データを解析
+
+    VEVENTのDTSTARTを祝日の日付、SUMMARYを祝日名として扱います。
+    DTENDがある複数日の終日イベントは各日を祝日として展開します（DTENDは含まない）。
+
+    Args:
+        text: iCalendarの内容
+
+    Returns:
+        (日付, 祝日名) のリスト
+
+    Raises:
+        ValueError: VEVENTにDTSTARTがない、または日付が解釈できない場合
+    """
+    entries = []
+    in_event = False
+    start = end = None
+    summary = ""
+    for line in _unfold_ics_lines(text):
+        if not line.strip():
+            continue
+        key, _, value = line.partition(":")
+        name = key.split(";", 1)[0].upper()
+        if name == "BEGIN" and value.strip().upper() == "VEVENT":
+            in_event = True
+            start = end = None
+            summary = ""
+        elif name == "END" and value.strip().upper() == "VEVENT":
+            if start is None:
+                raise ValueError("DTSTARTのないVEVENTがあります")
+            day = start
+            last = end - timedelta(days=1) if end and end > start else start
+            while day <= last:
+                entries.append((day, summary))
+                day += timedelta(days=1)
+            in_event = False
+        elif in_event and name == "DTSTART":
+            start = _parse_date(value[:8])
+        elif in_event and name == "DTEND":
+            end = _parse_date(value[:8])
+        elif in_event and name == "SUMMARY":
+            summary = _unescape_ics_text(value.strip())
+    return entries
+
+
+def parse_holiday_file(filename: str, data: bytes) -> List[Tuple[date, str]]:
+    """
+    ファイル名の拡張子に応じて祝日データを解析
+
+    Args:
+        filename: ファイル名（.ics / .ical はiCalendar、それ以外はCSVとして扱う）
+        data: ファイルの内容
+
+    Returns:
+        (日付, 祝日名) のリスト
+
+    Raises:
+        ValueError: 内容が解釈できない場合
+    """
+    text = _decode(data)
+    if filename.lower().endswith((".ics", ".ical")) or text.lstrip().startswith("BEGIN:VCALENDAR"):
+        return parse_holiday_ics(text)
+    return parse_holiday_csv(text)
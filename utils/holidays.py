@@ -1,21 +1,74 @@
 """日本の祝日管理機能"""
 import json
 import os
-from datetime import datetime, timedelta
-from typing import List, Optional
+import time
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import date as date_type, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 import pytz
+from utils.jp_holidays import MAX_YEAR, generate_japanese_holidays
+from utils.log import get_logger
+
+logger = get_logger("holidays")
+
+DateLike = Union[datetime, date_type]
+
+
+class _YearIndex:
+    """1年分の祝日インデックス（序数日付のソート済みリストと祝日名）"""
+    
+    __slots__ = ("ordinals", "names")
+    
+    def __init__(self, holidays: Dict[str, str]):
+        """
+        Args:
+            holidays: 日付文字列をキー、祝日名を値とする辞書（日付として解釈できないキーは無視）
+        """
+        self.names: Dict[int, str] = {}
+        for date_str, name in holidays.items():
+            try:
+                ordinal = datetime.strptime(date_str, "%Y-%m-%d").toordinal()
+            except ValueError:
+                # 手編集などで壊れたキーがあっても、その年の他の祝日の判定は続ける
+                logger.warning(f"祝日データの日付 {date_str!r} を解釈できないため無視します", extra={"date": date_str})
+                continue
+            self.names[ordinal] = name
+        self.ordinals: List[int] = sorted(self.names)
 
 
 class HolidayManager:
-    """日本の祝日を管理するクラス"""
+    """
+    日本の祝日を管理するクラス
+    
+    規則から算出した国民の祝日（use_builtin=Trueの場合）の上に、holidays.jsonの
+    エントリを上書きとして重ねます。holidays.jsonで値をnullにした日付は祝日から除外されます。
+    """
     
-    def __init__(self, holidays_file: str = "data/holidays.json"):
+    def __init__(
+        self,
+        holidays_file: str = "data/holidays.json",
+        reload_interval: float = 1.0,
+        use_builtin: bool = True
+    ):
         """
         Args:
             holidays_file: 祝日データファイルのパス
+            reload_interval: ファイル更新チェックの最小間隔（秒）
+            use_builtin: 規則に基づく日本の祝日を使用するかどうか
         """
         self.holidays_file = holidays_file
         self.jst = pytz.timezone("Asia/Tokyo")
+        self.reload_interval = reload_interval
+        self.use_builtin = use_builtin
+        # holidays.jsonの上書きを反映した年ごとの祝日インデックス（遅延生成）
+        self._year_index: Dict[int, _YearIndex] = {}
+        self._mtime: Optional[float] = None
+        self._last_checked = 0.0
+        self._listeners: List[Callable[[], None]] = []
+        # batch()のネスト数と、バッチ中に未保存の変更があるかどうか
+        self._batch_depth = 0
+        self._batch_dirty = False
         self._ensure_file_exists()
         self._load_holidays()
     
@@ -26,8 +79,18 @@ class HolidayManager:
             with open(self.holidays_file, "w", encoding="utf-8") as f:
                 json.dump({}, f, ensure_ascii=False, indent=2)
     
+    def _get_mtime(self) -> Optional[float]:
+        """祝日ファイルの更新時刻を取得（存在しない場合はNone）"""
+        try:
+            return os.stat(self.holidays_file).st_mtime
+        except OSError:
+            return None
+    
     def _load_holidays(self):
         """祝日データを読み込む"""
+        self._mtime = self._get_mtime()
+        self._last_checked = time.monotonic()
+        self._year_index.clear()
         try:
             with open(self.holidays_file, "r", encoding="utf-8") as f:
                 self.holidays = json.load(f)
@@ -35,11 +98,158 @@ class HolidayManager:
             self.holidays = {}
     
     def _save_holidays(self):
-        """祝日データを保存"""
+        """祝日データを保存（バッチ中は終了時にまとめて保存）"""
+        if self._batch_depth > 0:
+            self._batch_dirty = True
+            self._year_index.clear()
+            return
         with open(self.holidays_file, "w", encoding="utf-8") as f:
             json.dump(self.holidays, f, ensure_ascii=False, indent=2)
+        # 自分自身の書き込みで再読み込みが走らないように更新時刻を記録
+        self._mtime = self._get_mtime()
+        self._year_index.clear()
+        self._notify_listeners()
+    
+    @contextmanager
+    def batch(self):
+        """
+        複数の変更をまとめて1回の書き込みで保存するコンテキストマネージャ
+        
+        ブロック内のadd_holiday / remove_holidayはメモリ上にのみ反映され、
+        ブロックを抜けたときに一度だけファイルへ保存・変更通知されます。
+        例外が発生した場合はブロック内の変更をすべて取り消します。
+        
+        使用例:
+            with holiday_manager.batch():
+                holiday_manager.add_holiday(date1, "休日1")
+                holiday_manager.add_holiday(date2, "休日2")
+        """
+        if self._batch_depth == 0:
+            # 外部で編集された内容を上書きしないよう、開始時に最新化
+            self.reload_if_changed(force=True)
+        snapshot = dict(self.holidays)
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.holidays = snapshot
+            self._year_index.clear()
+            if self._batch_depth == 1:
+                # 最も外側のバッチでは、取り消した変更を保存・変更通知しない
+                self._batch_dirty = False
+            raise
+        finally:
+            self._batch_depth -= 1
+        
+        if self._batch_depth == 0 and self._batch_dirty:
+            self._batch_dirty = False
+            self._save_holidays()
+    
+    def add_listener(self, callback: Callable[[], None]):
+        """
+        祝日データ変更時に呼び出されるコールバックを登録
+        
+        Args:
+            callback: 引数なしで呼び出される関数
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+    
+    def remove_listener(self, callback: Callable[[], None]):
+        """祝日データ変更時のコールバックを解除"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _notify_listeners(self):
+        """登録されたコールバックに変更を通知"""
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"変更通知でエラーが発生しました: {e}", exc_info=True)
+    
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """
+        祝日ファイルが更新されていれば再読み込みする
+        
+        ファイルの更新時刻（mtime）のみを確認するため、変更がない場合は
+        ファイルを開かずに済みます。チェックはreload_interval秒に1回までに抑えます。
+        
+        Args:
+            force: Trueの場合はチェック間隔を無視して確認する
+            
+        Returns:
+            再読み込みした場合True
+        """
+        now = time.monotonic()
+        if not force and now - self._last_checked < self.reload_interval:
+            return False
+        self._last_checked = now
+        
+        mtime = self._get_mtime()
+        if mtime == self._mtime:
+            return False
+        
+        self._load_holidays()
+        logger.info(f"{self.holidays_file} の変更を検知したため再読み込みしました")
+        self._notify_listeners()
+        return True
+    
+    def _build_year(self, year: int) -> Dict[str, str]:
+        """
+        上書きを反映した指定年の祝日を生成
+        
+        Args:
+            year: 年
+            
+        Returns:
+            日付文字列をキー、祝日名を値とする辞書
+        """
+        year_holidays = generate_japanese_holidays(year) if self.use_builtin else {}
+        prefix = f"{year}-"
+        for date_str, name in self.holidays.items():
+            if not date_str.startswith(prefix):
+                continue
+            if name is None:
+                # nullは算出された祝日を取り消す
+                year_holidays.pop(date_str, None)
+            else:
+                year_holidays[date_str] = name
+        return year_holidays
+    
+    def _index_for_year(self, year: int) -> _YearIndex:
+        """指定年の祝日インデックスを取得（メモ化）"""
+        index = self._year_index.get(year)
+        if index is None:
+            index = _YearIndex(self._build_year(year))
+            self._year_index[year] = index
+        return index
     
-    def is_holiday(self, date: datetime) -> bool:
+    def _last_year(self) -> int:
+        """祝日が存在しうる最後の年"""
+        override_years = [int(date_str[:4]) for date_str in self.holidays if date_str[:4].isdigit()]
+        last = max(override_years, default=0)
+        if self.use_builtin:
+            last = max(last, MAX_YEAR)
+        return last
+    
+    def warm(self, years: Iterable[int]):
+        """
+        指定年の祝日インデックスを事前に構築（起動時用）
+        
+        Args:
+            years: 構築する年
+        """
+        self.reload_if_changed(force=True)
+        for year in years:
+            self._index_for_year(year)
+    
+    def _lookup(self, ordinal: int) -> Optional[str]:
+        """序数日付の祝日名を取得（祝日でない場合はNone）"""
+        year = date_type.fromordinal(ordinal).year
+        return self._index_for_year(year).names.get(ordinal)
+    
+    def is_holiday(self, date: DateLike) -> bool:
         """
         指定された日付が祝日かどうかを判定
         
@@ -49,11 +259,10 @@ class HolidayManager:
         Returns:
             祝日の場合True
         """
-        date_str = date.strftime("%Y-%m-%d")
-        # holidays.jsonのキーで祝日をチェック
-        return date_str in self.holidays
+        self.reload_if_changed()
+        return date.toordinal() in self._index_for_year(date.year).names
     
-    def get_holiday_before_date(self, date: datetime) -> Optional[str]:
+    def get_holiday_before_date(self, date: DateLike) -> Optional[str]:
         """
         指定された日付の前日が祝前日かどうかを判定
         
@@ -63,14 +272,103 @@ class HolidayManager:
         Returns:
             祝日前日の場合は祝日の日付文字列、そうでない場合はNone
         """
-        tomorrow = date + timedelta(days=1)
-        tomorrow_str = tomorrow.strftime("%Y-%m-%d")
+        self.reload_if_changed()
+        tomorrow = date.toordinal() + 1
+        if self._lookup(tomorrow) is not None:
+            return date_type.fromordinal(tomorrow).strftime("%Y-%m-%d")
+        return None
+    
+    def get_next_holiday(self, date: DateLike, inclusive: bool = False) -> Optional[Tuple[date_type, str]]:
+        """
+        指定された日付より後の最初の祝日を取得
         
-        # holidays.jsonのキーで祝日をチェック
-        if tomorrow_str in self.holidays:
-            return tomorrow_str
+        Args:
+            date: 基準日
+            inclusive: Trueの場合は基準日自体も対象に含める
+            
+        Returns:
+            (祝日の日付, 祝日名)、見つからない場合はNone
+        """
+        self.reload_if_changed()
+        ordinal = date.toordinal()
+        last_year = self._last_year()
+        year = date.year
+        while year <= last_year:
+            index = self._index_for_year(year)
+            if inclusive:
+                pos = bisect_left(index.ordinals, ordinal)
+            else:
+                pos = bisect_right(index.ordinals, ordinal)
+            if pos < len(index.ordinals):
+                found = index.ordinals[pos]
+                return date_type.fromordinal(found), index.names[found]
+            year += 1
         return None
     
+    def get_holidays_in_range(self, start: DateLike, end: DateLike) -> List[Tuple[date_type, str]]:
+        """
+        期間内の祝日を取得
+        
+        Args:
+            start: 開始日（この日を含む）
+            end: 終了日（この日を含む）
+            
+        Returns:
+            (祝日の日付, 祝日名) のリスト（日付の昇順）
+        """
+        self.reload_if_changed()
+        start_ordinal = start.toordinal()
+        end_ordinal = end.toordinal()
+        result = []
+        for year in range(start.year, end.year + 1):
+            index = self._index_for_year(year)
+            lo = bisect_left(index.ordinals, start_ordinal)
+            hi = bisect_right(index.ordinals, end_ordinal)
+            for ordinal in index.ordinals[lo:hi]:
+                result.append((date_type.fromordinal(ordinal), index.names[ordinal]))
+        return result
+    
+    def get_holiday_blocks(
+        self,
+        start: DateLike,
+        end: DateLike,
+        include_weekends: bool = True
+    ) -> List[Tuple[date_type, date_type]]:
+        """
+        期間と重なる連休（祝日を1日以上含む連続した休み）を取得
+        
+        Args:
+            start: 開始日（この日を含む）
+            end: 終了日（この日を含む）
+            include_weekends: 土日も休みとして連休に含めるかどうか
+            
+        Returns:
+            (連休の初日, 連休の最終日) のリスト（日付の昇順）
+        """
+        def is_day_off(ordinal: int) -> bool:
+            # 序数日付 % 7 == 0 は日曜日、6 は土曜日
+            if include_weekends and ordinal % 7 in (0, 6):
+                return True
+            return self._lookup(ordinal) is not None
+        
+        blocks: List[Tuple[date_type, date_type]] = []
+        # 期間の端をまたぐ連休も拾えるよう、前後に余裕を持って検索
+        margin = timedelta(days=7)
+        for holiday, _ in self.get_holidays_in_range(start - margin, end + margin):
+            ordinal = holiday.toordinal()
+            if blocks and blocks[-1][1].toordinal() >= ordinal:
+                continue
+            first = ordinal
+            while is_day_off(first - 1):
+                first -= 1
+            last = ordinal
+            while is_day_off(last + 1):
+                last += 1
+            if last < start.toordinal() or first > end.toordinal():
+                continue
+            blocks.append((date_type.fromordinal(first), date_type.fromordinal(last)))
+        return blocks
+    
     def add_holiday(self, date: datetime, name: str = ""):
         """
         祝日を追加
@@ -79,6 +377,9 @@ class HolidayManager:
             date: 祝日の日付
             name: 祝日名
         """
+        # 外部で編集された内容を上書きしないよう、書き込み前に最新化
+        if self._batch_depth == 0:
+            self.reload_if_changed(force=True)
         date_str = date.strftime("%Y-%m-%d")
         self.holidays[date_str] = name
         self._save_holidays()
@@ -90,11 +391,42 @@ class HolidayManager:
         Args:
             date: 削除する祝日の日付
         """
+        if self._batch_depth == 0:
+            self.reload_if_changed(force=True)
         date_str = date.strftime("%Y-%m-%d")
-        if date_str in self.holidays:
+        if self.use_builtin and date_str in generate_japanese_holidays(date.year):
+            # 算出された祝日はnullで上書きして取り消す
+            if date_str not in self.holidays or self.holidays[date_str] is not None:
+                self.holidays[date_str] = None
+                self._save_holidays()
+        elif date_str in self.holidays:
             del self.holidays[date_str]
             self._save_holidays()
     
+    def import_holidays(self, entries: Iterable[Tuple[DateLike, str]]) -> int:
+        """
+        祝日をまとめて追加（ファイルへの書き込みは1回）
+        
+        Args:
+            entries: (日付, 祝日名) の反復可能オブジェクト
+            
+        Returns:
+            追加・更新した件数
+            
+        Raises:
+            ValueError: 日付または祝日名が不正なエントリがある場合（1件も登録しない）
+        """
+        entries = list(entries)
+        for date, name in entries:
+            if not isinstance(date, date_type) or not isinstance(name, str):
+                raise ValueError(f"祝日のエントリが不正です: {date!r}, {name!r}")
+        count = 0
+        with self.batch():
+            for date, name in entries:
+                self.add_holiday(date, name)
+                count += 1
+        return count
+    
     def get_holidays_for_year(self, year: int) -> dict:
         """
         指定された年の祝日を取得
@@ -105,9 +437,33 @@ class HolidayManager:
         Returns:
             日付文字列をキー、祝日名を値とする辞書
         """
-        year_holidays = {}
-        for date_str, name in self.holidays.items():
-            if date_str.startswith(f"{year}-"):
-                year_holidays[date_str] = name
-        return year_holidays
+        self.reload_if_changed()
+        index = self._index_for_year(year)
+        return {
+            date_type.fromordinal(ordinal).strftime("%Y-%m-%d"): index.names[ordinal]
+            for ordinal in index.ordinals
+        }
 
+
+# プロセス全体で共有するHolidayManager
+_shared_holiday_manager: Optional[HolidayManager] = None
+
+
+def get_holiday_manager(holidays_file: str = "data/holidays.json", use_builtin: bool = True) -> HolidayManager:
+    """
+    プロセス共通のHolidayManagerを取得
+    
+    ボット本体・スケジューラー・run-once処理で同じインスタンスを共有し、
+    どこから編集しても同じ祝日データが参照されるようにします。
+    
+    Args:
+        holidays_file: 祝日データファイルのパス（初回呼び出し時のみ使用）
+        use_builtin: 規則に基づく日本の祝日を使用するかどうか（初回呼び出し時のみ使用）
+        
+    Returns:
+        共有のHolidayManager
+    """
+    global _shared_holiday_manager
+    if _shared_holiday_manager is None:
+        _shared_holiday_manager = HolidayManager(holidays_file, use_builtin=use_builtin)
+    return _shared_holiday_manager
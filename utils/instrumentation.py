@@ -0,0 +1,201 @@
+"""処理時間・I/O量・キューの長さの計測機能"""
+import functools
+import inspect
+import threading
+from collections import deque
+from time import perf_counter
+from typing import Callable, Deque, Dict, Optional
+
+from utils.metrics import MetricsRegistry, get_registry
+from utils.log import get_logger
+
+logger = get_logger("metrics")
+
+# 処理時間のヒストグラムのバケット（秒、ファイル保存の数百µsから送信ジョブの数秒までを想定）
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Timer:
+    """timedが返す計測器（デコレーターとしてもコンテキストマネージャーとしても使える）"""
+
+    __slots__ = ("instrumentation", "operation", "_started")
+
+    def __init__(self, instrumentation: "Instrumentation", operation: str):
+        self.instrumentation = instrumentation
+        self.operation = operation
+        self._started = 0.0
+
+    def __enter__(self):
+        self._started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.instrumentation.observe(self.operation, perf_counter() - self._started, error=exc_type is not None)
+        return False
+
+    def __call__(self, func: Callable) -> Callable:
+        instrumentation = self.instrumentation
+        operation = self.operation
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException:
+                    instrumentation.observe(operation, perf_counter() - started, error=True)
+                    raise
+                instrumentation.observe(operation, perf_counter() - started)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                instrumentation.observe(operation, perf_counter() - started, error=True)
+                raise
+            instrumentation.observe(operation, perf_counter() - started)
+            return result
+        return wrapper
+
+
+class Instrumentation:
+    """
+    処理ごとの所要時間・エラー数、I/Oのバイト数、キューの長さを記録するクラス
+
+    値はメモリ上のメトリクス（/metricsで出力）と、直近の所要時間の履歴（/bot_statsの
+    パーセンタイル表示用）に記録します。1回の記録はロック付きの加算数回で済みます。
+    """
+
+    def __init__(self, registry: MetricsRegistry, history_size: int = 200):
+        """
+        Args:
+            registry: 記録先のメトリクス
+            history_size: 処理ごとに保持する直近の所要時間の件数
+        """
+        self.history_size = history_size
+        self._durations = registry.histogram(
+            "bot_operation_duration_seconds", "処理ごとの所要時間", ["operation"], buckets=DURATION_BUCKETS
+        )
+        self._errors = registry.counter("bot_operation_errors_total", "処理ごとの例外の発生回数", ["operation"])
+        self._bytes = registry.counter("bot_io_bytes_total", "ファイルの読み書きのバイト数", ["operation", "direction"])
+        queue_depth = registry.gauge("bot_queue_depth", "キューごとの待ち件数", ["queue"])
+        queue_depth.set_function(self.queue_depths)
+        self._history: Dict[str, Deque[float]] = {}
+        self._queues: Dict[str, Callable[[], int]] = {}
+        self._lock = threading.Lock()
+
+    def timed(self, operation: str) -> _Timer:
+        """
+        処理時間を計測するデコレーター・コンテキストマネージャーを作成
+
+        Args:
+            operation: 処理名（"data.save_response"など）
+
+        Examples:
+            @instrumentation.timed("data.get_summary")
+            def get_summary(...): ...
+
+            with instrumentation.timed("data.load"):
+                ...
+        """
+        return _Timer(self, operation)
+
+    def observe(self, operation: str, seconds: float, error: bool = False):
+        """
+        所要時間を記録
+
+        Args:
+            operation: 処理名
+            seconds: 所要時間（秒）
+            error: 例外で終了した場合True
+        """
+        self._durations.observe(seconds, operation=operation)
+        if error:
+            self._errors.inc(operation=operation)
+        history = self._history.get(operation)
+        if history is None:
+            with self._lock:
+                history = self._history.setdefault(operation, deque(maxlen=self.history_size))
+        history.append(seconds)
+
+    def add_bytes(self, operation: str, direction: str, amount: int):
+        """
+        読み書きしたバイト数を記録
+
+        Args:
+            operation: 処理名
+            direction: "read" または "write"
+            amount: バイト数
+        """
+        self._bytes.inc(amount, operation=operation, direction=direction)
+
+    def add_queue(self, name: str, depth: Callable[[], int]):
+        """
+        キューの長さを取得する関数を登録（/metricsの出力時に呼び出す）
+
+        Args:
+            name: キュー名
+            depth: 待ち件数を返す関数
+        """
+        self._queues[name] = depth
+
+    def queue_depths(self) -> Dict[str, int]:
+        """登録されたキューごとの待ち件数"""
+        depths = {}
+        for name, depth in list(self._queues.items()):
+            try:
+                depths[name] = int(depth())
+            except Exception as e:
+                logger.warning(f"キュー {name} の長さの取得に失敗しました: {e}")
+        return depths
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        処理ごとの統計を取得
+
+        Returns:
+            処理名: {count, errors, avg_ms, p50_ms, p95_ms, max_ms}（件数以外は直近の履歴から算出）
+        """
+        result = {}
+        for operation, history in sorted(self._history.items()):
+            samples = sorted(history)
+            if not samples:
+                continue
+            result[operation] = {
+                "count": self._durations.count(operation=operation),
+                "errors": int(self._errors.value(operation=operation)),
+                "avg_ms": round(sum(samples) / len(samples) * 1000, 2),
+                "p50_ms": round(samples[len(samples) // 2] * 1000, 2),
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2),
+            }
+        return result
+
+    def io_stats(self) -> Dict[str, Dict[str, int]]:
+        """処理ごとの読み書きのバイト数"""
+        result: Dict[str, Dict[str, int]] = {}
+        for _, _, (operation, direction), value in self._bytes.samples():
+            result.setdefault(operation, {})[direction] = int(value)
+        return result
+
+
+# プロセス全体で共有する計測器
+_instrumentation: Optional[Instrumentation] = None
+
+
+def get_instrumentation() -> Instrumentation:
+    """プロセス共通のInstrumentationを取得（記録先はプロセス共通のMetricsRegistry）"""
+    global _instrumentation
+    if _instrumentation is None:
+        _instrumentation = Instrumentation(get_registry())
+    return _instrumentation
+
+
+def timed(operation: str) -> _Timer:
+    """プロセス共通のInstrumentationで処理時間を計測（Instrumentation.timedを参照）"""
+    return get_instrumentation().timed(operation)
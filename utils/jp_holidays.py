@@ -0,0 +1,181 @@
+"""日本の国民の祝日を規則から算出する機能"""
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, Optional
+
+# 春分・秋分の近似式が有効な範囲
+MIN_YEAR = 1980
+MAX_YEAR = 2099
+
+SUBSTITUTE_HOLIDAY_NAME = "振替休日"
+CITIZENS_HOLIDAY_NAME = "国民の休日"
+
+
+def _nth_monday(year: int, month: int, n: int) -> date:
+    """指定した月の第n月曜日を取得"""
+    first = date(year, month, 1)
+    offset = (7 - first.weekday()) % 7  # 最初の月曜日までの日数
+    return first + timedelta(days=offset + 7 * (n - 1))
+
+
+def _vernal_equinox_day(year: int) -> int:
+    """春分日（3月の日）を近似式で算出（1980〜2099年）"""
+    return int(20.8431 + 0.242194 * (year - 1980) - (year - 1980) // 4)
+
+
+def _autumnal_equinox_day(year: int) -> int:
+    """秋分日（9月の日）を近似式で算出（1980〜2099年）"""
+    return int(23.2488 + 0.242194 * (year - 1980) - (year - 1980) // 4)
+
+
+def _base_holidays(year: int) -> Dict[date, str]:
+    """
+    「国民の祝日に関する法律」で定められた祝日（振替休日・国民の休日を除く）を算出
+
+    Args:
+        year: 年
+
+    Returns:
+        日付をキー、祝日名を値とする辞書
+    """
+    holidays: Dict[date, str] = {}
+
+    def add(d: Optional[date], name: str):
+        if d is not None:
+            holidays[d] = name
+
+    add(date(year, 1, 1), "元日")
+
+    # 成人の日: 2000年から1月第2月曜日（ハッピーマンデー）
+    add(_nth_monday(year, 1, 2) if year >= 2000 else date(year, 1, 15), "成人の日")
+
+    add(date(year, 2, 11), "建国記念の日")
+
+    # 天皇誕生日
+    if year >= 2020:
+        add(date(year, 2, 23), "天皇誕生日")
+    elif 1989 <= year <= 2018:
+        add(date(year, 12, 23), "天皇誕生日")
+    elif year <= 1988:
+        add(date(year, 4, 29), "天皇誕生日")
+
+    add(date(year, 3, _vernal_equinox_day(year)), "春分の日")
+
+    if year >= 2007:
+        add(date(year, 4, 29), "昭和の日")
+    elif 1989 <= year <= 2006:
+        add(date(year, 4, 29), "みどりの日")
+
+    add(date(year, 5, 3), "憲法記念日")
+    if year >= 2007:
+        add(date(year, 5, 4), "みどりの日")
+    add(date(year, 5, 5), "こどもの日")
+
+    # 海の日: 1996年から7月20日、2003年から7月第3月曜日（東京五輪の特例あり）
+    if year == 2020:
+        add(date(2020, 7, 23), "海の日")
+    elif year == 2021:
+        add(date(2021, 7, 22), "海の日")
+    elif year >= 2003:
+        add(_nth_monday(year, 7, 3), "海の日")
+    elif year >= 1996:
+        add(date(year, 7, 20), "海の日")
+
+    # 山の日: 2016年から（東京五輪の特例あり）
+    if year == 2020:
+        add(date(2020, 8, 10), "山の日")
+    elif year == 2021:
+        add(date(2021, 8, 8), "山の日")
+    elif year >= 2016:
+        add(date(year, 8, 11), "山の日")
+
+    # 敬老の日: 2003年から9月第3月曜日
+    add(_nth_monday(year, 9, 3) if year >= 2003 else date(year, 9, 15), "敬老の日")
+
+    add(date(year, 9, _autumnal_equinox_day(year)), "秋分の日")
+
+    # 体育の日 / スポーツの日: 2000年から10月第2月曜日（東京五輪の特例あり）
+    if year == 2020:
+        add(date(2020, 7, 24), "スポーツの日")
+    elif year == 2021:
+        add(date(2021, 7, 23), "スポーツの日")
+    elif year >= 2022:
+        add(_nth_monday(year, 10, 2), "スポーツの日")
+    elif year >= 2000:
+        add(_nth_monday(year, 10, 2), "体育の日")
+    else:
+        add(date(year, 10, 10), "体育の日")
+
+    add(date(year, 11, 3), "文化の日")
+    add(date(year, 11, 23), "勤労感謝の日")
+
+    # 皇室の慶弔行事に伴う特例
+    if year == 1989:
+        add(date(1989, 2, 24), "昭和天皇の大喪の礼")
+    elif year == 1990:
+        add(date(1990, 11, 12), "即位礼正殿の儀")
+    elif year == 1993:
+        add(date(1993, 6, 9), "皇太子徳仁親王の結婚の儀")
+    elif year == 2019:
+        add(date(2019, 5, 1), "天皇の即位の日")
+        add(date(2019, 10, 22), "即位礼正殿の儀")
+
+    return holidays
+
+
+@lru_cache(maxsize=64)
+def _generate(year: int) -> tuple:
+    """祝日を算出してタプルで返す（メモ化用）"""
+    if year < MIN_YEAR or year > MAX_YEAR:
+        return ()
+
+    base = _base_holidays(year)
+    holidays = dict(base)
+
+    # 国民の休日: 前日と翌日が国民の祝日である平日（1986年以降）
+    if year >= 1986:
+        for d in sorted(base):
+            candidate = d + timedelta(days=1)
+            if (candidate not in holidays
+                    and candidate + timedelta(days=1) in base
+                    and candidate.year == year):
+                # 2006年以前は日曜日と振替休日を除く
+                if year <= 2006 and candidate.weekday() == 6:
+                    continue
+                holidays[candidate] = CITIZENS_HOLIDAY_NAME
+
+    # 振替休日: 祝日が日曜日の場合
+    for d in sorted(base):
+        if d.weekday() != 6:
+            continue
+        substitute = d + timedelta(days=1)
+        if year >= 2007:
+            # 2007年以降は祝日でない最初の日
+            while substitute in holidays:
+                substitute += timedelta(days=1)
+        elif substitute in holidays:
+            continue
+        holidays[substitute] = SUBSTITUTE_HOLIDAY_NAME
+
+    return tuple(sorted(
+        (d.strftime("%Y-%m-%d"), name)
+        for d, name in holidays.items()
+        if d.year == year
+    ))
+
+
+def generate_japanese_holidays(year: int) -> Dict[str, str]:
+    """
+    指定された年の日本の祝日を規則に基づいて算出
+
+    固定日の祝日、ハッピーマンデー、春分・秋分の日、振替休日、
+    国民の休日（前後を祝日に挟まれた日）を含みます。
+    ネットワークやファイルには一切アクセスせず、年ごとに結果をメモ化します。
+
+    Args:
+        year: 年（MIN_YEAR〜MAX_YEARの範囲外では空の辞書を返す）
+
+    Returns:
+        日付文字列（YYYY-MM-DD）をキー、祝日名を値とする辞書
+    """
+    return dict(_generate(year))
@@ -0,0 +1,215 @@
+"""リースによるリーダー選出機能"""
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from typing import Callable, List, Optional
+
+from utils.log import get_logger
+
+logger = get_logger("leader")
+
+
+class LeaderLease:
+    """
+    SQLiteの1行をリースとして使い、複数のレプリカから1つだけをリーダーに選ぶクラス
+
+    リーダーはTTLより短い間隔でrenewを呼び出してリースを延長（ハートビート）し続けます。
+    リーダーが停止して延長が途絶えると、TTL経過後に他のレプリカがリースを取得します。
+    全レプリカから同じデータベースファイルを参照できる必要があります（共有ボリュームなど）。
+    有効期限はホストの時計で判定するため、レプリカ間の時計のずれはTTLより十分小さくしてください。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = 30.0,
+        holder_id: Optional[str] = None,
+        name: str = "scheduler",
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            path: リースを保存するSQLiteデータベースファイルのパス
+            ttl: リースの有効期間（秒）
+            holder_id: このレプリカの識別子（Noneの場合はホスト名・PIDから生成）
+            name: リースの名前（役割ごとに別のリースを持てる）
+            clock: 現在時刻（UNIX時間）を返す関数
+        """
+        self.path = path
+        self.ttl = ttl
+        self.holder_id = holder_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.name = name
+        self.clock = clock
+        # 最後にリースを確保・延長できたときの有効期限（この時刻までは自分がリーダー）
+        self._expires_at = 0.0
+        self._listeners: List[Callable[[bool], None]] = []
+        self._was_leader = False
+        # リーダーになった回数と、延長に失敗した回数
+        self.acquisitions = 0
+        self.failures = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """データベースに接続（呼び出しごとに接続し、別スレッドからも使えるようにする）"""
+        return sqlite3.connect(self.path, timeout=self.ttl / 3, isolation_level=None)
+
+    def add_listener(self, listener: Callable[[bool], None]):
+        """
+        リーダーになった・リーダーでなくなったときに呼び出す関数を登録
+
+        Args:
+            listener: リーダーかどうかを受け取る関数
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[bool], None]):
+        """登録した関数を解除"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify_listeners(self, is_leader: bool):
+        for listener in list(self._listeners):
+            try:
+                listener(is_leader)
+            except Exception as e:
+                logger.error(f"リスナーの呼び出しに失敗しました: {e}", exc_info=True)
+
+    def renew(self) -> bool:
+        """
+        リースの取得または延長を試みる（ハートビート）
+
+        リースが空いているか期限切れ、または自分が保持している場合に、
+        有効期限を現在時刻+TTLに更新します。
+
+        Returns:
+            リーダーの場合True
+        """
+        now = self.clock()
+        expires_at = now + self.ttl
+        try:
+            with closing(self._connect()) as conn:
+                # 読み取りから書き込みまでを他のレプリカと排他する
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = conn.execute(
+                        "SELECT holder, expires_at FROM leases WHERE name = ?", (self.name,)
+                    ).fetchone()
+                    acquired = row is None or row[0] == self.holder_id or row[1] <= now
+                    if acquired:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                            (self.name, self.holder_id, expires_at)
+                        )
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            # 延長できなくても、確保済みの有効期限まではリーダーのまま（期限後は他が取得しうる）
+            self.failures += 1
+            logger.warning(f"リースの更新に失敗しました: {e}", extra={"holder_id": self.holder_id})
+            return self._update_state()
+        if acquired:
+            self._expires_at = expires_at
+            if not self._was_leader:
+                self.acquisitions += 1
+                previous = row[0] if row is not None and row[0] != self.holder_id else None
+                logger.info(
+                    f"リーダーになりました（{self.holder_id}" + (f"、前のリーダー: {previous}" if previous else "") + "）",
+                    extra={"holder_id": self.holder_id, "previous_holder": previous}
+                )
+        elif self._was_leader:
+            logger.warning(f"リースを {row[0]} に取得されました", extra={"holder_id": self.holder_id})
+            self._expires_at = 0.0
+        return self._update_state()
+
+    def _update_state(self) -> bool:
+        """リーダーかどうかを判定し、変化していればリスナーに通知"""
+        is_leader = self.is_leader
+        if is_leader != self._was_leader:
+            self._was_leader = is_leader
+            if not is_leader:
+                logger.warning("リーダーではなくなりました", extra={"holder_id": self.holder_id})
+            self._notify_listeners(is_leader)
+        return is_leader
+
+    @property
+    def is_leader(self) -> bool:
+        """最後に確保・延長したリースが有効期限内かどうか"""
+        return self.clock() < self._expires_at
+
+    def release(self):
+        """保持しているリースを手放す（停止時に呼び出すと、他のレプリカがTTLを待たずに引き継げる）"""
+        try:
+            with closing(self._connect()) as conn:
+                conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder_id))
+        except sqlite3.Error as e:
+            logger.warning(f"リースの解放に失敗しました: {e}")
+        self._expires_at = 0.0
+        self._update_state()
+
+    def verify_shared_directory(self, directory: str) -> bool:
+        """
+        データディレクトリが全レプリカで共有されているかを確認（起動時用）
+
+        directoryに識別用のファイル（.replica_volume）がなければ作成し、その内容をリースの
+        データベースに記録された値と比べます。レプリカごとに別のディレクトリを使っていると、
+        2つ目以降のレプリカは自分で作成した別の値を持つため一致しません（回答や送信記録が
+        レプリカごとに分かれ、引き継いだリーダーが送信済みかどうかを判断できなくなる状態）。
+
+        Args:
+            directory: 回答・送信記録・スケジューラーの状態を保存するディレクトリ
+
+        Returns:
+            共有されている（または最初に起動したレプリカの）場合True
+        """
+        marker_path = os.path.join(directory, ".replica_volume")
+        os.makedirs(directory or ".", exist_ok=True)
+        try:
+            with open(marker_path, "x", encoding="utf-8") as f:
+                f.write(uuid.uuid4().hex)
+        except FileExistsError:
+            pass
+        with open(marker_path, "r", encoding="utf-8") as f:
+            marker = f.read().strip()
+        with closing(self._connect()) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS volumes (name TEXT PRIMARY KEY, marker TEXT NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO volumes (name, marker) VALUES (?, ?)", (self.name, marker))
+            expected = conn.execute("SELECT marker FROM volumes WHERE name = ?", (self.name,)).fetchone()[0]
+        if marker != expected:
+            logger.error(
+                f"{directory} は他のレプリカと共有されていません（{marker_path} が {expected} ではなく {marker}）",
+                extra={"directory": directory, "marker": marker, "expected_marker": expected}
+            )
+            return False
+        return True
+
+    def current_holder(self) -> Optional[str]:
+        """現在有効なリースの保持者（いない場合はNone）"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT holder, expires_at FROM leases WHERE name = ?", (self.name,)
+            ).fetchone()
+        if row is None or row[1] <= self.clock():
+            return None
+        return row[0]
+
+    def stats(self) -> dict:
+        """リースの状態を取得"""
+        return {
+            "holder_id": self.holder_id,
+            "is_leader": self.is_leader,
+            "expires_in": round(max(0.0, self._expires_at - self.clock()), 1),
+            "acquisitions": self.acquisitions,
+            "failures": self.failures,
+        }
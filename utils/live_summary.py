@@ -0,0 +1,79 @@
+"""集計メッセージのリアルタイム更新機能"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Set
+
+from utils.log import get_logger
+
+logger = get_logger("live_summary")
+
+
+class LiveSummaryUpdater:
+    """
+    回答のたびに集計メッセージを更新するクラス
+
+    更新要求は日付ごとにまとめ、1つの日付につき最短 interval 秒に1回だけ
+    update を呼び出します。回答が集中してもメッセージの編集回数が増えないため、
+    DiscordのAPIレート制限に引っかかりません。
+    """
+
+    def __init__(self, update: Callable[[str], Awaitable[None]], interval: float = 5.0):
+        """
+        Args:
+            update: 日付（YYYY-MM-DD形式）を受け取り、集計メッセージを編集するコルーチン関数
+            interval: 同じ日付の集計メッセージを編集する最短間隔（秒）
+        """
+        self.update = update
+        self.interval = interval
+        self._last_update: Dict[str, float] = {}
+        self._dirty: Set[str] = set()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # 更新要求の回数と実際に編集した回数（まとめられた割合の確認用）
+        self.requests = 0
+        self.updates = 0
+
+    def mark_dirty(self, date_str: str):
+        """
+        集計メッセージの更新を要求
+
+        Args:
+            date_str: 更新する日付（YYYY-MM-DD形式）
+        """
+        self.requests += 1
+        self._dirty.add(date_str)
+        task = self._tasks.get(date_str)
+        if task is None or task.done():
+            self._tasks[date_str] = asyncio.create_task(self._run(date_str))
+
+    async def _run(self, date_str: str):
+        """更新要求がなくなるまで、間隔を空けて集計メッセージを編集"""
+        try:
+            while date_str in self._dirty:
+                wait = self._last_update.get(date_str, float("-inf")) + self.interval - time.monotonic()
+                if wait > 0:
+                    # 待っている間の更新要求はこの1回の編集にまとめる
+                    await asyncio.sleep(wait)
+                self._dirty.discard(date_str)
+                self._last_update[date_str] = time.monotonic()
+                try:
+                    await self.update(date_str)
+                    self.updates += 1
+                except Exception as e:
+                    logger.warning(f"{date_str} の集計メッセージの更新に失敗しました: {e}", extra={"date": date_str})
+        finally:
+            if self._tasks.get(date_str) is asyncio.current_task():
+                del self._tasks[date_str]
+            # 最終編集時刻は間隔を空けるためだけに使うので、経過済みの古い日付は破棄
+            expired = time.monotonic() - self.interval
+            for stale in [d for d, t in self._last_update.items() if t < expired and d not in self._tasks]:
+                del self._last_update[stale]
+
+    @property
+    def pending_count(self) -> int:
+        """更新待ち・更新中の日付の数"""
+        return len(self._tasks)
+
+    async def flush(self):
+        """保留中の更新がすべて完了するまで待つ"""
+        while self._tasks:
+            await asyncio.wait(list(self._tasks.values()))
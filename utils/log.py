@@ -0,0 +1,163 @@
+"""構造化ログ（JSON）の出力設定
+
+ログはキュー経由でバックグラウンドスレッドから標準出力に書き込むため、
+イベントループ上でのログ出力が標準出力への書き込みを待つことはありません。
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+# すべてのロガーの親（サブシステムごとに "bot.scheduler" などの子ロガーを使う）
+ROOT_LOGGER_NAME = "bot"
+
+# LogRecordの標準属性（これ以外の属性はextraで渡された構造化フィールドとして出力する）
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+# Cloud Loggingが解釈する重要度
+_SEVERITIES = {
+    logging.DEBUG: "DEBUG",
+    logging.INFO: "INFO",
+    logging.WARNING: "WARNING",
+    logging.ERROR: "ERROR",
+    logging.CRITICAL: "CRITICAL",
+}
+
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def get_logger(subsystem: str) -> logging.Logger:
+    """
+    サブシステムのロガーを取得
+
+    Args:
+        subsystem: サブシステム名（"scheduler", "data", "commands"など）
+
+    Returns:
+        "bot.<subsystem>" という名前のロガー
+    """
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{subsystem}")
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, object]:
+    """extraで渡された構造化フィールドを取り出す"""
+    return {key: value for key, value in vars(record).items() if key not in _RESERVED_ATTRS and not key.startswith("_")}
+
+
+class JsonFormatter(logging.Formatter):
+    """1行1レコードのJSONに整形（Cloud Loggingのseverity / message / timeに対応）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "severity": _SEVERITIES.get(record.levelno, record.levelname),
+            "message": record.getMessage(),
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "logger": record.name,
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            # Cloud Error Reportingはmessage内のスタックトレースを検出する
+            entry["message"] += "\n" + self.formatException(record.exc_info)
+        elif record.stack_info:
+            entry["message"] += "\n" + self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """ローカル実行向けの読みやすい1行表示（構造化フィールドは末尾にkey=value形式で付ける）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        subsystem = record.name[len(ROOT_LOGGER_NAME) + 1:] if record.name.startswith(ROOT_LOGGER_NAME + ".") else record.name
+        line = f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:<7} [{subsystem}] {record.getMessage()}"
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        elif record.stack_info:
+            line += "\n" + self.formatStack(record.stack_info)
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """
+    同じメッセージのログをevery件に1件だけ通すフィルター（定期チェックなどの頻繁なログ用）
+
+    WARNING以上のログは常に通します。通したログにはsampled_every（何件に1件か）を付けます。
+    """
+
+    def __init__(self, every: int):
+        """
+        Args:
+            every: 何件に1件を出力するか
+        """
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.every == 1:
+            return True
+        key = (record.msg if isinstance(record.msg, str) else repr(record.msg), record.levelno)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        if count % self.every:
+            return False
+        record.sampled_every = self.every
+        return True
+
+
+def setup_logging(level: Optional[str] = None, log_format: Optional[str] = None) -> QueueListener:
+    """
+    ログ出力を設定（2回目以降の呼び出しは何もしない）
+
+    "bot" 配下のロガーのレコードをキューに入れ、バックグラウンドスレッドのQueueListenerが
+    整形して標準出力に書き込みます。終了時にはキューに残ったログを書き出してから停止します。
+
+    Args:
+        level: ログレベル（Noneの場合は環境変数LOG_LEVEL、未設定ならINFO）
+        log_format: "json" または "text"（Noneの場合は環境変数LOG_FORMAT、未設定ならjson）
+
+    Returns:
+        バックグラウンドで書き込みを行うQueueListener
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        level = (level or os.environ.get("LOG_LEVEL") or "INFO").upper()
+        log_format = (log_format or os.environ.get("LOG_FORMAT") or "json").lower()
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(TextFormatter() if log_format == "text" else JsonFormatter())
+
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        root.setLevel(level)
+        root.addHandler(QueueHandler(log_queue))
+        # ルートロガー（discord.pyなど）に二重出力しない
+        root.propagate = False
+
+        # discord.pyのログも同じ形式で出力（WARNING以上）
+        discord_logger = logging.getLogger("discord")
+        discord_logger.setLevel(logging.WARNING)
+        discord_logger.addHandler(QueueHandler(log_queue))
+        discord_logger.propagate = False
+
+        # 定期チェックのログはサンプリングする（LOG_TICK_SAMPLE件に1件）
+        get_logger("scheduler.tick").addFilter(SamplingFilter(int(os.environ.get("LOG_TICK_SAMPLE", "60"))))
+
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _listener
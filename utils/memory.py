@@ -0,0 +1,132 @@
+"""メモリ使用量の計測機能"""
+import os
+import sys
+from typing import Optional
+
+from utils.log import get_logger
+
+logger = get_logger("memory")
+
+# cgroupのメモリ上限（Cloud Runなどのコンテナ内で参照できる）
+_CGROUP_LIMIT_FILES = (
+    "/sys/fs/cgroup/memory.max",                    # cgroup v2
+    "/sys/fs/cgroup/memory/memory.limit_in_bytes",  # cgroup v1
+)
+# これより大きい値は「上限なし」とみなす
+_UNLIMITED_THRESHOLD = 1 << 60
+
+
+def get_rss_bytes() -> Optional[int]:
+    """
+    現在のプロセスの常駐メモリ（RSS）を取得
+
+    Linuxでは /proc/self/status のVmRSSを読み、それ以外では
+    getrusageの最大RSSで代用します。
+
+    Returns:
+        RSS（バイト）、取得できない場合はNone
+    """
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOSはバイト、Linuxはキロバイト単位
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def get_memory_limit_bytes() -> Optional[int]:
+    """
+    メモリ上限を取得
+
+    環境変数MEMORY_LIMIT_MBがあればその値、なければcgroupの上限を使います。
+
+    Returns:
+        上限（バイト）、不明な場合はNone
+    """
+    limit_mb = os.environ.get("MEMORY_LIMIT_MB")
+    if limit_mb:
+        try:
+            return int(float(limit_mb) * 1024 * 1024)
+        except ValueError:
+            pass
+    for path in _CGROUP_LIMIT_FILES:
+        try:
+            with open(path, "r", encoding="ascii") as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < _UNLIMITED_THRESHOLD:
+            return int(value)
+    return None
+
+
+def format_bytes(value: Optional[int]) -> str:
+    """バイト数をMiB表記に変換"""
+    if value is None:
+        return "不明"
+    return f"{value / (1024 * 1024):.1f}MiB"
+
+
+class MemoryReporter:
+    """RSSを記録し、上限に対する余裕をログに出力するクラス"""
+
+    def __init__(self, limit_bytes: Optional[int] = None):
+        """
+        Args:
+            limit_bytes: メモリ上限（Noneの場合はget_memory_limit_bytesで取得）
+        """
+        self.limit_bytes = limit_bytes if limit_bytes is not None else get_memory_limit_bytes()
+        self.peak_bytes: Optional[int] = None
+        self.last_bytes: Optional[int] = None
+
+    def sample(self) -> Optional[int]:
+        """現在のRSSを計測して記録"""
+        rss = get_rss_bytes()
+        if rss is not None:
+            self.last_bytes = rss
+            self.peak_bytes = max(self.peak_bytes or 0, rss)
+        return rss
+
+    def headroom_bytes(self) -> Optional[int]:
+        """最後に計測したRSSから上限までの余裕"""
+        if self.limit_bytes is None or self.last_bytes is None:
+            return None
+        return self.limit_bytes - self.last_bytes
+
+    def report(self, label: str = "定期計測", **details) -> str:
+        """
+        RSSを計測してログに出力
+
+        Args:
+            label: ログに表示する計測のタイミング
+            **details: 一緒に表示する値（ギルド数など）
+
+        Returns:
+            出力した文字列
+        """
+        rss = self.sample()
+        parts = [f"RSS {format_bytes(rss)}", f"ピーク {format_bytes(self.peak_bytes)}"]
+        if self.limit_bytes is not None:
+            parts.append(f"上限 {format_bytes(self.limit_bytes)}")
+            parts.append(f"余裕 {format_bytes(self.headroom_bytes())}")
+        parts.extend(f"{key}={value}" for key, value in details.items())
+        line = f"{label}: " + "、".join(parts)
+        logger.info(line, extra={"rss_bytes": rss, "peak_rss_bytes": self.peak_bytes, "limit_bytes": self.limit_bytes})
+        return line
+
+    def stats(self) -> dict:
+        """メモリの統計を取得"""
+        return {
+            "rss_bytes": self.last_bytes,
+            "peak_rss_bytes": self.peak_bytes,
+            "limit_bytes": self.limit_bytes,
+            "headroom_bytes": self.headroom_bytes(),
+        }
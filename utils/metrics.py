@@ -0,0 +1,270 @@
+"""Prometheus形式のメトリクス収集機能"""
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.log import get_logger
+
+logger = get_logger("metrics")
+
+# ヒストグラムのデフォルトのバケット（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    """数値をPrometheusのテキスト形式に変換"""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    """ラベル値をエスケープ"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """ラベルを {name="value",...} 形式に変換"""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    """メトリクスの共通部分（ラベルの組み合わせごとに値を持つ）"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} のラベルは {list(self.labelnames)} です（指定: {sorted(labels)}）")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """(サンプル名, ラベル名, ラベル値, 値) を列挙"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """テキスト形式の行を作成"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for sample_name, names, values, value in self.samples():
+            lines.append(f"{sample_name}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """増加のみする値（送信数・エラー数など）"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        """
+        値を増やす
+
+        Args:
+            amount: 増やす量（0以上）
+            **labels: ラベルの値
+        """
+        if amount < 0:
+            raise ValueError("Counterは減らせません")
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        """現在の値を取得"""
+        return self._values.get(self._label_values(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            yield self.name, self.labelnames, values, value
+
+
+class Gauge(_Metric):
+    """増減する値（キューの長さ・メモリ使用量など）"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], object]] = None
+
+    def set(self, value: float, **labels):
+        """値を設定"""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        """値を増やす（負の値で減らす）"""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        """値を減らす"""
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], object]):
+        """
+        出力時に値を取得する関数を設定
+
+        Args:
+            function: 値を返す関数（ラベルがある場合は {ラベル値のタプル: 値} の辞書を返す）
+        """
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            try:
+                result = self._function()
+            except Exception as e:
+                logger.warning(f"{self.name} の値の取得に失敗しました: {e}")
+                return
+            if result is None:
+                return
+            if not self.labelnames:
+                yield self.name, (), (), float(result)
+                return
+            items = sorted(
+                (tuple(str(v) for v in (key if isinstance(key, tuple) else (key,))), value)
+                for key, value in result.items()
+            )
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        for values, value in items:
+            if value is not None:
+                yield self.name, self.labelnames, values, float(value)
+
+
+class Histogram(_Metric):
+    """値の分布（処理時間など）"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # ラベル値: (バケットごとの件数, 合計, 件数)
+        self._values: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels):
+        """
+        値を記録
+
+        Args:
+            value: 記録する値（秒など）
+            **labels: ラベルの値
+        """
+        key = self._label_values(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        """記録した件数を取得"""
+        state = self._values.get(self._label_values(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        names = self.labelnames + ("le",)
+        for values, (bucket_counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                yield f"{self.name}_bucket", names, values + (_format_value(bound),), bucket_count
+            yield f"{self.name}_bucket", names, values + ("+Inf",), count
+            yield f"{self.name}_sum", self.labelnames, values, total
+            yield f"{self.name}_count", self.labelnames, values, count
+
+
+class MetricsRegistry:
+    """メトリクスを登録し、Prometheusのテキスト形式で出力するクラス"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"メトリクス {name} は別の種類・ラベルで登録済みです")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Counterを取得（未登録の場合は作成）"""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Gaugeを取得（未登録の場合は作成）"""
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Histogramを取得（未登録の場合は作成）"""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """登録済みのメトリクスを取得"""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """すべてのメトリクスをPrometheusのテキスト形式（0.0.4）で出力"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# プロセス全体で共有するレジストリ
+_registry: Optional[MetricsRegistry] = None
+
+
+def get_registry() -> MetricsRegistry:
+    """プロセス共通のMetricsRegistryを取得"""
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
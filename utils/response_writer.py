@@ -0,0 +1,164 @@
+"""回答データの非同期書き込み機能"""
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from utils.data_manager import DataManager
+from utils.log import get_logger
+
+logger = get_logger("data")
+
+
+class ResponseWriter:
+    """
+    回答の保存をバックグラウンドで行うクラス
+
+    ボタン操作への応答（ack）を先に返し、ファイルへの書き込みは別スレッドで行います。
+    同じユーザーの書き込みは受け付けた順に1つずつ実行されるため、
+    素早く回答を変更しても古い回答で上書きされることはありません。
+    """
+
+    def __init__(self, data_manager: DataManager, history_size: int = 1000):
+        """
+        Args:
+            data_manager: 回答データの保存先
+            history_size: 保持するレイテンシ記録の件数
+        """
+        self.data_manager = data_manager
+        # ユーザーIDごとの最後に受け付けた書き込みタスク
+        self._tails: Dict[int, asyncio.Task] = {}
+        # 応答までの時間と書き込みにかかった時間（秒）
+        self.ack_latencies: Deque[float] = deque(maxlen=history_size)
+        self.write_latencies: Deque[float] = deque(maxlen=history_size)
+        self.failures = 0
+        # 書き込み完了時に日付（YYYY-MM-DD形式）を受け取る関数
+        self._listeners: List[Callable[[str], None]] = []
+
+    def add_listener(self, callback: Callable[[str], None]):
+        """
+        回答の書き込みが完了したときに呼ばれる関数を登録
+
+        Args:
+            callback: 書き込んだ回答の日付（YYYY-MM-DD形式）を受け取る関数
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[str], None]):
+        """登録した関数を解除"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify_listeners(self, date_str: str):
+        """登録された関数に書き込み完了を通知"""
+        for callback in list(self._listeners):
+            try:
+                callback(date_str)
+            except Exception as e:
+                logger.error(f"書き込み完了の通知でエラーが発生しました: {e}", exc_info=True)
+
+    def submit(
+        self,
+        user_id: int,
+        date: datetime,
+        can_attend: bool,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        on_error: Optional[Callable[[Exception], Awaitable[None]]] = None
+    ) -> asyncio.Task:
+        """
+        回答の保存を受け付ける
+
+        Args:
+            user_id: ユーザーID
+            date: 回答日付
+            can_attend: 参加可能かどうか
+            start_time: 開始時刻（HH:MM形式）
+            end_time: 終了時刻（HH:MM形式）
+            on_error: 保存に失敗したときに呼ばれるコルーチン関数
+
+        Returns:
+            書き込みタスク
+        """
+        previous = self._tails.get(user_id)
+
+        async def write():
+            if previous is not None:
+                # 前の書き込みの成否に関わらず順番だけを守る
+                await asyncio.wait([previous])
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(
+                    self.data_manager.save_response,
+                    user_id=user_id,
+                    date=date,
+                    can_attend=can_attend,
+                    start_time=start_time,
+                    end_time=end_time
+                )
+            except Exception as e:
+                self.failures += 1
+                logger.error(
+                    f"ユーザー {user_id} の回答の保存に失敗しました: {e}",
+                    exc_info=True,
+                    extra={"user_id": user_id, "date": date.strftime("%Y-%m-%d")}
+                )
+                if on_error is not None:
+                    try:
+                        await on_error(e)
+                    except Exception as notify_error:
+                        logger.warning(f"失敗の通知に失敗しました: {notify_error}")
+            else:
+                self.write_latencies.append(time.perf_counter() - started)
+                self._notify_listeners(date.strftime("%Y-%m-%d"))
+            finally:
+                if self._tails.get(user_id) is task:
+                    del self._tails[user_id]
+
+        task = asyncio.create_task(write())
+        self._tails[user_id] = task
+        return task
+
+    def record_ack(self, seconds: float):
+        """
+        操作への応答にかかった時間を記録
+
+        Args:
+            seconds: ハンドラ開始から応答完了までの秒数
+        """
+        self.ack_latencies.append(seconds)
+
+    @property
+    def pending_count(self) -> int:
+        """書き込み待ちのユーザー数"""
+        return len(self._tails)
+
+    async def flush(self):
+        """受け付け済みの書き込みがすべて完了するまで待つ"""
+        while self._tails:
+            await asyncio.wait(list(self._tails.values()))
+
+    @staticmethod
+    def _summarize(samples: Deque[float]) -> dict:
+        """レイテンシ記録の統計値（ミリ秒）を算出"""
+        if not samples:
+            return {"count": 0, "avg_ms": None, "p95_ms": None, "max_ms": None}
+        ordered = sorted(samples)
+        p95_index = min(len(ordered) - 1, int(len(ordered) * 0.95))
+        return {
+            "count": len(ordered),
+            "avg_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+            "p95_ms": round(ordered[p95_index] * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2)
+        }
+
+    def stats(self) -> dict:
+        """応答・書き込みのレイテンシ統計を取得"""
+        return {
+            "ack": self._summarize(self.ack_latencies),
+            "write": self._summarize(self.write_latencies),
+            "pending": self.pending_count,
+            "failures": self.failures
+        }
@@ -1,32 +1,81 @@
 """スケジュール管理機能"""
 import asyncio
-from datetime import datetime, time, timedelta
-from typing import List, Optional
+import json
+import os
+from collections import deque
+from contextlib import contextmanager
+from datetime import date as date_type, datetime, time, timedelta
+from time import monotonic, perf_counter
+from typing import Awaitable, Callable, Deque, Dict, Iterable, Iterator, List, Optional
 import pytz
-from utils.holidays import HolidayManager
+from utils.file_lock import file_lock, make_temp_path
+from utils.holidays import HolidayManager, get_holiday_manager
+from utils.instrumentation import get_instrumentation, timed
+from utils.log import get_logger
+
+logger = get_logger("scheduler")
+# 定期チェックのログ（SamplingFilterで間引かれる）
+tick_logger = get_logger("scheduler.tick")
+
+# 予約などのスケジューラー状態を保存するファイル
+DEFAULT_STATE_FILE = "data/scheduler_state.json"
 
 
 class Scheduler:
     """メッセージ送信スケジュールを管理するクラス"""
     
-    def __init__(self, config: dict):
+    def __init__(
+        self,
+        config: dict,
+        holiday_manager: Optional[HolidayManager] = None,
+        state_file: Optional[str] = None,
+        shared_state: bool = False
+    ):
         """
         Args:
             config: 設定辞書（weekdays, send_before_holidays, send_time, summary_timeを含む）
+            holiday_manager: 祝日管理（Noneの場合はプロセス共通のインスタンスを使用）
+            state_file: 予約などの状態を保存するファイルのパス（Noneの場合は保存しない）
+            shared_state: 状態ファイルを複数のレプリカで共有する場合True（コマンドでの設定変更も保存し、
+                他のレプリカが更新した状態をtickや変更の前に読み込み直す）
         """
         self.config = config
+        self.state_file = state_file
+        self.shared_state = shared_state
+        # 最後に読み込み・保存した状態ファイルの更新時刻（他のレプリカによる更新の検出用）
+        self._state_mtime: Optional[float] = None
+        # コマンドで変更した設定（shared_state時に状態ファイルへ保存する）
+        self._setting_overrides: dict = {}
         self.jst = pytz.timezone("Asia/Tokyo")
-        self.holiday_manager = HolidayManager()
+        self.holiday_manager = holiday_manager or get_holiday_manager()
+        # 祝前日判定の結果を日付ごとに保持（祝日データ変更時に破棄）
+        self._holiday_eve_cache: Dict[date_type, Optional[str]] = {}
+        self.holiday_manager.add_listener(self._on_holidays_changed)
         self.weekdays = config.get("weekdays", [4, 5])  # デフォルト: 金曜日、土曜日
         self.send_before_holidays = config.get("send_before_holidays", True)
         self.send_time = self._parse_time(config.get("send_time", "20:00"))
         self.summary_time = self._parse_time(config.get("summary_time", "22:00"))
         self.send_callback = None
         self.summary_callback = None
+        # 送信・集計を行ってよいかを判定する関数（複数レプリカ時はリーダーだけがTrue）
+        self.leader_check: Optional[Callable[[], bool]] = None
         self._last_sent_minute = None
         self._last_sent_summary_minute = None
         # 予約リスト: [(datetime, time), ...] の形式で保存
         self.scheduled_sends: List[tuple] = []
+        # 次回の送信・集計予定日時（設定変更やチェックのたびに再計算）
+        self.next_send_at: Optional[datetime] = None
+        self.next_summary_at: Optional[datetime] = None
+        # 定期チェックと設定変更直後のチェックが重ならないようにするロック
+        self._tick_lock = asyncio.Lock()
+        self._pending_ticks: set = set()
+        # 実行中の送信・集計ジョブ（tickはジョブの完了を待たない）
+        self._jobs: Dict[asyncio.Task, str] = {}
+        # ジョブの種類ごとの所要時間（秒、直近100件）
+        self.job_latencies: Dict[str, Deque[float]] = {"send": deque(maxlen=100), "summary": deque(maxlen=100)}
+        # 最後にtickが完了した時刻（time.monotonic、ヘルスチェック用）
+        self.last_tick_at: Optional[float] = None
+        self._recompute_deadlines()
     
     def _parse_time(self, time_str: str) -> time:
         """
@@ -41,6 +90,339 @@ class Scheduler:
         hour, minute = map(int, time_str.split(":"))
         return time(hour, minute)
     
+    def _on_holidays_changed(self):
+        """祝日データが変更されたときに送信カレンダーのキャッシュを破棄"""
+        self._holiday_eve_cache.clear()
+    
+    def _get_holiday_eve(self, date: datetime) -> Optional[str]:
+        """
+        祝前日判定（キャッシュ付き）
+        
+        Args:
+            date: 判定する日付
+            
+        Returns:
+            翌日が祝日の場合は祝日の日付文字列、そうでない場合はNone
+        """
+        # ファイル更新を検知した場合はリスナー経由でキャッシュが破棄される
+        self.holiday_manager.reload_if_changed()
+        key = date.date()
+        if key not in self._holiday_eve_cache:
+            self._holiday_eve_cache[key] = self.holiday_manager.get_holiday_before_date(date)
+        return self._holiday_eve_cache[key]
+    
+    def apply_config(self, updates: dict, save: bool = True) -> bool:
+        """
+        設定変更をタスクを再起動せずに即座に反映
+        
+        すべての値を検証してから一度に差し替えるため、途中で失敗した場合は
+        何も変更されません。イベントループ上で await を挟まずに差し替えるので、
+        定期チェックから見て中途半端な状態になることもありません。
+        shared_stateの場合は状態ファイルにも保存し、他のレプリカに引き継ぎます。
+        
+        Args:
+            updates: 変更する設定（send_time, summary_time, weekdays, send_before_holidays）
+            save: shared_state時に状態ファイルへ保存するかどうか（状態ファイルからの反映時はFalse）
+            
+        Returns:
+            変更後の送信時刻・集計時刻が現在の分に該当する場合True（すぐにtickすべき）
+            
+        Raises:
+            ValueError: 値の形式が正しくない場合
+        """
+        parsed = {}
+        if "send_time" in updates:
+            parsed["send_time"] = self._parse_time(updates["send_time"])
+        if "summary_time" in updates:
+            parsed["summary_time"] = self._parse_time(updates["summary_time"])
+        if "weekdays" in updates:
+            weekdays = [int(w) for w in updates["weekdays"]]
+            if any(w < 0 or w > 6 for w in weekdays):
+                raise ValueError(f"曜日は0〜6で指定してください: {updates['weekdays']}")
+            parsed["weekdays"] = weekdays
+        if "send_before_holidays" in updates:
+            parsed["send_before_holidays"] = bool(updates["send_before_holidays"])
+        
+        if self.shared_state and save:
+            with self._locked_state():
+                self._set_config(parsed, updates)
+                self._setting_overrides.update(updates)
+                self.save_state()
+        else:
+            self._set_config(parsed, updates)
+        
+        now = datetime.now(self.jst)
+        current = (now.hour, now.minute)
+        due_now = current in (
+            (self.send_time.hour, self.send_time.minute),
+            (self.summary_time.hour, self.summary_time.minute)
+        )
+        logger.info(
+            f"設定を反映しました: {updates}（次回送信: {self._format_deadline(self.next_send_at)}, 次回集計: {self._format_deadline(self.next_summary_at)}）",
+            extra={"updates": updates}
+        )
+        return due_now
+    
+    def _set_config(self, parsed: dict, updates: dict):
+        """検証済みの設定値を差し替える"""
+        for key, value in parsed.items():
+            setattr(self, key, value)
+        self.config.update(updates)
+        self._recompute_deadlines()
+    
+    @contextmanager
+    def _locked_state(self) -> Iterator[None]:
+        """
+        shared_state時、状態ファイルの読み直し・変更・保存を他のレプリカと排他する
+        
+        ロックを取ってから最新の状態を読み直すため、他のレプリカが保存した予約や
+        最後に送信した分を古い内容で上書きしません。ロックは入れ子にしないでください。
+        """
+        if not (self.shared_state and self.state_file):
+            yield
+            return
+        with file_lock(f"{self.state_file}.lock"):
+            # 更新時刻の分解能では同じ秒の保存を見分けられないため、常に読み直す
+            self.load_state()
+            yield
+    
+    def _get_state_mtime(self) -> Optional[float]:
+        """状態ファイルの更新時刻を取得（存在しない場合はNone）"""
+        try:
+            return os.stat(self.state_file).st_mtime
+        except OSError:
+            return None
+    
+    def load_state(self):
+        """保存された予約・送信済みの時刻を読み込む（再起動後やリーダーの引き継ぎ時の復元用）"""
+        if not self.state_file:
+            return
+        mtime = self._get_state_mtime()
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        first_load = self._state_mtime is None
+        self._state_mtime = mtime
+        
+        # 同じ分の送信・集計を再起動後や別のレプリカが繰り返さないよう、最後に送信した分も復元
+        self._last_sent_minute = state.get("last_sent_minute", self._last_sent_minute)
+        self._last_sent_summary_minute = state.get("last_sent_summary_minute", self._last_sent_summary_minute)
+        if self.shared_state:
+            overrides = state.get("settings") or {}
+            changed = {key: value for key, value in overrides.items() if self.config.get(key) != value}
+            if changed:
+                try:
+                    self.apply_config(changed, save=False)
+                except ValueError as e:
+                    logger.warning(f"保存された設定を反映できませんでした: {changed} ({e})")
+            self._setting_overrides = dict(overrides)
+        
+        restored = []
+        for entry in state.get("scheduled_sends", []):
+            try:
+                scheduled_date = self.jst.localize(datetime.strptime(entry["date"], "%Y-%m-%d"))
+                restored.append((scheduled_date, self._parse_time(entry["time"])))
+            except (KeyError, ValueError) as e:
+                logger.warning(f"予約の復元をスキップしました: {entry} ({e})")
+        changed_sends = restored != self.scheduled_sends
+        self.scheduled_sends = restored
+        self._recompute_deadlines()
+        if first_load or changed_sends:
+            logger.info(f"予約を{len(restored)}件復元しました", extra={"scheduled_sends": len(restored)})
+    
+    def reload_state_if_changed(self) -> bool:
+        """
+        他のレプリカが状態ファイルを更新していれば読み込み直す
+        
+        Returns:
+            読み込み直した場合True
+        """
+        if not self.state_file:
+            return False
+        mtime = self._get_state_mtime()
+        if mtime is None or mtime == self._state_mtime:
+            return False
+        self.load_state()
+        return True
+    
+    def save_state(self):
+        """予約・最後に送信した分（shared_state時はコマンドで変更した設定も）をファイルに保存"""
+        if not self.state_file:
+            return
+        state = {
+            "scheduled_sends": [
+                {"date": d.strftime("%Y-%m-%d"), "time": t.strftime("%H:%M")}
+                for d, t in self.get_scheduled_sends()
+            ],
+            "last_sent_minute": self._last_sent_minute,
+            "last_sent_summary_minute": self._last_sent_summary_minute
+        }
+        if self.shared_state:
+            state["settings"] = self._setting_overrides
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        # 複数のレプリカが同時に保存しても取り合わないよう、一時ファイルは毎回別の名前にする
+        tmp_path = make_temp_path(self.state_file)
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+                get_instrumentation().add_bytes("scheduler.save_state", "write", f.tell())
+            os.replace(tmp_path, self.state_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._state_mtime = self._get_state_mtime()
+    
+    def _format_deadline(self, deadline: Optional[datetime]) -> str:
+        """予定日時をログ表示用の文字列に変換"""
+        return deadline.strftime('%Y-%m-%d %H:%M') if deadline else "なし"
+    
+    def _recompute_deadlines(self, now: Optional[datetime] = None):
+        """
+        次回の送信・集計予定日時を再計算
+        
+        Args:
+            now: 基準日時（Noneの場合は現在日時）
+        """
+        if now is None:
+            now = datetime.now(self.jst)
+        current_minute = now.replace(second=0, microsecond=0)
+        
+        # 集計: 今日または明日の集計時刻
+        summary_at = self.jst.localize(datetime.combine(now.date(), self.summary_time))
+        if summary_at < current_minute:
+            summary_at = self.jst.localize(datetime.combine(now.date() + timedelta(days=1), self.summary_time))
+        self.next_summary_at = summary_at
+        
+        # 送信: 今日から7日以内の送信対象日、または予約のうち最も早いもの
+        candidates = []
+        for i in range(0, 8):
+            check_datetime = self.jst.localize(datetime.combine(now.date() + timedelta(days=i), self.send_time))
+            if check_datetime >= current_minute and self.should_send_today(check_datetime):
+                candidates.append(check_datetime)
+                break
+        for scheduled_date, scheduled_time in self.scheduled_sends:
+            scheduled_at = self.jst.localize(datetime.combine(scheduled_date.date(), scheduled_time))
+            if scheduled_at >= current_minute:
+                candidates.append(scheduled_at)
+        self.next_send_at = min(candidates) if candidates else None
+    
+    @timed("scheduler.tick")
+    async def tick(self, since: Optional[datetime] = None):
+        """
+        送信・集計の時刻チェックを1回実行（同時に複数実行されないようにロック）
+        
+        時刻になった送信・集計はそれぞれ独立したタスクとして開始し、完了は待ちません。
+        リーダー判定が設定されている場合、リーダーでなければ送信・集計は行いません。
+        
+        Args:
+            since: この日時から現在までの各分もチェックする（リーダーを引き継いだ直後に、
+                前のリーダーが停止していた間の送信・集計を補う。Noneの場合は現在の分のみ）
+        """
+        async with self._tick_lock:
+            if self.shared_state:
+                self.reload_state_if_changed()
+            if self.leader_check is None or self.leader_check():
+                for minute in self._minutes_since(since):
+                    await self.check_and_send(minute)
+                    await self.check_and_send_summary(minute)
+            self._recompute_deadlines()
+            self.last_tick_at = monotonic()
+            tick_logger.info(
+                "定期チェックを実行しました",
+                extra={
+                    "next_send": self._format_deadline(self.next_send_at),
+                    "next_summary": self._format_deadline(self.next_summary_at),
+                    "running_jobs": len(self._jobs),
+                }
+            )
+    
+    def seconds_since_last_tick(self) -> Optional[float]:
+        """最後のtickからの経過秒数（まだ一度も実行していない場合はNone）"""
+        if self.last_tick_at is None:
+            return None
+        return monotonic() - self.last_tick_at
+    
+    def _minutes_since(self, since: Optional[datetime]) -> List[Optional[datetime]]:
+        """sinceから現在までの各分（sinceがNoneの場合は現在の分を表すNoneのみ）"""
+        if since is None:
+            return [None]
+        now = datetime.now(self.jst)
+        minute = since.astimezone(self.jst).replace(second=0, microsecond=0)
+        minutes = []
+        while minute < now.replace(second=0, microsecond=0):
+            minutes.append(minute)
+            minute += timedelta(minutes=1)
+        minutes.append(None)
+        return minutes
+    
+    def request_tick(self, since: Optional[datetime] = None):
+        """
+        次の定期チェックを待たずにtickをバックグラウンドで実行
+        
+        Args:
+            since: tickに渡すチェック開始日時
+        """
+        task = asyncio.create_task(self.tick(since))
+        self._pending_ticks.add(task)
+        task.add_done_callback(self._pending_ticks.discard)
+    
+    def _start_job(
+        self,
+        kind: str,
+        callback: Callable[[datetime], Awaitable[None]],
+        now: datetime,
+        wait_for: Iterable[asyncio.Task] = ()
+    ) -> asyncio.Task:
+        """
+        送信・集計コールバックを独立したタスクとして開始
+        
+        Args:
+            kind: ジョブの種類（"send" または "summary"）
+            callback: 実行するコールバック
+            now: コールバックに渡す日時
+            wait_for: 開始前に完了を待つジョブ
+            
+        Returns:
+            ジョブのタスク
+        """
+        wait_for = [task for task in wait_for if not task.done()]
+        
+        async def run():
+            if wait_for:
+                await asyncio.wait(wait_for)
+            started = perf_counter()
+            failed = False
+            try:
+                await callback(now)
+            except Exception as e:
+                failed = True
+                logger.exception(f"{kind}ジョブでエラーが発生しました: {e}", extra={"job": kind})
+            finally:
+                elapsed = perf_counter() - started
+                self.job_latencies.setdefault(kind, deque(maxlen=100)).append(elapsed)
+                get_instrumentation().observe(f"scheduler.{kind}_job", elapsed, error=failed)
+                logger.info(
+                    f"{kind}ジョブが完了しました（{elapsed * 1000:.1f}ms）",
+                    extra={"job": kind, "elapsed_ms": round(elapsed * 1000, 1), "failed": failed}
+                )
+        
+        task = asyncio.create_task(run())
+        self._jobs[task] = kind
+        task.add_done_callback(lambda t: self._jobs.pop(t, None))
+        return task
+    
+    def running_jobs(self, kind: Optional[str] = None) -> List[asyncio.Task]:
+        """実行中のジョブ（kindを指定した場合はその種類のみ）"""
+        return [task for task, job_kind in self._jobs.items() if kind is None or job_kind == kind]
+    
+    async def wait_for_jobs(self):
+        """実行中のジョブがすべて完了するまで待つ"""
+        while self._jobs:
+            await asyncio.wait(list(self._jobs))
+    
     def set_send_callback(self, callback):
         """送信コールバック関数を設定"""
         self.send_callback = callback
@@ -49,6 +431,15 @@ class Scheduler:
         """集計結果送信コールバック関数を設定"""
         self.summary_callback = callback
     
+    def set_leader_check(self, leader_check: Optional[Callable[[], bool]]):
+        """
+        送信・集計を行ってよいかを判定する関数を設定
+        
+        Args:
+            leader_check: リーダーの場合Trueを返す関数（Noneの場合は常に送信・集計する）
+        """
+        self.leader_check = leader_check
+    
     def should_send_today(self, date: Optional[datetime] = None) -> bool:
         """
         今日メッセージを送信すべきかどうかを判定
@@ -73,15 +464,21 @@ class Scheduler:
         
         # 祝前日チェック
         if self.send_before_holidays:
-            holiday_date = self.holiday_manager.get_holiday_before_date(date)
+            holiday_date = self._get_holiday_eve(date)
             if holiday_date:
                 return True
         
         return False
     
-    async def check_and_send(self):
-        """現在時刻をチェックして、送信時刻になったらメッセージを送信"""
-        now = datetime.now(self.jst)
+    async def check_and_send(self, now: Optional[datetime] = None):
+        """
+        現在時刻をチェックして、送信時刻になったらメッセージを送信
+        
+        Args:
+            now: チェックする日時（Noneの場合は現在日時）
+        """
+        if now is None:
+            now = datetime.now(self.jst)
         current_time = now.time()
         current_date = now.date()
         
@@ -100,16 +497,21 @@ class Scheduler:
             if hasattr(self, '_last_sent_minute') and self._last_sent_minute == current_minute_key:
                 return
             
-            print(f"[スケジューラー] {now.strftime('%Y-%m-%d %H:%M:%S')} - 予約された送信時刻: hour={current_time.hour}, minute={current_time.minute}")
+            logger.info(f"{now.strftime('%Y-%m-%d %H:%M:%S')} - 予約された送信時刻: hour={current_time.hour}, minute={current_time.minute}")
             if self.send_callback:
-                print(f"[スケジューラー] 予約されたメッセージを送信します")
-                await self.send_callback(now)
-                self._last_sent_minute = current_minute_key
-                # 予約を削除
-                self.scheduled_sends = [(d, t) for d, t in self.scheduled_sends if not (d.date() == current_date and t.hour == current_time.hour and t.minute == current_time.minute)]
-                print(f"[スケジューラー] 予約を削除しました")
+                with self._locked_state():
+                    # ロック待ちの間に別のレプリカが送信していないか確認
+                    if self._last_sent_minute == current_minute_key:
+                        return
+                    logger.info("予約されたメッセージを送信します")
+                    self._start_job("send", self.send_callback, now)
+                    self._last_sent_minute = current_minute_key
+                    # 予約を削除（最後に送信した分と合わせて保存）
+                    self.scheduled_sends = [(d, t) for d, t in self.scheduled_sends if not (d.date() == current_date and t.hour == current_time.hour and t.minute == current_time.minute)]
+                    self.save_state()
+                logger.info("予約を削除しました")
             else:
-                print(f"[スケジューラー] エラー: send_callbackが設定されていません")
+                logger.error("send_callbackが設定されていません")
             return
         
         # 通常の送信時刻かどうかをチェック（同じ分内で重複送信を防ぐ）
@@ -122,21 +524,34 @@ class Scheduler:
                 return
             
             should_send = self.should_send_today(now)
-            print(f"[スケジューラー] {now.strftime('%Y-%m-%d %H:%M:%S')} - 送信時刻チェック: hour={current_time.hour}, minute={current_time.minute}, should_send={should_send}, weekday={now.weekday()}")
+            logger.info(
+                f"{now.strftime('%Y-%m-%d %H:%M:%S')} - 送信時刻チェック: hour={current_time.hour}, minute={current_time.minute}, should_send={should_send}, weekday={now.weekday()}",
+                extra={"should_send": should_send, "weekday": now.weekday()}
+            )
             
             if should_send:
                 if self.send_callback:
-                    print(f"[スケジューラー] メッセージを送信します")
-                    await self.send_callback(now)
-                    self._last_sent_minute = current_minute_key
+                    with self._locked_state():
+                        if self._last_sent_minute == current_minute_key:
+                            return
+                        logger.info("メッセージを送信します")
+                        self._start_job("send", self.send_callback, now)
+                        self._last_sent_minute = current_minute_key
+                        self.save_state()
                 else:
-                    print(f"[スケジューラー] エラー: send_callbackが設定されていません")
+                    logger.error("send_callbackが設定されていません")
             else:
-                print(f"[スケジューラー] 今日は送信対象外です（曜日チェックと祝前日チェック）")
+                logger.info("今日は送信対象外です（曜日チェックと祝前日チェック）")
     
-    async def check_and_send_summary(self):
-        """現在時刻をチェックして、集計結果送信時刻になったらメッセージを送信"""
-        now = datetime.now(self.jst)
+    async def check_and_send_summary(self, now: Optional[datetime] = None):
+        """
+        現在時刻をチェックして、集計結果送信時刻になったらメッセージを送信
+        
+        Args:
+            now: チェックする日時（Noneの場合は現在日時）
+        """
+        if now is None:
+            now = datetime.now(self.jst)
         current_time = now.time()
         
         # 集計結果送信時刻かどうかをチェック（同じ分内で重複送信を防ぐ）
@@ -149,11 +564,16 @@ class Scheduler:
                 return
             
             if self.summary_callback:
-                print(f"[スケジューラー] 集計結果を送信します")
-                await self.summary_callback(now)
-                self._last_sent_summary_minute = current_minute_key
+                with self._locked_state():
+                    if self._last_sent_summary_minute == current_minute_key:
+                        return
+                    logger.info("集計結果を送信します")
+                    # 同じ時刻の送信が実行中なら、その完了後に集計する
+                    self._start_job("summary", self.summary_callback, now, wait_for=self.running_jobs("send"))
+                    self._last_sent_summary_minute = current_minute_key
+                    self.save_state()
             else:
-                print(f"[スケジューラー] エラー: summary_callbackが設定されていません")
+                logger.error("summary_callbackが設定されていません")
     
     def get_next_send_datetime(self) -> Optional[datetime]:
         """
@@ -191,9 +611,12 @@ class Scheduler:
         
         # 既に同じ日時の予約がある場合は上書き
         date_only = date.date()
-        self.scheduled_sends = [(d, t) for d, t in self.scheduled_sends if not (d.date() == date_only and t == send_time)]
-        self.scheduled_sends.append((date, send_time))
-        print(f"[スケジューラー] 予約を追加しました: {date.strftime('%Y-%m-%d')} {send_time.strftime('%H:%M')}")
+        with self._locked_state():
+            self.scheduled_sends = [(d, t) for d, t in self.scheduled_sends if not (d.date() == date_only and t == send_time)]
+            self.scheduled_sends.append((date, send_time))
+            self._recompute_deadlines()
+            self.save_state()
+        logger.info(f"予約を追加しました: {date.strftime('%Y-%m-%d')} {send_time.strftime('%H:%M')}")
     
     def remove_scheduled_send(self, date: datetime, send_time: Optional[time] = None):
         """
@@ -209,14 +632,17 @@ class Scheduler:
             date = date.astimezone(self.jst)
         
         date_only = date.date()
-        if send_time is None:
-            # その日の全予約を削除
-            self.scheduled_sends = [(d, t) for d, t in self.scheduled_sends if d.date() != date_only]
-            print(f"[スケジューラー] 予約を削除しました: {date.strftime('%Y-%m-%d')} (全時刻)")
-        else:
-            # 特定の時刻の予約を削除
-            self.scheduled_sends = [(d, t) for d, t in self.scheduled_sends if not (d.date() == date_only and t == send_time)]
-            print(f"[スケジューラー] 予約を削除しました: {date.strftime('%Y-%m-%d')} {send_time.strftime('%H:%M')}")
+        with self._locked_state():
+            if send_time is None:
+                # その日の全予約を削除
+                self.scheduled_sends = [(d, t) for d, t in self.scheduled_sends if d.date() != date_only]
+                logger.info(f"予約を削除しました: {date.strftime('%Y-%m-%d')} (全時刻)")
+            else:
+                # 特定の時刻の予約を削除
+                self.scheduled_sends = [(d, t) for d, t in self.scheduled_sends if not (d.date() == date_only and t == send_time)]
+                logger.info(f"予約を削除しました: {date.strftime('%Y-%m-%d')} {send_time.strftime('%H:%M')}")
+            self._recompute_deadlines()
+            self.save_state()
     
     def get_scheduled_sends(self) -> List[tuple]:
         """
@@ -227,6 +653,52 @@ class Scheduler:
         """
         return sorted(self.scheduled_sends, key=lambda x: (x[0].date(), x[1]))
     
+    def get_send_dates(self, start: datetime, end: datetime, include_scheduled: bool = True) -> List[date_type]:
+        """
+        期間内の送信予定日を取得（長期の計画用）
+        
+        祝前日は祝日インデックスの範囲検索で求めるため、日付ごとの祝日判定は行いません。
+        
+        Args:
+            start: 開始日（この日を含む）
+            end: 終了日（この日を含む）
+            include_scheduled: 予約送信の日付も含めるかどうか
+            
+        Returns:
+            送信予定日のリスト（日付の昇順）
+        """
+        start_date = start.date() if isinstance(start, datetime) else start
+        end_date = end.date() if isinstance(end, datetime) else end
+        if end_date < start_date:
+            return []
+        
+        send_dates = set()
+        
+        # 曜日一致: 最初の該当日から7日刻み
+        for weekday in set(self.weekdays):
+            offset = (weekday - start_date.weekday()) % 7
+            day = start_date + timedelta(days=offset)
+            while day <= end_date:
+                send_dates.add(day)
+                day += timedelta(days=7)
+        
+        # 祝前日: 翌日が祝日の日
+        if self.send_before_holidays:
+            holidays = self.holiday_manager.get_holidays_in_range(
+                start_date + timedelta(days=1),
+                end_date + timedelta(days=1)
+            )
+            for holiday, _ in holidays:
+                send_dates.add(holiday - timedelta(days=1))
+        
+        if include_scheduled:
+            for scheduled_date, _ in self.scheduled_sends:
+                day = scheduled_date.date()
+                if start_date <= day <= end_date:
+                    send_dates.add(day)
+        
+        return sorted(send_dates)
+    
     def check_schedule_for_date(self, date: datetime) -> dict:
         """
         指定された日付の自動実行可否をチェック
@@ -242,7 +714,9 @@ class Scheduler:
                 'weekday_match': bool,  # 曜日が一致するか
                 'holiday_before': bool,  # 祝前日かどうか
                 'scheduled': bool,  # 予約されているかどうか
-                'scheduled_time': Optional[time]  # 予約されている時刻
+                'scheduled_time': Optional[time],  # 予約されている時刻
+                'next_holiday': Optional[tuple],  # 次の祝日 (date, 祝日名)
+                'holiday_block': Optional[tuple]  # 日付を含む連休 (初日, 最終日)
             }
         """
         if date.tzinfo is None:
@@ -255,7 +729,7 @@ class Scheduler:
         
         holiday_before = False
         if self.send_before_holidays:
-            holiday_date = self.holiday_manager.get_holiday_before_date(date)
+            holiday_date = self._get_holiday_eve(date)
             holiday_before = holiday_date is not None
         
         # 予約をチェック
@@ -283,12 +757,18 @@ class Scheduler:
         
         reason = "、".join(reason_parts) if reason_parts else "送信対象外"
         
+        next_holiday = self.holiday_manager.get_next_holiday(date_only)
+        blocks = self.holiday_manager.get_holiday_blocks(date_only, date_only)
+        holiday_block = blocks[0] if blocks else None
+        
         return {
             'will_send': will_send,
             'reason': reason,
             'weekday_match': weekday_match,
             'holiday_before': holiday_before,
             'scheduled': scheduled,
-            'scheduled_time': scheduled_time
+            'scheduled_time': scheduled_time,
+            'next_holiday': next_holiday,
+            'holiday_block': holiday_block
         }
 
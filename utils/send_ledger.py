@@ -0,0 +1,172 @@
+"""質問メッセージの送信記録の管理機能"""
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import pytz
+
+
+class SendLedger:
+    """
+    質問メッセージの送信記録（送信日とメッセージID）を管理するクラス
+
+    ファイルに保存するため、送信したプロセスと集計を送るプロセスが
+    別々でも（run-onceの送信フェーズと集計フェーズなど）引き継げます。
+    """
+
+    def __init__(self, state_file: str = "data/send_ledger.json"):
+        """
+        Args:
+            state_file: 送信記録ファイルのパス
+        """
+        self.state_file = state_file
+        self.jst = pytz.timezone("Asia/Tokyo")
+        self._mtime: Optional[float] = None
+        self._entries: Dict[str, dict] = {}
+        self.reload_if_changed()
+
+    def _get_mtime(self) -> Optional[float]:
+        """送信記録ファイルの更新時刻を取得（存在しない場合はNone）"""
+        try:
+            return os.stat(self.state_file).st_mtime
+        except OSError:
+            return None
+
+    def reload_if_changed(self) -> bool:
+        """
+        他のプロセスが送信記録を更新していれば再読み込みする
+
+        Returns:
+            再読み込みした場合True
+        """
+        mtime = self._get_mtime()
+        if mtime is not None and mtime == self._mtime:
+            return False
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                self._entries = data if isinstance(data, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = {}
+        self._mtime = mtime
+        return True
+
+    def _save(self):
+        """送信記録を保存（一時ファイルに書いてから置き換え）"""
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_file)
+        self._mtime = self._get_mtime()
+
+    def record_send(self, date_str: str, channel_id: int, message_id: int):
+        """
+        質問メッセージの送信を記録
+
+        Args:
+            date_str: 対象日付（YYYY-MM-DD形式）
+            channel_id: 送信先チャンネルID
+            message_id: 送信したメッセージID
+        """
+        self.reload_if_changed()
+        self._prune(date_str)
+        entry = self._entries.setdefault(date_str, {})
+        if entry.get("summarized_at"):
+            # 集計後の再送信（予約送信など）は新しい回として記録し、もう一度集計する
+            entry.pop("summarized_at")
+            entry["messages"] = []
+        entry.setdefault("messages", []).append({
+            "channel_id": int(channel_id),
+            "message_id": int(message_id),
+            "sent_at": datetime.now(self.jst).isoformat()
+        })
+        self._save()
+
+    def record_live_summary(self, date_str: str, channel_id: int, message_id: int):
+        """
+        リアルタイム更新する集計メッセージを記録
+
+        Args:
+            date_str: 対象日付（YYYY-MM-DD形式）
+            channel_id: 送信先チャンネルID
+            message_id: 集計メッセージのID
+        """
+        self.reload_if_changed()
+        self._prune(date_str)
+        entry = self._entries.setdefault(date_str, {})
+        entry.setdefault("live_summaries", []).append({
+            "channel_id": int(channel_id),
+            "message_id": int(message_id)
+        })
+        self._save()
+
+    def _prune(self, today_str: str, keep_days: int = 7):
+        """
+        集計済み、または集計メッセージだけが記録された古い日付を削除
+
+        集計済みの記録は同じ日の二重送信を防ぐために残しますが、keep_days日より前のものは不要です。
+        手動送信の質問には集計送信がないため、集計メッセージだけの記録も残り続けないようにします。
+        集計未送信の記録は残します。
+        """
+        cutoff = (datetime.strptime(today_str, "%Y-%m-%d") - timedelta(days=keep_days)).strftime("%Y-%m-%d")
+        for date_str in [
+            d for d, e in self._entries.items()
+            if d < cutoff and (e.get("summarized_at") or not e.get("messages"))
+        ]:
+            del self._entries[date_str]
+
+    def get_live_summaries(self, date_str: str) -> List[dict]:
+        """
+        指定日の集計メッセージを取得
+
+        Returns:
+            {"channel_id", "message_id"} のリスト
+        """
+        self.reload_if_changed()
+        return list(self._entries.get(date_str, {}).get("live_summaries", []))
+
+    def was_sent(self, date_str: str) -> bool:
+        """指定日の質問メッセージを送信したことがあるかどうか（集計済みも含む。送信の二重実行の防止用）"""
+        self.reload_if_changed()
+        return bool(self._entries.get(date_str, {}).get("messages"))
+
+    def has_sent(self, date_str: str) -> bool:
+        """指定日の質問メッセージを送信済み（かつ集計未送信）かどうか"""
+        self.reload_if_changed()
+        entry = self._entries.get(date_str, {})
+        return bool(entry.get("messages")) and not entry.get("summarized_at")
+
+    def get_messages(self, date_str: str) -> List[dict]:
+        """
+        指定日に送信した質問メッセージを取得
+
+        Returns:
+            {"channel_id", "message_id", "sent_at"} のリスト
+        """
+        self.reload_if_changed()
+        return list(self._entries.get(date_str, {}).get("messages", []))
+
+    def pending_dates(self) -> List[str]:
+        """集計未送信の日付の一覧を取得"""
+        self.reload_if_changed()
+        return sorted(d for d, e in self._entries.items() if e.get("messages") and not e.get("summarized_at"))
+
+    def mark_summarized(self, date_str: str):
+        """
+        指定日の集計送信が完了したことを記録
+
+        送信記録は同じ日の送信の再実行（ジョブの再試行など）を防ぐために残し、集計済みの印を付けます。
+        集計メッセージの記録は削除されるため、以降は更新されません。
+
+        Args:
+            date_str: 対象日付（YYYY-MM-DD形式）
+        """
+        self.reload_if_changed()
+        entry = self._entries.get(date_str)
+        if entry is None:
+            return
+        entry.pop("live_summaries", None)
+        entry["summarized_at"] = datetime.now(self.jst).isoformat()
+        self._prune(date_str)
+        self._save()
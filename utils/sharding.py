@@ -0,0 +1,351 @@
+"""シャード分割とマルチプロセス実行の管理機能
+
+このモジュールはDiscord関連のモジュールを読み込みません（コーディネーターは
+discord.pyを読み込まずにワーカープロセスを起動します）。
+"""
+import glob
+import json
+import os
+import shutil
+import signal
+import subprocess
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.log import get_logger
+
+logger = get_logger("shard")
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """
+    ギルドを担当するシャード番号を算出（Discordの割り当て規則と同じ）
+
+    Args:
+        guild_id: ギルドID
+        shard_count: シャード数
+
+    Returns:
+        シャード番号（0始まり）
+    """
+    return (int(guild_id) >> 22) % shard_count
+
+
+def schedule_guild_id(config: dict) -> Optional[int]:
+    """
+    シャード分割時にスケジュール送信を担当するギルドIDを取得
+
+    質問への回答はそのギルドを担当するプロセスにだけ届くため、送信・集計も同じプロセスが行います。
+
+    Args:
+        config: 設定（guild_id）
+
+    Returns:
+        ギルドID、未設定または不正な場合はNone
+    """
+    guild_id = str(config.get("guild_id") or "").strip()
+    try:
+        return int(guild_id) if guild_id else None
+    except ValueError:
+        return None
+
+
+def assign_shards(shard_count: int, workers: int) -> List[List[int]]:
+    """
+    シャードをワーカーに連続した範囲で均等に割り当てる
+
+    Args:
+        shard_count: シャード数
+        workers: ワーカープロセス数（シャード数を超える分は使われない）
+
+    Returns:
+        ワーカーごとのシャード番号のリスト
+    """
+    if shard_count < 1:
+        raise ValueError("シャード数は1以上を指定してください")
+    workers = max(1, min(workers, shard_count))
+    base, extra = divmod(shard_count, workers)
+    assignments = []
+    start = 0
+    for index in range(workers):
+        size = base + (1 if index < extra else 0)
+        assignments.append(list(range(start, start + size)))
+        start += size
+    return assignments
+
+
+def parse_shard_ids(value: str) -> List[int]:
+    """
+    シャード番号の指定（"0,1,2" や "0-3"、組み合わせ可）を解析
+
+    Args:
+        value: シャード番号の文字列
+
+    Returns:
+        シャード番号のリスト（昇順、重複なし）
+    """
+    shard_ids = set()
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            shard_ids.update(range(int(first), int(last) + 1))
+        else:
+            shard_ids.add(int(part))
+    return sorted(shard_ids)
+
+
+def format_shard_ids(shard_ids: Sequence[int]) -> str:
+    """シャード番号のリストを "0-3" や "0,2" 形式の文字列に変換"""
+    shard_ids = sorted(shard_ids)
+    if shard_ids and shard_ids == list(range(shard_ids[0], shard_ids[-1] + 1)) and len(shard_ids) > 1:
+        return f"{shard_ids[0]}-{shard_ids[-1]}"
+    return ",".join(str(shard_id) for shard_id in shard_ids)
+
+
+def _has_data(path: str) -> bool:
+    """JSONファイルに空でないデータが保存されているかどうか"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return bool(json.load(f))
+    except (OSError, ValueError):
+        return False
+
+
+class ShardConfig:
+    """このプロセスが担当するシャードの設定"""
+
+    __slots__ = ("shard_count", "shard_ids", "worker_index")
+
+    def __init__(self, shard_count: int, shard_ids: Optional[List[int]] = None, worker_index: int = 0):
+        """
+        Args:
+            shard_count: 全体のシャード数
+            shard_ids: このプロセスが担当するシャード番号（Noneの場合はすべて）
+            worker_index: コーディネーターが割り当てたワーカー番号
+        """
+        if shard_ids is None:
+            shard_ids = list(range(shard_count))
+        invalid = [shard_id for shard_id in shard_ids if not 0 <= shard_id < shard_count]
+        if invalid:
+            raise ValueError(f"シャード番号が範囲外です: {invalid}（シャード数: {shard_count}）")
+        self.shard_count = shard_count
+        self.shard_ids = sorted(shard_ids)
+        self.worker_index = worker_index
+
+    @classmethod
+    def from_env(cls, environ: Optional[Dict[str, str]] = None) -> Optional["ShardConfig"]:
+        """
+        環境変数SHARD_COUNT / SHARD_IDS / SHARD_WORKERから作成
+
+        Returns:
+            シャード設定、SHARD_COUNTが未設定の場合はNone（シャード分割しない）
+        """
+        environ = os.environ if environ is None else environ
+        shard_count = environ.get("SHARD_COUNT")
+        if not shard_count:
+            return None
+        shard_ids = environ.get("SHARD_IDS")
+        return cls(
+            int(shard_count),
+            parse_shard_ids(shard_ids) if shard_ids else None,
+            int(environ.get("SHARD_WORKER", "0"))
+        )
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """指定ギルドのイベントがこのプロセスに届くかどうか"""
+        return shard_for_guild(guild_id, self.shard_count) in self.shard_ids
+
+    @property
+    def namespace(self) -> str:
+        """このプロセスのデータを保存するディレクトリ名"""
+        return f"shards-{format_shard_ids(self.shard_ids).replace(',', '_')}-of-{self.shard_count}"
+
+    def data_path(self, path: str) -> str:
+        """
+        データファイルのパスをこのプロセス用のディレクトリに振り替える
+
+        Args:
+            path: 通常時のパス（"data/responses.json"など）
+
+        Returns:
+            "data/shards-0-3-of-8/responses.json" のようなパス
+        """
+        directory, filename = os.path.split(path)
+        return os.path.join(directory, self.namespace, filename)
+
+    def migrate_data(self, paths: Sequence[str]) -> List[Tuple[str, str]]:
+        """
+        シャード分割前や別のシャード構成で保存したデータを、このプロセス用のディレクトリにコピー
+
+        シャード分割の有効化やワーカー数・シャード数の変更でデータの保存先が変わっても、
+        以前の回答や送信記録を引き継ぐためのものです。このプロセス用のファイルがまだない場合に限り、
+        分割前のファイル（"data/responses.json"）と他の構成のファイル（"data/shards-*-of-*/responses.json"）
+        のうち最も新しいものをコピーします。他のワーカーが起動時に作成した空のファイル（{}）は対象外です。
+        コピー元は残します。
+
+        Args:
+            paths: 通常時のパスのリスト
+
+        Returns:
+            コピーした (コピー元, コピー先) のリスト
+        """
+        migrated = []
+        for path in paths:
+            target = self.data_path(path)
+            if os.path.exists(target):
+                continue
+            directory, filename = os.path.split(path)
+            candidates = glob.glob(os.path.join(directory, "shards-*-of-*", filename))
+            if os.path.isfile(path):
+                candidates.append(path)
+            candidates = [candidate for candidate in candidates if _has_data(candidate)]
+            if not candidates:
+                continue
+            source = max(candidates, key=os.path.getmtime)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(source, target)
+            migrated.append((source, target))
+        return migrated
+
+    def __repr__(self) -> str:
+        return f"ShardConfig(shard_ids={format_shard_ids(self.shard_ids)}, shard_count={self.shard_count})"
+
+
+class ShardCoordinator:
+    """
+    シャードをワーカープロセスに割り当てて起動・監視するクラス
+
+    各ワーカーには環境変数SHARD_COUNT / SHARD_IDS / SHARD_WORKERを渡して同じコマンドを実行します。
+    異常終了したワーカーは待ち時間を延ばしながら再起動し、SIGINT / SIGTERMを受けたら
+    すべてのワーカーを停止します。
+    """
+
+    def __init__(
+        self,
+        command: List[str],
+        shard_count: int,
+        workers: int,
+        env: Optional[Dict[str, str]] = None,
+        restart: bool = True,
+        max_restart_delay: float = 60.0
+    ):
+        """
+        Args:
+            command: ワーカーとして実行するコマンド
+            shard_count: 全体のシャード数
+            workers: ワーカープロセス数
+            env: ワーカーに渡す環境変数（Noneの場合は現在の環境変数）
+            restart: 異常終了したワーカーを再起動するかどうか
+            max_restart_delay: 再起動までの待ち時間の上限（秒）
+        """
+        self.command = command
+        self.shard_count = shard_count
+        self.assignments = assign_shards(shard_count, workers)
+        self.env = dict(os.environ if env is None else env)
+        self.restart = restart
+        self.max_restart_delay = max_restart_delay
+        self._processes: Dict[int, subprocess.Popen] = {}
+        self._restart_delays: Dict[int, float] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._stopping = False
+        self.exit_codes: Dict[int, int] = {}
+
+    def worker_env(self, index: int) -> Dict[str, str]:
+        """ワーカーに渡す環境変数"""
+        env = dict(self.env)
+        env["SHARD_COUNT"] = str(self.shard_count)
+        env["SHARD_IDS"] = format_shard_ids(self.assignments[index])
+        env["SHARD_WORKER"] = str(index)
+        if index != 0:
+            # ヘルスチェック用のHTTPサーバーはワーカー0だけが起動する（ポートの重複を避ける）
+            env.pop("PORT", None)
+        return env
+
+    def _spawn(self, index: int):
+        """ワーカーを起動"""
+        process = subprocess.Popen(self.command, env=self.worker_env(index))
+        self._processes[index] = process
+        logger.info(
+            f"ワーカー{index}を起動しました（PID: {process.pid}、"
+            f"シャード: {format_shard_ids(self.assignments[index])}/{self.shard_count}）",
+            extra={"worker": index, "pid": process.pid, "shard_ids": self.assignments[index]}
+        )
+
+    def start(self):
+        """すべてのワーカーを起動"""
+        for index in range(len(self.assignments)):
+            self._spawn(index)
+
+    def poll(self) -> bool:
+        """
+        ワーカーの状態を確認し、必要なら再起動
+
+        Returns:
+            稼働中（または再起動待ち）のワーカーがある場合True
+        """
+        now = time.monotonic()
+        for index, process in list(self._processes.items()):
+            code = process.poll()
+            if code is None:
+                continue
+            del self._processes[index]
+            self.exit_codes[index] = code
+            if self._stopping or code == 0 or not self.restart:
+                logger.info(f"ワーカー{index}が終了しました（終了コード: {code}）", extra={"worker": index, "exit_code": code})
+                continue
+            delay = min(self._restart_delays.get(index, 0.5) * 2, self.max_restart_delay)
+            self._restart_delays[index] = delay
+            self._restart_at[index] = now + delay
+            logger.error(
+                f"ワーカー{index}が異常終了しました（終了コード: {code}）。{delay:.1f}秒後に再起動します",
+                extra={"worker": index, "exit_code": code, "restart_delay": delay}
+            )
+        for index, restart_at in list(self._restart_at.items()):
+            if self._stopping:
+                del self._restart_at[index]
+            elif now >= restart_at:
+                del self._restart_at[index]
+                self._spawn(index)
+        return bool(self._processes or self._restart_at)
+
+    def stop(self, timeout: float = 10.0):
+        """すべてのワーカーを停止（timeout秒以内に終了しなければ強制終了）"""
+        self._stopping = True
+        for process in self._processes.values():
+            if process.poll() is None:
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self._processes.values():
+            try:
+                process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.poll()
+
+    def run(self, interval: float = 1.0) -> int:
+        """
+        ワーカーを起動し、すべて終了するまで監視（SIGINT / SIGTERMで停止）
+
+        Returns:
+            終了コード（いずれかのワーカーが異常終了していれば1）
+        """
+        def handle_signal(signum, frame):
+            logger.info(f"シグナル{signum}を受信したため、ワーカーを停止します")
+            self._stopping = True
+
+        previous = {sig: signal.signal(sig, handle_signal) for sig in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            self.start()
+            while self.poll():
+                if self._stopping:
+                    self.stop()
+                    break
+                time.sleep(interval)
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+        return 0 if all(code == 0 for code in self.exit_codes.values()) or self._stopping else 1
+
@@ -0,0 +1,113 @@
+"""起動処理の管理機能"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.log import get_logger
+
+logger = get_logger("startup")
+
+
+class StartupPipeline:
+    """
+    起動時の処理を依存関係に従って並行実行するクラス
+
+    各ステップは依存するステップの完了だけを待って開始するため、
+    互いに独立したステップは同時に実行されます。固定時間の待機は行わず、
+    Discordの準備完了などは各ステップ内で実際のシグナルを待ちます。
+    """
+
+    def __init__(self, name: str = "起動"):
+        """
+        Args:
+            name: ログに表示する名前
+        """
+        self.name = name
+        self._steps: List[Tuple[str, Callable[[], Awaitable[None]], Tuple[str, ...]]] = []
+        # ステップ名: (開始時刻, 終了時刻)（パイプライン開始からの経過秒）
+        self.timings: Dict[str, Tuple[float, float]] = {}
+        self.errors: Dict[str, BaseException] = {}
+        self.total_seconds: Optional[float] = None
+
+    def add_step(self, name: str, func: Callable[[], Awaitable[None]], depends_on: Iterable[str] = ()):
+        """
+        ステップを追加
+
+        Args:
+            name: ステップ名
+            func: 実行するコルーチン関数（引数なし）
+            depends_on: 先に完了している必要があるステップ名
+        """
+        depends_on = tuple(depends_on)
+        known = {step_name for step_name, _, _ in self._steps}
+        unknown = [dep for dep in depends_on if dep not in known]
+        if unknown:
+            raise ValueError(f"未登録のステップに依存しています: {unknown}")
+        self._steps.append((name, func, depends_on))
+
+    async def run(self) -> bool:
+        """
+        すべてのステップを実行
+
+        失敗したステップに依存するステップは実行されません。
+
+        Returns:
+            すべてのステップが成功した場合True
+        """
+        started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_step(name: str, func: Callable[[], Awaitable[None]], depends_on: Tuple[str, ...]):
+            for dep in depends_on:
+                await tasks[dep]
+                if dep in self.errors:
+                    raise RuntimeError(f"依存ステップ「{dep}」が失敗したため実行しません")
+            step_start = time.perf_counter() - started
+            try:
+                await func()
+            except Exception as e:
+                self.errors[name] = e
+                logger.error(f"[{self.name}] {name} でエラーが発生しました: {e}", exc_info=e, extra={"step": name})
+            finally:
+                self.timings[name] = (step_start, time.perf_counter() - started)
+
+        async def guarded(name: str, func, depends_on):
+            try:
+                await run_step(name, func, depends_on)
+            except RuntimeError as e:
+                self.errors[name] = e
+                logger.warning(f"[{self.name}] {name}: {e}", extra={"step": name})
+
+        for name, func, depends_on in self._steps:
+            tasks[name] = asyncio.create_task(guarded(name, func, depends_on))
+        await asyncio.gather(*tasks.values())
+
+        self.total_seconds = time.perf_counter() - started
+        logger.info(
+            self.format_report(),
+            extra={
+                "total_ms": round(self.total_seconds * 1000, 1),
+                "failed_steps": sorted(self.errors),
+            }
+        )
+        return not self.errors
+
+    def format_report(self) -> str:
+        """各ステップの所要時間の内訳を文字列で返す"""
+        lines = [f"[{self.name}] 起動処理が完了しました（合計 {self._ms(self.total_seconds or 0.0)}）"]
+        for name, _, _ in self._steps:
+            if name not in self.timings:
+                lines.append(f"[{self.name}]   {name}: 未実行")
+                continue
+            start, end = self.timings[name]
+            status = "失敗" if name in self.errors else "完了"
+            lines.append(
+                f"[{self.name}]   {name}: {self._ms(end - start)}"
+                f"（+{self._ms(start)} 〜 +{self._ms(end)}、{status}）"
+            )
+        return "\n".join(lines)
+
+    @staticmethod
+    def _ms(seconds: float) -> str:
+        """秒をミリ秒表記に変換"""
+        return f"{seconds * 1000:.1f}ms"
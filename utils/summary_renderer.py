@@ -0,0 +1,176 @@
+"""集計結果の表示内容の作成機能"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Discordの埋め込みの制限
+FIELD_VALUE_LIMIT = 1024
+MAX_FIELDS_PER_EMBED = 25
+EMBED_TOTAL_LIMIT = 6000
+TITLE_LIMIT = 256
+
+ATTENDEE_FIELD_NAME = "参加可能なユーザー"
+ATTENDEE_FIELD_NAME_CONTINUED = "参加可能なユーザー（続き）"
+
+
+def format_time_display(time_str: Optional[str]) -> Optional[str]:
+    """時刻表示を整形（00:00を24:00に変換）"""
+    if time_str == "00:00":
+        return "24:00"
+    return time_str
+
+
+def format_attendee_line(user_data: Dict) -> str:
+    """
+    参加可能なユーザー1人分の表示行を作成
+
+    Args:
+        user_data: DataManager.get_summaryのattendable_usersの要素
+
+    Returns:
+        「<@ユーザーID>: 開始 ～ 終了」形式の文字列
+    """
+    start_time = format_time_display(user_data.get("start_time")) or "未設定"
+    end_time = format_time_display(user_data.get("end_time")) or "未設定"
+    return f"<@{user_data['user_id']}>: {start_time} ～ {end_time}"
+
+
+def chunk_lines(lines: List[str], limit: int = FIELD_VALUE_LIMIT) -> List[str]:
+    """
+    行を改行で連結し、1つあたりlimit文字以内のかたまりに分割
+
+    Args:
+        lines: 行のリスト
+        limit: 1つのかたまりの最大文字数
+
+    Returns:
+        分割した文字列のリスト
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    length = 0
+    for line in lines:
+        line = line[:limit]
+        added = len(line) + (1 if current else 0)
+        if current and length + added > limit:
+            chunks.append("\n".join(current))
+            current, length = [], 0
+            added = len(line)
+        current.append(line)
+        length += added
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _field(name: str, value: str, inline: bool = False) -> Dict:
+    return {"name": name, "value": value, "inline": inline}
+
+
+def _embed_size(page: Dict) -> int:
+    """Discordが数える埋め込みの文字数（タイトル、説明、フィールド、フッター）"""
+    size = len(page["title"]) + len(page.get("description") or "") + len(page.get("footer") or "")
+    for field in page["fields"]:
+        size += len(field["name"]) + len(field["value"])
+    return size
+
+
+def render_summary_pages(summary: Dict, title: Optional[str] = None, description: Optional[str] = None) -> List[Dict]:
+    """
+    集計結果をDiscordの制限内に収まるページ（1ページ = 1埋め込み）に分割
+
+    1ページ目に回答数を表示し、参加可能なユーザーは1024文字以内のフィールドに分けて
+    各ページに25フィールド・6000文字以内で詰めます。
+
+    Args:
+        summary: DataManager.get_summaryの集計結果
+        title: タイトル（Noneの場合は「YYYY-MM-DD の集計結果」）
+        description: 説明文
+
+    Returns:
+        {"title", "description", "fields", "footer"} のリスト（fieldsは {"name", "value", "inline"} のリスト）
+    """
+    title = (title or f"{summary['date']} の集計結果")[:TITLE_LIMIT]
+    # ページ番号のフッター分を空けておく
+    footer_reserve = len("ページ 999/999")
+
+    first_page = {
+        "title": title,
+        "description": description,
+        "fields": [
+            _field("総回答数", f"{summary['total_responses']}件", True),
+            _field("参加可能", f"{summary['attendable_count']}人", True),
+            _field("参加不可", f"{summary['not_attendable_count']}人", True),
+        ],
+        "footer": None,
+    }
+    pages = [first_page]
+
+    lines = [format_attendee_line(user_data) for user_data in summary["attendable_users"]]
+    chunks = chunk_lines(lines) or ["なし"]
+    for index, chunk in enumerate(chunks):
+        field = _field(ATTENDEE_FIELD_NAME if index == 0 else ATTENDEE_FIELD_NAME_CONTINUED, chunk)
+        page = pages[-1]
+        fits = (
+            len(page["fields"]) < MAX_FIELDS_PER_EMBED
+            and _embed_size(page) + len(field["name"]) + len(field["value"]) + footer_reserve <= EMBED_TOTAL_LIMIT
+        )
+        if not fits:
+            page = {"title": title, "description": None, "fields": [], "footer": None}
+            pages.append(page)
+        page["fields"].append(field)
+
+    if len(pages) > 1:
+        for number, page in enumerate(pages, 1):
+            page["footer"] = f"ページ {number}/{len(pages)}"
+    return pages
+
+
+class SummaryPageCache:
+    """
+    日付ごとの集計ページを保持するキャッシュ（最近使ったものから最大maxsize件）
+
+    ページ切り替えのたびに集計し直さないよう、作成したページを再利用します。
+    回答が保存された日付はinvalidateで破棄してください。他のプロセスが保存した回答のように
+    通知されない変更に備え、作成時のデータの版（DataManager.data_version）を渡すと、
+    版が変わったページは取得時に破棄します。
+    """
+
+    def __init__(self, maxsize: int = 32):
+        """
+        Args:
+            maxsize: 保持する日付の最大数
+        """
+        self.maxsize = maxsize
+        # 日付: (作成時のデータの版, ページのリスト)
+        self._pages: "OrderedDict[str, Tuple[Optional[int], List[Dict]]]" = OrderedDict()
+
+    def get(self, date_str: str, version: Optional[int] = None) -> Optional[List[Dict]]:
+        """
+        キャッシュしたページを取得
+
+        Args:
+            date_str: 対象日付（YYYY-MM-DD形式）
+            version: 現在のデータの版（作成時と異なる場合はキャッシュを破棄してNoneを返す）
+
+        Returns:
+            ページのリスト、キャッシュにない場合はNone
+        """
+        cached = self._pages.get(date_str)
+        if cached is None:
+            return None
+        if cached[0] != version:
+            del self._pages[date_str]
+            return None
+        self._pages.move_to_end(date_str)
+        return cached[1]
+
+    def put(self, date_str: str, pages: List[Dict], version: Optional[int] = None):
+        """ページをキャッシュ（上限を超えた場合は最も古いものを破棄）"""
+        self._pages[date_str] = (version, pages)
+        self._pages.move_to_end(date_str)
+        while len(self._pages) > self.maxsize:
+            self._pages.popitem(last=False)
+
+    def invalidate(self, date_str: str):
+        """指定日のページを破棄"""
+        self._pages.pop(date_str, None)